@@ -1,22 +1,59 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
+import io
+import json
+import logging
 import sys
 import os
+import tempfile
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 from controller import LogiMaster
-from models import Package
+from models import Package, Truck
+from database import format_timestamp
+from algorithms import pack_truck_3d, plan_fleet
+from metrics import REGISTRY, SamplingProfiler
 
-app = FastAPI()
+logging.basicConfig(level=os.getenv("LOGISTECH_LOG_LEVEL", "WARNING").upper())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Optional background consumers draining the conveyor (0 = only /package/process)
+    workers = int(os.getenv("LOGISTECH_CONVEYOR_WORKERS", 0))
+    if workers:
+        controller.start_workers(workers)
+    yield
+    controller.stop_workers()
+    controller.planner.shutdown()
+    # Durable state: snapshot so the next start replays no journal
+    controller.checkpoint()
+    # Flush buffered shipment logs before the worker exits
+    controller.db.close()
+
+# Bin imports larger than this are spooled to disk while they upload
+IMPORT_SPOOL_BYTES = 8 * 2**20
+
+# Answered even while the inventory is still loading
+WARMUP_EXEMPT = {"/health", "/ready", "/metrics", "/debug/profile"}
+
+def require_ready(request: Request):
+    """503 for API calls until the controller has warmed up (LOGISTECH_WARMUP=background)"""
+    if not controller.ready.is_set() and request.url.path not in WARMUP_EXEMPT:
+        raise HTTPException(status_code=503, detail="Warming up, retry shortly", headers={"Retry-After": "1"})
+
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(require_ready)])
 
 # CORS for development
 app.add_middleware(
@@ -30,31 +67,141 @@ app.add_middleware(
 # Initialize Controller
 controller = LogiMaster()
 
+# Opt-in sampling profiler (LOGISTECH_PROFILE_INTERVAL seconds, 0 = off)
+profiler = SamplingProfiler.from_env()
+if profiler:
+    profiler.start()
+
 # Models
 class PackageModel(BaseModel):
     tracking_id: str
     size: int
     destination: str
+    # Optional 3-D model; with all three dimensions the package volume replaces 'size' for storage
+    length: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    weight: int = 0
+    deadline: Optional[float] = None  # SLA deadline, epoch seconds (priority conveyor)
+    zone: Optional[str] = None  # Arrival zone (LOGISTECH_ZONE_POLICY=nearest)
+
+    def to_package(self) -> Package:
+        dimensions = (self.length, self.width, self.height) if self.length and self.width and self.height else None
+        return Package(self.tracking_id, self.size, self.destination, dimensions, self.weight, self.deadline,
+                       self.zone)
+
+class PackageBatchRequest(BaseModel):
+    packages: List[PackageModel]
 
 class TruckLoadRequest(BaseModel):
     capacity: int
     packages: List[PackageModel]
+    # Truck interior for 3-D packing (length, width, height); capacity is then unused
+    length: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    max_weight: int = 0
+
+class CutoffRequest(BaseModel):
+    destination: str
+    cutoff: Optional[float] = None  # Epoch seconds; null removes it
+
+class TruckModel(BaseModel):
+    truck_id: str
+    capacity: int
+    destinations: List[str] = []  # Empty = any destination
+    dock: int = 1
+
+    def to_truck(self) -> Truck:
+        return Truck(self.truck_id, self.capacity, tuple(self.destinations), self.dock)
+
+class FleetRequest(BaseModel):
+    trucks: List[TruckModel]
+    packages: List[PackageModel]
+
+class ReplanRequest(BaseModel):
+    dock: int = 1
+    capacity: Optional[int] = None  # Needed the first time a dock is planned
+    add: List[PackageModel] = []
+    remove: List[str] = []
+    apply: bool = True  # False only previews the pops and pushes
+
+class PickRequest(BaseModel):
+    tracking_ids: List[str]
+    dock: Optional[int] = None  # Load the picked packages onto this dock door
+
+class DefragmentRequest(BaseModel):
+    target_size: Optional[int] = None  # Default: the largest package that recently found no bin
+    max_moves: int = 50
+    moves_per_second: Optional[float] = None
 
 # API Endpoints
+def bin_entry(bin_id, capacity, current_load, location):
+    return {
+        "bin_id": bin_id,
+        "capacity": capacity,
+        "current_load": current_load,
+        "location": location,
+        "packages": controller.locations.tracking_ids(bin_id)
+    }
+
 @app.get("/status")
-def get_status():
-    """Get current bin inventory status"""
+def get_status(offset: int = Query(0, ge=0),
+               limit: Optional[int] = Query(None, ge=1),
+               zone: Optional[str] = None):
+    """
+    Get current bin inventory status, optionally one page and/or one zone
+    (location prefix, e.g. 'A'). 'version' is the starting point for /status/changes.
+    """
+    inventory = controller.bin_inventory
+    version = inventory.version
+    if zone is None:
+        total = len(inventory)
+        stop = offset + limit if limit is not None else None
+        page = inventory.columns(offset, stop)
+    else:
+        rows = inventory.rows_in_zone(zone)
+        total = len(rows)
+        stop = offset + limit if limit is not None else None
+        page = inventory.row_values(rows[offset:stop])
     return {
-        "bins": [
-            {
-                "bin_id": b.bin_id,
-                "capacity": b.capacity,
-                "current_load": b.current_load,
-                "location": b.location_code,
-                "packages": [] # In a real app, we'd list packages here
-            }
-            for b in controller.bin_inventory
-        ]
+        "version": version,
+        "total": total,
+        "offset": offset,
+        "bins": [bin_entry(*values) for values in page]
+    }
+
+@app.get("/status/stream")
+def stream_status():
+    """Full inventory dump streamed as JSON, without building it in memory"""
+    inventory = controller.bin_inventory
+    chunk_size = 1000
+
+    def generate():
+        yield f'{{"version": {inventory.version}, "bins": ['
+        for start in range(0, len(inventory), chunk_size):
+            chunk = ",".join(json.dumps(bin_entry(*values))
+                             for values in inventory.columns(start, start + chunk_size))
+            yield ("," if start else "") + chunk
+        yield "]}"
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+@app.get("/status/changes")
+def get_status_changes(since: int):
+    """
+    Bins whose load changed after version 'since'. When 'resync' is true the
+    change log no longer reaches back that far: fetch /status again.
+    """
+    inventory = controller.bin_inventory
+    changes = inventory.changed_since(since)
+    if changes is None:
+        return {"version": inventory.version, "resync": True, "bins": []}
+    version, rows = changes
+    return {
+        "version": version,
+        "resync": False,
+        "bins": [bin_entry(*values) for values in inventory.row_values(rows)]
     }
 
 # --- Conveyor Belt Endpoints ---
@@ -65,31 +212,30 @@ def get_queue():
     return {
         "queue": [
             {"tracking_id": p.tracking_id, "size": p.size, "destination": p.destination}
-            for p in controller.conveyor_queue.queue
+            for p in controller.conveyor_queue.snapshot()
         ]
     }
 
 @app.post("/package/add")
 def add_package(pkg: PackageModel):
     """Add a package to the conveyor queue"""
-    package = Package(pkg.tracking_id, pkg.size, pkg.destination)
+    package = pkg.to_package()
     controller.process_arrival(package)
     return {"status": "success", "message": "Package added to queue"}
 
 @app.post("/package/process")
 def process_next_package():
     """Process the next package from the queue (Binary Search & Store)"""
-    if controller.conveyor_queue.is_empty():
-        return {"status": "error", "message": "Queue is empty"}
-    
-    # Peek to know what we are processing for the response
-    pkg = controller.conveyor_queue.queue[0]
+    # Pop-and-assign is atomic in the controller; another request may have
+    # drained the queue since we last looked, so rely on its answer only
     result = controller.assign_storage()
+    if not result["success"] and result["reason"] == "No packages on conveyor":
+        return {"status": "error", "message": "Queue is empty"}
     
     if result and result["success"]:
         return {
             "status": "success", 
-            "message": f"Package {pkg.tracking_id} stored in Bin {result['bin_id']}",
+            "message": f"Package {result['package_id']} stored in Bin {result['bin_id']}",
             "details": result
         }
     else:
@@ -98,6 +244,54 @@ def process_next_package():
         # If it failed, it's gone from queue.
         return {"status": "error", "message": "Storage assignment failed", "details": result}
 
+@app.post("/package/batch")
+def store_package_batch(request: PackageBatchRequest):
+    """Store many packages in one call (sorted merge against free bin space)"""
+    packages = [p.to_package() for p in request.packages]
+    results = controller.assign_storage_batch(packages)
+    stored = sum(1 for r in results if r["success"])
+
+    if stored == len(results):
+        status = "success"
+    elif stored:
+        status = "warning"
+    else:
+        status = "error"
+    return {
+        "status": status,
+        "stored": stored,
+        "failed": len(results) - stored,
+        "results": results
+    }
+
+def priority_conveyor():
+    if not hasattr(controller.conveyor_queue, "lanes"):
+        raise HTTPException(status_code=404, detail="Priority conveyor is disabled (set LOGISTECH_CONVEYOR=priority)")
+    return controller.conveyor_queue
+
+@app.get("/conveyor/lanes")
+def get_lanes():
+    """Depth of every priority lane, destination cutoffs and dead-lettered packages"""
+    conveyor = priority_conveyor()
+    return {
+        "lanes": conveyor.depths(),
+        "cutoffs": dict(conveyor.cutoffs),
+        "dead_letters": [{"tracking_id": p.tracking_id, "size": p.size, "destination": p.destination}
+                         for p in conveyor.dead_letters]
+    }
+
+@app.post("/conveyor/cutoffs")
+def set_cutoff(request: CutoffRequest):
+    """Set the cutoff of a destination; packages for it turn urgent as it nears"""
+    priority_conveyor().set_cutoff(request.destination, request.cutoff)
+    return {"status": "success"}
+
+@app.post("/conveyor/dead-letters/requeue")
+def requeue_dead_letters():
+    """Put every dead-lettered package back on the conveyor"""
+    count = priority_conveyor().requeue_dead_letters()
+    return {"status": "success", "message": f"Requeued {count} packages"}
+
 # --- Truck Loading Endpoints ---
 
 @app.get("/truck/status")
@@ -106,14 +300,14 @@ def get_truck_status():
     return {
         "stack": [
             {"tracking_id": p.tracking_id, "size": p.size, "destination": p.destination}
-            for p in controller.loading_stack.stack
+            for p in controller.loading_stack.snapshot()
         ]
     }
 
 @app.post("/truck/load")
 def load_truck_item(pkg: PackageModel):
     """Load a single package onto the truck (Stack Push)"""
-    package = Package(pkg.tracking_id, pkg.size, pkg.destination)
+    package = pkg.to_package()
     controller.loading_stack.load_package(package)
     controller.db.log_shipment(package.tracking_id, -1, "LOADED")
     return {"status": "success", "message": f"Loaded {pkg.tracking_id}"}
@@ -131,21 +325,26 @@ def rollback_truck(count: int = 1):
 @app.post("/truck/can-fit")
 def check_fit(request: TruckLoadRequest):
     """Check if a set of packages fits in the truck (Backtracking)"""
-    packages = [Package(p.tracking_id, p.size, p.destination) for p in request.packages]
-    
-    # We use the optimize_truck_loading function which returns the list if it fits
-    # Note: optimize_truck_loading tries to find *a* valid combination.
-    # If we want to check if *all* fit, we check if result length == input length.
-    # The prompt says: "System checks via Backtracking if they fit... Shows YES or NO"
-    
-    result = controller.load_truck(request.capacity, packages) # This actually loads them in the controller logic!
-    # Wait, controller.load_truck calls optimize AND loads them.
-    # We just want to CHECK.
-    # We need to access the algorithm directly or modify controller.
-    
-    from algorithms import optimize_truck_loading
-    optimized_load = optimize_truck_loading(request.capacity, packages)
+    packages = [p.to_package() for p in request.packages]
+
+    if request.length and request.width and request.height:
+        # 3-D mode: the wall-building packer decides which boxes fit and where
+        placements = pack_truck_3d((request.length, request.width, request.height), packages, request.max_weight)
+        layout = [{"tracking_id": pl.package.tracking_id, "position": [pl.x, pl.y, pl.z],
+                   "oriented": [pl.length, pl.width, pl.height]} for pl in placements]
+        if placements and len(placements) == len(packages):
+            return {"status": "success", "fits": True, "message": "All packages fit!", "placements": layout}
+        elif placements:
+            return {"status": "warning", "fits": True, "message": "Partial fit possible",
+                    "subset": [pl.package.tracking_id for pl in placements], "placements": layout}
+        return {"status": "error", "fits": False, "message": "No combination fits"}
     
+    # Only a check: one solve (cached by manifest), nothing is loaded onto the dock
+    try:
+        optimized_load = controller.planner.solve(request.capacity, packages)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Planning timed out; submit it to /truck/plans instead")
+
     if optimized_load and len(optimized_load) == len(packages):
          return {"status": "success", "fits": True, "message": "All packages fit!"}
     elif optimized_load:
@@ -153,20 +352,201 @@ def check_fit(request: TruckLoadRequest):
     else:
          return {"status": "error", "fits": False, "message": "No combination fits"}
 
+def plan_job_entry(job):
+    entry = {"job_id": job.job_id, "status": job.status, "cached": job.cached}
+    if entry["status"] in ("done", "committed"):
+        load = job.load
+        entry["fits"] = bool(load) and len(load) == len(job.packages)
+        entry["load"] = sum(p.size for p in load)
+        entry["subset"] = [p.tracking_id for p in load]
+    elif entry["status"] == "failed":
+        entry["error"] = str(job.future.exception())
+    return entry
+
+@app.post("/truck/plans")
+def submit_plan(request: TruckLoadRequest):
+    """Queue a truck plan; poll /truck/plans/{job_id}, then commit it to load the dock"""
+    job = controller.planner.submit(request.capacity, [p.to_package() for p in request.packages])
+    return plan_job_entry(job)
+
+@app.get("/truck/plans/{job_id}")
+def get_plan(job_id: str):
+    job = controller.planner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown planning job {job_id}")
+    return plan_job_entry(job)
+
+@app.post("/truck/plans/{job_id}/commit")
+def commit_plan(job_id: str, dock: int = 1):
+    """Load a finished plan onto a dock door"""
+    if controller.planner.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown planning job {job_id}")
+    result = controller.commit_plan(job_id, dock)
+    return {"status": "success" if result["success"] else "error", **result}
+
+@app.post("/truck/replan")
+def replan_truck(request: ReplanRequest):
+    """Edit a dock's manifest and get (and by default apply) the smallest LIFO change to its load"""
+    result = controller.replan_truck(request.dock, request.capacity, [p.to_package() for p in request.add],
+                                     request.remove, request.apply)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["reason"])
+    return {"status": "success", **result}
+
+# --- Fleet Endpoints ---
+
+@app.post("/fleet/plan")
+def plan_fleet_loads(request: FleetRequest):
+    """Assign a package pool across several trucks by destination, without loading anything"""
+    plan = plan_fleet([t.to_truck() for t in request.trucks], [p.to_package() for p in request.packages],
+                      pool=controller.planner.executor())
+    return {
+        "trucks": [{"truck_id": truck_id, "load": sum(p.size for p in load), "packages": [p.tracking_id for p in load]}
+                   for truck_id, load in plan.loads.items()],
+        "unassigned": [p.tracking_id for p in plan.unassigned]
+    }
+
+@app.post("/fleet/load")
+def load_fleet(request: FleetRequest):
+    """Plan the fleet and load every truck onto the dock of its door"""
+    result = controller.load_fleet([t.to_truck() for t in request.trucks], [p.to_package() for p in request.packages])
+    return {"status": "success" if result["success"] else "error", **result}
+
+@app.get("/fleet/docks")
+def get_docks():
+    """Loading stack of every dock door in use"""
+    return {
+        "docks": {
+            door: [{"tracking_id": p.tracking_id, "size": p.size, "destination": p.destination}
+                   for p in dock.snapshot()]
+            for door, dock in sorted(controller.docks.items())
+        }
+    }
+
+def format_log(row):
+    return f"[{format_timestamp(row[3])}] {row[1]}: {row[4]} (Bin {row[2]})"
+
+def log_entry(row):
+    return {
+        "id": row[0],
+        "tracking_id": row[1],
+        "bin_id": row[2],
+        "timestamp": format_timestamp(row[3]),
+        "epoch_ms": row[3],
+        "status": row[4]
+    }
+
 @app.get("/logs")
-def get_logs():
-    """Get simulation logs from DB"""
-    # We should read from DB now, not text file, as per requirements "SQL Logging API"
-    # But for now, let's stick to the text file or DB?
-    # The controller logs to DB. Let's read from DB.
-    cursor = controller.db.conn.cursor()
-    cursor.execute("SELECT * FROM shipment_logs ORDER BY timestamp DESC LIMIT 50")
-    rows = cursor.fetchall()
-    cursor.close()
-    logs = [
-        f"[{r[3]}] {r[1]}: {r[4]} (Bin {r[2]})" for r in rows
-    ]
-    return {"logs": logs}
+def get_logs(limit: int = Query(50, ge=1, le=1000),
+             cursor: Optional[int] = None,
+             tracking_id: Optional[str] = None,
+             bin_id: Optional[int] = None,
+             status: Optional[str] = None,
+             since: Optional[int] = None,
+             until: Optional[int] = None):
+    """
+    Get shipment logs from DB (live and archived), newest first.
+    Pass 'next_cursor' from a response as 'cursor' to fetch the next page.
+    since/until are epoch milliseconds.
+    """
+    rows = controller.db.query_logs(tracking_id=tracking_id, bin_id=bin_id, status=status,
+                                    before_id=cursor, since=since, until=until, limit=limit)
+    return {
+        "logs": [format_log(r) for r in rows],
+        "entries": [log_entry(r) for r in rows],
+        "next_cursor": rows[-1][0] if len(rows) == limit else None
+    }
+
+@app.get("/package/{tracking_id}/location")
+def get_package_location(tracking_id: str):
+    """Bin currently holding a stored package"""
+    location = controller.locate(tracking_id)
+    if location is None:
+        raise HTTPException(status_code=404, detail=f"Package {tracking_id} is not in storage")
+    return location
+
+@app.post("/package/pick")
+def pick_packages(request: PickRequest):
+    """Retrieve packages from their bins, ordered by location code for one walk (optionally onto a dock)"""
+    result = controller.pick(request.tracking_ids, request.dock)
+    return {"status": "success" if not result["missing"] else "partial", **result}
+
+@app.get("/package/{tracking_id}/history")
+def get_package_history(tracking_id: str):
+    """Every logged event for one package, oldest first"""
+    rows = controller.db.package_history(tracking_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No history for package {tracking_id}")
+    return {"tracking_id": tracking_id, "history": [log_entry(r) for r in rows]}
+
+# --- Inventory Maintenance ---
+
+@app.get("/inventory/zones")
+def get_zones():
+    """Bins, capacity and load per zone shard (LOGISTECH_ZONE_POLICY)"""
+    return {
+        "policy": controller.zone_policy,
+        "zones": [{"zone": shard.zone, "bins": shard.bins, "capacity": shard.capacity, "load": shard.load,
+                   "utilization": round(shard.utilization(), 4)}
+                  for shard in controller.bin_inventory.shards.values()]
+    }
+
+@app.post("/inventory/defragment")
+def defragment_inventory(request: DefragmentRequest):
+    """Move stored packages between bins until one bin can take 'target_size'"""
+    result = controller.defragment(request.target_size, request.max_moves, request.moves_per_second)
+    return {"status": "success" if result["fits"] else "error", **result}
+
+@app.post("/inventory/import")
+async def import_bins(request: Request, fmt: str = Query("csv", alias="format", pattern="^(csv|jsonl)$"),
+                      chunk_size: int = Query(5000, ge=1)):
+    """
+    Provision bins from the request body, a CSV file (header row) or JSON
+    Lines. The upload is spooled to a temporary file (memory up to
+    IMPORT_SPOOL_BYTES) and imported chunk by chunk into the live inventory.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for data in request.stream():
+            spool.write(data)
+        spool.seek(0)
+        text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        try:
+            result = await run_in_threadpool(controller.import_bins, text, fmt, chunk_size)
+        except ValueError as e:  # Bad CSV header or undecodable bytes
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            text.detach()
+    return {"status": "success", **result}
+
+# --- Observability ---
+
+@app.get("/health")
+def health():
+    """Liveness: the process is up (the inventory may still be loading)"""
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once the inventory is loaded, 503 while warming up"""
+    if not controller.ready.is_set():
+        detail = f"Warm-up failed: {controller.warmup_error}" if controller.warmup_error else "Warming up"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+    return {"status": "ready", "bins": len(controller.bin_inventory)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Counters, gauges and latency histograms in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+def get_profile(reset: bool = False):
+    """Sampled stacks in collapsed (flame graph) format; needs LOGISTECH_PROFILE_INTERVAL"""
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (set LOGISTECH_PROFILE_INTERVAL)")
+    folded = profiler.folded()
+    if reset:
+        profiler.reset()
+    return folded
 
 # Serve Static Files (Frontend)
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
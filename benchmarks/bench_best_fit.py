@@ -0,0 +1,50 @@
+"""
+Benchmark: free-space index vs. capacity binary search with linear fallback.
+
+Usage: python benchmarks/bench_best_fit.py [num_bins] [num_lookups]
+"""
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from models import StorageBin
+from structures import FreeSpaceIndex
+from algorithms import find_best_fit_bin
+
+def build_bins(num_bins: int, seed: int = 42):
+    rng = random.Random(seed)
+    bins = [StorageBin(i, rng.randint(10, 1000), f"Z{i % 26}") for i in range(num_bins)]
+    bins.sort()
+    # Fill bins so that most of the small ones are already full
+    for b in bins:
+        b.current_load = rng.randint(b.capacity // 2, b.capacity)
+    return bins
+
+def run(label, bins, sizes, index=None):
+    start = time.perf_counter()
+    misses = 0
+    for size in sizes:
+        if find_best_fit_bin(bins, size, index) is None:
+            misses += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(sizes) / elapsed:>12,.0f} lookups/s  ({misses} misses)")
+
+def main():
+    num_bins = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    num_lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    bins = build_bins(num_bins)
+    rng = random.Random(7)
+    sizes = [rng.randint(1, 400) for _ in range(num_lookups)]
+
+    index = FreeSpaceIndex()
+    start = time.perf_counter()
+    index.build(b.free_capacity for b in bins)
+    print(f"Index build for {num_bins:,} bins: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    run("binary search + linear scan", bins, sizes)
+    run("free-space index", bins, sizes, index)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: list of StorageBin objects vs. columnar BinInventory.
+Measures build time (including the capacity sort) and peak memory.
+
+Usage: python benchmarks/bench_inventory.py [num_bins]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from models import StorageBin
+from structures import FreeSpaceIndex
+from inventory import BinInventory
+
+def make_rows(num_bins: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [(i, rng.randint(10, 1000), f"{chr(65 + i % 26)}{i % 50}", 0) for i in range(num_bins)]
+
+def build_objects(rows):
+    bins = [StorageBin(r[0], r[1], r[2]) for r in rows]
+    bins.sort()
+    index = FreeSpaceIndex()
+    index.build(b.free_capacity for b in bins)
+    return bins, index
+
+def build_columns(rows):
+    return BinInventory.from_rows(iter(rows))
+
+def measure(label, build, rows):
+    start = time.perf_counter()
+    build(rows)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = build(rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} build {elapsed * 1000:>8.0f} ms   retained {retained / 2**20:>7.1f} MB   peak {peak / 2**20:>7.1f} MB")
+    return result
+
+def main():
+    num_bins = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows = make_rows(num_bins)
+    print(f"{num_bins:,} bins")
+    measure("StorageBin objects", build_objects, rows)
+    measure("BinInventory columns", build_columns, rows)
+
+if __name__ == "__main__":
+    main()
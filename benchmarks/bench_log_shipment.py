@@ -0,0 +1,34 @@
+"""
+Benchmark: per-row commit shipment logging vs. buffered group commit.
+
+Usage: python benchmarks/bench_log_shipment.py [num_rows]
+"""
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from database import Database
+
+def run(label, num_rows, **settings):
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), **settings)
+    start = time.perf_counter()
+    for i in range(num_rows):
+        db.log_shipment(f"PKG{i}", i % 100, "STORED")
+    db.flush()
+    elapsed = time.perf_counter() - start
+    db.close()
+    print(f"{label:<40} {num_rows / elapsed:>12,.0f} rows/s")
+    return num_rows / elapsed
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    # Previous behaviour: one INSERT + commit (fsync) per row
+    baseline = run("commit per row (DELETE, FULL)", num_rows, journal_mode="DELETE",
+                   synchronous="FULL", log_batch_size=1, log_flush_interval=0)
+    buffered = run("buffered group commit (WAL, NORMAL)", num_rows)
+    print(f"Speedup: {buffered / baseline:.0f}x")
+
+if __name__ == "__main__":
+    main()
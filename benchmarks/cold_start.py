@@ -0,0 +1,75 @@
+"""
+Cold-start time of the API process against inventory size.
+
+For each size a database with that many bins is generated once; then a
+fresh interpreter imports api.py (with LOGISTECH_WARMUP=background) and
+reports how long until the app could bind (import done, /health answers)
+and until the inventory is loaded (/ready), first reading the bins from
+SQLite and then from the binary inventory snapshot that run wrote.
+
+Usage:
+  python benchmarks/cold_start.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(ROOT)
+
+from database import Database
+from workload import Workload
+
+# Runs in the child interpreter; interpreter startup itself is not counted
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+import api
+bound = time.perf_counter()
+api.controller.ready.wait()
+ready = time.perf_counter()
+print(json.dumps({"bind_ms": (bound - start) * 1000, "ready_ms": (ready - start) * 1000}))
+"""
+
+def make_database(path: str, num_bins: int):
+    Database(path, log_flush_interval=0, log_compaction_interval=0).close()
+    conn = sqlite3.connect(path)
+    rows = Workload(num_bins=num_bins).bin_rows()
+    conn.executemany("INSERT INTO bins (bin_id, capacity, location_code, current_load) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def probe(db_path: str, snapshot_path: str = None) -> dict:
+    env = dict(os.environ, LOGISTECH_DB=db_path, LOGISTECH_WARMUP="background",
+               LOGISTECH_LOG_COMPACTION_INTERVAL="0")
+    env.pop("LOGISTECH_INVENTORY_SNAPSHOT", None)
+    if snapshot_path:
+        env["LOGISTECH_INVENTORY_SNAPSHOT"] = snapshot_path
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'bins':>10} {'bind ms':>9} {'ready ms (SQLite)':>18} {'ready ms (snapshot)':>20} {'snapshot MB':>12}")
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp()
+        db_path = os.path.join(workdir, "cold.db")
+        snapshot_path = os.path.join(workdir, "inventory.snap")
+        make_database(db_path, size)
+        from_db = probe(db_path, snapshot_path)      # Loads from SQLite and writes the snapshot
+        from_snapshot = probe(db_path, snapshot_path)
+        print(f"{size:>10,} {from_snapshot['bind_ms']:>9.0f} {from_db['ready_ms']:>18.0f} "
+              f"{from_snapshot['ready_ms']:>20.0f} {os.path.getsize(snapshot_path) / 2**20:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Benchmark suite: throughput, latency percentiles and peak memory of the hot
+paths, on a synthetic workload (see workload.py).
+
+Usage:
+  python benchmarks/run_benchmarks.py [--scale small|medium|large] [--only NAME ...]
+                                      [--repeat 5] [--save FILE] [--compare FILE]
+                                      [--tolerance 0.35] [--p99-tolerance 1.0]
+
+Each benchmark is timed 'repeat' times and the median of each figure is
+reported, since single runs swing by up to 2x on a shared machine.
+--save writes the results as JSON; --compare checks them against an earlier
+file (e.g. benchmarks/baseline.json) and exits with status 1 when a benchmark
+lost more than 'tolerance' of its throughput or its p99 latency grew by more
+than 'p99-tolerance' (tail latencies are noisier, hence the wider margin).
+Even medians drift by about 25% in throughput and 50% in p99 between runs on
+the reference machine, so the defaults leave room for that.
+Only compare against a baseline recorded on the same machine and scale; the
+report warns when the Python version or platform differ.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from typing import Callable, Dict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(ROOT)
+
+from algorithms import find_best_fit_bin, optimize_truck_loading, pack_truck_3d, plan_fleet
+from controller import LogiMaster
+from database import Database
+from inventory import BinInventory
+from workload import SCALES, Workload, populate
+
+# Operations traced for the memory figure; tracemalloc slows code down, so
+# latency is measured in a separate, untraced pass
+MEMORY_SAMPLE_OPS = 500
+# p99 growth smaller than this is scheduler and timer jitter, whatever the ratio
+P99_NOISE_FLOOR_US = 5.0
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+def benchmark(name: str):
+    """Register a context manager that sets up state and yields op(i)"""
+    def register(func):
+        BENCHMARKS[name] = contextmanager(func)
+        return func
+    return register
+
+@contextmanager
+def warehouse(workload: Workload):
+    """Fresh LogiMaster on a temporary database filled with the workload's bins"""
+    previous_db = os.environ.get("LOGISTECH_DB")
+    os.environ["LOGISTECH_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    LogiMaster._instance = None
+    controller = LogiMaster()
+    try:
+        populate(controller.db.conn, workload.bin_rows())
+        controller.load_inventory()
+        yield controller
+    finally:
+        controller.db.close()
+        LogiMaster._instance = None
+        if previous_db is None:
+            del os.environ["LOGISTECH_DB"]
+        else:
+            os.environ["LOGISTECH_DB"] = previous_db
+
+@benchmark("best_fit")
+def bench_best_fit(workload):
+    inventory = BinInventory.from_rows(workload.bin_rows())
+    sizes = workload.package_sizes(workload.operations)
+    yield lambda i: find_best_fit_bin(inventory, sizes[i], inventory.free_index)
+
+@benchmark("best_fit_cached")
+def bench_best_fit_cached(workload):
+    inventory = BinInventory.from_rows(workload.bin_rows())
+    sizes = workload.package_sizes(workload.operations)
+    yield lambda i: find_best_fit_bin(inventory, sizes[i], inventory.best_fit_cache)
+
+@benchmark("optimize_truck_loading")
+def bench_truck_loading(workload):
+    manifests = workload.manifests(64, 25)
+    yield lambda i: optimize_truck_loading(*manifests[i % len(manifests)])
+
+@benchmark("pack_truck_3d")
+def bench_pack_truck_3d(workload):
+    # A 13.6 m trailer and 2,000 cartons per plan
+    manifests = [workload.boxes(2_000, f"boxes{m}") for m in range(4)]
+    yield lambda i: pack_truck_3d((1360, 245, 270), manifests[i % len(manifests)], max_weight=24_000)
+
+@benchmark("plan_fleet")
+def bench_plan_fleet(workload):
+    # 12 dock doors and a pool of 400 packages per plan, in-process (see plan_fleet's 'workers')
+    fleet = workload.fleet()
+    pools = [list(workload.packages(400, f"fleet{m}")) for m in range(4)]
+    yield lambda i: plan_fleet(fleet, pools[i % len(pools)], workers=1)
+
+@benchmark("assign_storage")
+def bench_assign_storage(workload):
+    with warehouse(workload) as controller:
+        packages = list(workload.packages(workload.operations))
+
+        def op(i):
+            controller.process_arrival(packages[i])
+            controller.assign_storage()
+        yield op
+
+@benchmark("load_truck")
+def bench_load_truck(workload):
+    with warehouse(workload) as controller:
+        manifests = workload.manifests(64, 25)
+
+        def op(i):
+            result = controller.load_truck(*manifests[i % len(manifests)])
+            # Unload again so the dock does not grow over the run
+            controller.loading_stack.rollback_load(result.get("count", 0))
+        yield op
+
+@benchmark("log_shipment")
+def bench_log_shipment(workload):
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    try:
+        yield lambda i: db.log_shipment(f"PKG{i:07d}", i % 100, "STORED")
+        db.flush()
+    finally:
+        db.close()
+
+@contextmanager
+def api_client(workload):
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:  # fastapi/httpx not installed
+        yield None
+        return
+    with warehouse(workload) as controller:
+        cwd = os.getcwd()
+        os.chdir(ROOT)  # api.py mounts ./static
+        try:
+            import api
+            api.controller = controller
+            yield TestClient(api.app)
+        finally:
+            os.chdir(cwd)
+
+@benchmark("api_add_and_process")
+def bench_api_add_and_process(workload):
+    with api_client(workload) as client:
+        if client is None:
+            yield None
+            return
+        packages = [{"tracking_id": p.tracking_id, "size": p.size, "destination": p.destination}
+                    for p in workload.packages(workload.operations)]
+
+        def op(i):
+            client.post("/package/add", json=packages[i])
+            client.post("/package/process")
+        yield op
+
+@benchmark("api_status_page")
+def bench_api_status_page(workload):
+    with api_client(workload) as client:
+        if client is None:
+            yield None
+            return
+        pages = max(1, workload.num_bins // 100)
+        yield lambda i: client.get("/status", params={"offset": (i % pages) * 100, "limit": 100})
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def timed_run(setup, workload: Workload):
+    """(ops/sec, p50 us, p99 us) of one pass over fresh state, or None when skipped"""
+    operations = workload.operations
+    with setup(workload) as op:
+        if op is None:
+            return None
+        latencies = [0] * operations
+        clock = time.perf_counter_ns
+        gc.collect()
+        start = clock()
+        for i in range(operations):
+            t0 = clock()
+            op(i)
+            latencies[i] = clock() - t0
+        elapsed = (clock() - start) / 1e9
+    latencies.sort()
+    return (operations / elapsed, percentile(latencies, 0.50) / 1000,
+            percentile(latencies, 0.99) / 1000)
+
+def run_benchmark(name: str, workload: Workload, repeat: int = 1):
+    setup = BENCHMARKS[name]
+    runs = []
+    for _ in range(repeat):
+        run = timed_run(setup, workload)
+        if run is None:
+            return None
+        runs.append(run)
+    ops_per_sec, p50_us, p99_us = (statistics.median(figure) for figure in zip(*runs))
+
+    tracemalloc.start()
+    with setup(workload) as op:
+        for i in range(min(workload.operations, MEMORY_SAMPLE_OPS)):
+            op(i)
+        _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "operations": workload.operations,
+        "ops_per_sec": round(ops_per_sec, 1),
+        "p50_us": round(p50_us, 2),
+        "p99_us": round(p99_us, 2),
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+def git_revision():
+    """Short HEAD hash, marked '-dirty' when the measured code is not committed yet"""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no", "--", "src", "api.py"],
+                                 cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + "-dirty" if changes.strip() else revision
+
+def compare(results, baseline, tolerance, p99_tolerance):
+    """Names of benchmarks that lost throughput or gained p99 latency beyond the tolerances"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            continue
+        throughput = current["ops_per_sec"] / previous["ops_per_sec"]
+        tail = current["p99_us"] / previous["p99_us"] if previous["p99_us"] else 1.0
+        status = "ok"
+        slower_tail = tail > 1 + p99_tolerance and current["p99_us"] - previous["p99_us"] > P99_NOISE_FLOOR_US
+        if throughput < 1 - tolerance or slower_tail:
+            status = "REGRESSION"
+            regressions.append(name)
+        print(f"{name:<26} throughput x{throughput:>5.2f}   p99 x{tail:>5.2f}   {status}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run a subset")
+    parser.add_argument("--package-distribution", default="hot")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark; medians are reported")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check against")
+    parser.add_argument("--tolerance", type=float, default=0.35)
+    parser.add_argument("--p99-tolerance", type=float, default=1.0)
+    args = parser.parse_args()
+
+    workload = Workload.at_scale(args.scale, package_distribution=args.package_distribution, seed=args.seed)
+    print(f"{args.scale}: {workload.num_bins:,} bins, {workload.operations:,} operations per benchmark")
+    print(f"{'benchmark':<26} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak MB':>9}")
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        # The controller still prints per package; keep that out of the report
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            result = run_benchmark(name, workload, max(1, args.repeat))
+        if result is None:
+            print(f"{name:<26} skipped (fastapi/httpx not installed)")
+            continue
+        results[name] = result
+        print(f"{name:<26} {result['ops_per_sec']:>12,.0f} {result['p50_us']:>10.1f} "
+              f"{result['p99_us']:>10.1f} {result['peak_mb']:>9.2f}")
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "repeat": max(1, args.repeat),
+        "workload": {"num_bins": workload.num_bins, "operations": workload.operations,
+                     "package_distribution": workload.package_distribution, "seed": workload.seed},
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.compare} (revision {baseline.get('revision')}, "
+              f"median of {baseline.get('repeat', 1)}):")
+        for key in ("python", "platform", "scale"):
+            if baseline.get(key) != report[key]:
+                print(f"warning: baseline {key} is {baseline.get(key)!r}, this run {report[key]!r}")
+        if compare(results, baseline, args.tolerance, args.p99_tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
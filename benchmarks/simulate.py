@@ -0,0 +1,80 @@
+"""
+Discrete-event warehouse simulation for capacity planning.
+
+Runs a fresh LogiMaster on an in-memory database through a synthetic Poisson
+arrival stream (bins and package sizes from workload.py) or a replay of the
+shipment_logs recorded in a LogisTech database, at simulated time, and
+reports throughput, the bin utilization curve and the drop rate.
+
+Usage:
+  python benchmarks/simulate.py [--bins 100000] [--arrivals 1000000] [--rate 5]
+                                [--dwell 86400] [--service-time 0.1]
+                                [--package-distribution hot] [--save FILE]
+  python benchmarks/simulate.py --replay logistech.db
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(ROOT)
+
+from simulator import Simulation, in_memory_controller, poisson_arrivals, recorded_bins, replay_events
+from workload import BIN_DISTRIBUTIONS, PACKAGE_DISTRIBUTIONS, Workload
+
+# Rows of the utilization curve printed; the saved JSON has all of them
+CURVE_ROWS = 24
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--replay", help="database whose bins and shipment_logs are replayed")
+    parser.add_argument("--bins", type=int, default=100_000)
+    parser.add_argument("--bin-distribution", choices=sorted(BIN_DISTRIBUTIONS), default="racks")
+    parser.add_argument("--package-distribution", choices=sorted(PACKAGE_DISTRIBUTIONS), default="hot")
+    parser.add_argument("--arrivals", type=int, default=1_000_000)
+    parser.add_argument("--rate", type=float, default=5.0, help="arrivals per simulated second")
+    parser.add_argument("--dwell", type=float, default=86_400, help="mean seconds a package stays stored")
+    parser.add_argument("--service-time", type=float, default=0.1, help="conveyor seconds per package")
+    parser.add_argument("--truck-interval", type=float, default=900)
+    parser.add_argument("--sample-interval", type=float, default=3600)
+    parser.add_argument("--until", type=float, default=float("inf"), help="stop at this simulated second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write the report as JSON")
+    args = parser.parse_args()
+
+    # The controller logs every drop and pick batch; keep the report readable
+    logging.basicConfig(level=logging.WARNING)
+    sizes = PACKAGE_DISTRIBUTIONS[args.package_distribution]
+    if args.replay:
+        bins = recorded_bins(args.replay)
+        source = replay_events(args.replay, sizes, seed=args.seed)
+    else:
+        workload = Workload(num_bins=args.bins, operations=args.arrivals, bin_distribution=args.bin_distribution,
+                            package_distribution=args.package_distribution, fill_ratio=0, seed=args.seed)
+        bins = workload.bin_rows()
+        source = poisson_arrivals(args.rate, args.arrivals, sizes, workload.destinations, args.dwell, args.seed)
+
+    with in_memory_controller(bins) as controller:
+        simulation = Simulation(controller, args.service_time, args.truck_interval, args.sample_interval)
+        report = simulation.run(source, args.until)
+
+    print(f"{len(bins):,} bins, {report.arrivals:,} arrivals over {report.simulated_seconds / 3600:,.1f} simulated hours")
+    print(f"{report.events:,} events in {report.wall_seconds:.1f} s: {report.events_per_second:,.0f} events/s, "
+          f"{report.speedup:,.0f}x real time")
+    print(f"stored {report.stored:,}, dropped {report.dropped:,} ({report.drop_rate:.2%}), picked {report.picked:,}, "
+          f"max conveyor depth {report.max_queue_depth:,}")
+    print(f"\n{'hour':>8} {'utilization':>12} {'conveyor':>9}")
+    step = max(1, len(report.utilization) // CURVE_ROWS)
+    for at, utilization, depth in report.utilization[::step]:
+        print(f"{at / 3600:>8.1f} {utilization:>12.1%} {depth:>9,}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report.as_dict(), f, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
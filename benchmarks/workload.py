@@ -0,0 +1,120 @@
+"""
+Synthetic warehouse workloads: bin layouts and package arrival streams.
+Everything is driven by a seed, so the same Workload always produces the
+same bins and packages and benchmark runs stay comparable.
+"""
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from models import Package, Truck
+
+SizeSampler = Callable[[random.Random], int]
+
+def uniform_sizes(low: int, high: int) -> SizeSampler:
+    return lambda rng: rng.randint(low, high)
+
+def hot_sizes(sizes: List[int], hot_share: float, low: int, high: int) -> SizeSampler:
+    """A few standard carton sizes make up 'hot_share' of the traffic, the rest is uniform"""
+    return lambda rng: rng.choice(sizes) if rng.random() < hot_share else rng.randint(low, high)
+
+def bimodal_sizes(small: Tuple[int, int], large: Tuple[int, int], large_share: float) -> SizeSampler:
+    """Mostly parcels, with an occasional oversized item"""
+    def sample(rng):
+        low, high = large if rng.random() < large_share else small
+        return rng.randint(low, high)
+    return sample
+
+PACKAGE_DISTRIBUTIONS: Dict[str, SizeSampler] = {
+    "uniform": uniform_sizes(1, 200),
+    "hot": hot_sizes([10, 25, 40, 60], 0.8, 1, 200),
+    "bimodal": bimodal_sizes((1, 60), (150, 400), 0.1),
+}
+
+BIN_DISTRIBUTIONS: Dict[str, SizeSampler] = {
+    "uniform": uniform_sizes(10, 1000),
+    "racks": hot_sizes([100, 250, 500, 1000], 0.9, 10, 1000),
+}
+
+DESTINATIONS = ["NYC", "LAX", "CHI", "HOU", "PHX", "SEA", "MIA", "BOS"]
+
+# name -> (bins, operations per benchmark)
+SCALES = {
+    "small": (1_000, 2_000),
+    "medium": (20_000, 10_000),
+    "large": (200_000, 50_000),
+}
+
+@dataclass
+class Workload:
+    num_bins: int = 1_000
+    operations: int = 2_000
+    bin_distribution: str = "uniform"
+    package_distribution: str = "hot"
+    zones: int = 8
+    fill_ratio: float = 0.3  # Share of each bin already occupied before the run
+    seed: int = 42
+    destinations: List[str] = field(default_factory=lambda: list(DESTINATIONS))
+
+    @classmethod
+    def at_scale(cls, scale: str, **overrides) -> "Workload":
+        num_bins, operations = SCALES[scale]
+        return cls(num_bins=num_bins, operations=operations, **overrides)
+
+    def rng(self, stream: str) -> random.Random:
+        # One independent generator per stream, so adding a benchmark does not shift the others
+        return random.Random(f"{self.seed}:{stream}")
+
+    def bin_rows(self) -> List[Tuple[int, int, str, int]]:
+        """(bin_id, capacity, location_code, current_load) rows"""
+        rng = self.rng("bins")
+        sample = BIN_DISTRIBUTIONS[self.bin_distribution]
+        rows = []
+        for bin_id in range(1, self.num_bins + 1):
+            capacity = sample(rng)
+            zone = chr(ord('A') + bin_id % self.zones)
+            load = int(capacity * rng.uniform(0, 2 * self.fill_ratio)) if self.fill_ratio else 0
+            rows.append((bin_id, capacity, f"{zone}{bin_id // self.zones}", min(load, capacity)))
+        return rows
+
+    def package_sizes(self, count: int, stream: str = "packages") -> List[int]:
+        rng = self.rng(stream)
+        sample = PACKAGE_DISTRIBUTIONS[self.package_distribution]
+        return [sample(rng) for _ in range(count)]
+
+    def packages(self, count: int, stream: str = "packages") -> Iterator[Package]:
+        """Arrival stream of 'count' packages with unique tracking ids"""
+        rng = self.rng(stream + ":destinations")
+        for i, size in enumerate(self.package_sizes(count, stream)):
+            yield Package(f"{stream[:3].upper()}{i:07d}", size, rng.choice(self.destinations))
+
+    def boxes(self, count: int, stream: str = "boxes") -> List[Package]:
+        """Packages with (length, width, height) in cm and weight in kg, for the 3-D model"""
+        rng = self.rng(stream)
+        return [Package(f"BOX{i:07d}", 0, rng.choice(self.destinations),
+                        (rng.randint(20, 120), rng.randint(20, 80), rng.randint(10, 60)), rng.randint(1, 30))
+                for i in range(count)]
+
+    def manifests(self, count: int, items: int, stream: str = "manifests") -> List[Tuple[int, List[Package]]]:
+        """'count' truck manifests of 'items' packages, capacity about 60% of the total size"""
+        rng = self.rng(stream)
+        result = []
+        for m in range(count):
+            packages = list(self.packages(items, f"{stream}{m}"))
+            total = sum(p.size for p in packages)
+            result.append((int(total * rng.uniform(0.5, 0.7)), packages))
+        return result
+
+    def fleet(self, doors: int = 12, capacity: int = 2_000) -> List[Truck]:
+        """One truck per dock door: one route per destination first, the rest take any destination"""
+        return [Truck(f"T{door:02d}", capacity,
+                      (self.destinations[door - 1],) if door <= len(self.destinations) else (), door)
+                for door in range(1, doors + 1)]
+
+def populate(conn, rows):
+    """Insert generated bin rows into a database connection"""
+    conn.executemany("INSERT INTO bins (bin_id, capacity, location_code, current_load) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
@@ -1,17 +1,34 @@
-from typing import List, Optional
-from models import StorageBin, Package
-import bisect
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import permutations
+from math import gcd
+from typing import Callable, Dict, List, Optional, Tuple
+import multiprocessing
+import os
+import time
+from models import Dimensions, StorageBin, Package, Truck
+from structures import FreeSpaceIndex
+from inventory import BinInventory, PackageLocations
+from metrics import TRUCK_PLAN_SECONDS
 
-def find_best_fit_bin(bins: List[StorageBin], package_size: int) -> Optional[StorageBin]:
+def find_best_fit_bin(bins: List[StorageBin], package_size: int,
+                      index: Optional[FreeSpaceIndex] = None) -> Optional[StorageBin]:
     """
-    Uses Binary Search to find the smallest bin that fits the package.
+    Finds the bin with room for the package.
+    With a FreeSpaceIndex (slots = positions in 'bins') this is an O(log n)
+    lookup of the bin with the least remaining free space that still fits;
+    a BestFitCache can stand in for the index to answer repeat sizes in O(1).
+    Without one, falls back to a Binary Search on capacity (smaller bins can
+    never fit) followed by a linear scan of the rest for the same answer the
+    index gives: least free space that fits, earliest position on ties.
     Assumes 'bins' is sorted by capacity.
     """
-    # We want to find the first bin such that bin.capacity >= package_size
-    # Since we can't use a custom key with bisect_left directly on objects in older python versions easily without a key wrapper,
-    # but here we can assume Python 3.10+ or just use a helper list of capacities if needed.
-    # However, let's implement the binary search manually to be explicit and robust and avoid overhead of creating key lists.
-    
+    if index is not None:
+        slot = index.best_fit(package_size)
+        return bins[slot] if slot is not None else None
+
+    # Binary search for the first bin such that bin.capacity >= package_size
     low = 0
     high = len(bins) - 1
     best_fit_index = -1
@@ -24,50 +41,605 @@ def find_best_fit_bin(bins: List[StorageBin], package_size: int) -> Optional[Sto
         else:
             low = mid + 1   # Bin is too small, look in the right half
 
-    if best_fit_index != -1:
-        return bins[best_fit_index]
+    if best_fit_index == -1:
+        return None
+
+    # Capacity alone ignores current_load: a bigger, fuller bin can be a tighter fit
+    best, best_free = None, None
+    for i in range(best_fit_index, len(bins)):
+        free = bins[i].capacity - bins[i].current_load
+        if package_size <= free and (best_free is None or free < best_free):
+            best, best_free = bins[i], free
+            if free == package_size:
+                break
+    return best
+
+class TruckLoadSolver(ABC):
+    """
+    Engine for the truck loading problem (0/1 Subset Sum): pick the subset of
+    packages whose total size is as close as possible to the truck capacity
+    without exceeding it.
+    """
+    def __init__(self, time_limit: Optional[float] = None):
+        # Seconds an engine may spend before returning its best load so far.
+        # Engines with a bounded running time may ignore it.
+        self.time_limit = time_limit
+
+    @abstractmethod
+    def solve(self, truck_capacity: int, packages: List[Package]) -> List[Package]:
+        pass
+
+def size_divisor(truck_capacity: int, packages: List[Package]) -> int:
+    """
+    Greatest common divisor of the package sizes that fit. Every load is a
+    multiple of it, so engines can count in these units (and never aim for
+    more than the largest multiple of it within the capacity).
+    """
+    return gcd(*(p.size for p in packages if 0 < p.size <= truck_capacity)) or 1
+
+class DPSubsetSumSolver(TruckLoadSolver):
+    """
+    Dynamic Programming over integer capacities.
+    Reachable load totals are kept as a bitset (a Python int, bit s set means
+    total s is reachable), so adding a package is a single shift-or.
+    Sizes are counted in units of their common divisor (see size_divisor).
+    Exact, O(n * capacity / divisor / word size) time and memory.
+    """
+    def solve(self, truck_capacity: int, packages: List[Package]) -> List[Package]:
+        unit = size_divisor(truck_capacity, packages)
+        capacity = truck_capacity // unit
+        mask = (1 << (capacity + 1)) - 1
+        reachable = 1  # Only the empty load (total 0) to begin with
+        history = []   # history[i] = reachable totals before packages[i]
+        for pkg in packages:
+            history.append(reachable)
+            if 0 <= pkg.size <= truck_capacity:
+                reachable = (reachable | (reachable << pkg.size // unit)) & mask
+
+        # Walk back from the heaviest reachable total to recover the subset
+        target = reachable.bit_length() - 1
+        chosen = []
+        for i in range(len(packages) - 1, -1, -1):
+            if not (history[i] >> target) & 1:
+                # Not reachable without packages[i], so it must be on the truck
+                chosen.append(packages[i])
+                target -= packages[i].size // unit
+        chosen.reverse()
+        return chosen
+
+class BranchAndBoundSolver(TruckLoadSolver):
+    """
+    Iterative Branch and Bound (explicit stack, no recursion limit).
+    Packages are explored largest first; a branch is pruned when its load plus
+    everything still undecided cannot beat the best load found so far.
+    With a time_limit it runs as an anytime search and returns the best load
+    found before the deadline.
+    """
+    def solve(self, truck_capacity: int, packages: List[Package]) -> List[Package]:
+        order = sorted((i for i, p in enumerate(packages) if 0 <= p.size <= truck_capacity),
+                       key=lambda i: packages[i].size, reverse=True)
+        sizes = [packages[i].size for i in order]
+        n = len(sizes)
+        # No load can exceed the largest multiple of the sizes' divisor, so stop there
+        full = truck_capacity - truck_capacity % size_divisor(truck_capacity, packages)
+
+        # remaining[k] = total size of sizes[k:], the upper bound for a branch at depth k
+        remaining = [0] * (n + 1)
+        for k in range(n - 1, -1, -1):
+            remaining[k] = remaining[k + 1] + sizes[k]
+
+        # Seed with the greedy First-Fit-Decreasing load.
+        # Chosen positions are kept as a linked tuple (depth, rest) so pushing is O(1).
+        best_load, best_taken = 0, ()
+        for k in range(n):
+            if best_load + sizes[k] <= truck_capacity:
+                best_load += sizes[k]
+                best_taken = (k, best_taken)
+
+        deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+        stack = [(0, 0, ())]  # (depth, load, taken)
+        nodes = 0
+        while stack and best_load < full:
+            depth, load, taken = stack.pop()
+            if depth == n or load + remaining[depth] <= best_load:
+                continue  # Bound: this branch cannot improve on the best load
+            nodes += 1
+            if deadline is not None and nodes % 1024 == 0 and time.perf_counter() > deadline:
+                break
+            # Push "skip" first so that "take" is explored first (depth-first)
+            stack.append((depth + 1, load, taken))
+            new_load = load + sizes[depth]
+            if new_load <= truck_capacity:
+                if new_load > best_load:
+                    best_load, best_taken = new_load, (depth, taken)
+                stack.append((depth + 1, new_load, (depth, taken)))
+
+        chosen = set()
+        while best_taken:
+            depth, best_taken = best_taken
+            chosen.add(order[depth])
+        return [p for i, p in enumerate(packages) if i in chosen]
+
+# Largest n * capacity (in bits of DP state) we solve exactly with the DP engine
+DP_BIT_BUDGET = 1 << 27
+
+# Seconds "auto" gives Branch and Bound when it picks it for a manifest too big
+# for the DP, so one request can never search for minutes
+AUTO_TIME_LIMIT = 0.5
+
+SOLVERS: Dict[str, Callable[..., TruckLoadSolver]] = {
+    "dp": DPSubsetSumSolver,
+    "bnb": BranchAndBoundSolver,
+}
+
+def register_solver(name: str, factory: Callable[..., TruckLoadSolver]):
+    """
+    Plug in a custom engine, usable as optimize_truck_loading(..., engine=name).
+    'factory' is called with a time_limit keyword argument.
+    """
+    SOLVERS[name] = factory
+
+def get_solver(truck_capacity: int, packages: List[Package], engine: str = "auto",
+               time_limit: Optional[float] = None) -> TruckLoadSolver:
+    if engine == "auto":
+        # Exact DP while its bitsets stay small, time-boxed Branch and Bound for
+        # huge capacities or when the caller wants an anytime answer
+        units = truck_capacity // size_divisor(truck_capacity, packages)
+        if len(packages) * (units + 1) <= DP_BIT_BUDGET and time_limit is None:
+            engine = "dp"
+        else:
+            engine = "bnb"
+            if time_limit is None:
+                time_limit = AUTO_TIME_LIMIT
+    if engine not in SOLVERS:
+        raise ValueError(f"Unknown truck loading engine: {engine}")
+    return SOLVERS[engine](time_limit=time_limit)
+
+def solve_truck_loading(truck_capacity: int, packages: List[Package], engine: str = "auto",
+                        time_limit: Optional[float] = None) -> Tuple[Optional[List[Package]], str, float]:
+    """
+    optimize_truck_loading without recording metrics: (load, engine class
+    name, seconds). Pool processes use it and hand the timing back, since
+    metrics recorded in a child process never reach /metrics.
+    """
+    if truck_capacity < 0:
+        return None, "", 0.0
+    solver = get_solver(truck_capacity, packages, engine, time_limit)
+    start = time.perf_counter()
+    load = solver.solve(truck_capacity, packages)
+    return load, type(solver).__name__, time.perf_counter() - start
+
+def optimize_truck_loading(truck_capacity: int, packages: List[Package],
+                           engine: str = "auto", time_limit: Optional[float] = None) -> Optional[List[Package]]:
+    """
+    Finds the subset of packages that fills the truck as much as possible
+    (0/1 Subset Sum). Returns the chosen packages in their original order.
+
+    engine: "dp" (exact, integer capacities), "bnb" (Branch and Bound for large
+    capacities), a name added via register_solver, or "auto" to pick by size
+    (Branch and Bound then gets AUTO_TIME_LIMIT seconds unless 'time_limit'
+    is given).
+    time_limit: seconds; switches to anytime Branch and Bound returning the
+    best load found so far.
+    """
+    load, engine_name, seconds = solve_truck_loading(truck_capacity, packages, engine, time_limit)
+    if engine_name:
+        TRUCK_PLAN_SECONDS.observe(seconds, engine=engine_name)
+    return load
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for planning. Its workers start from a fresh interpreter
+    ("forkserver", or "spawn" where that is missing), never as a fork of
+    this process: the API process runs flusher, checkpoint and request
+    threads, and a fork could inherit one of their locks held forever.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+# --- Incremental re-planning ---
+
+@dataclass
+class LoadDiff:
+    """Turn the truck's current stack into a new plan: rollback_load(pops), then load 'pushes' in order"""
+    pops: int
+    pushes: List[Package]
+    load: int  # Total size on the truck afterwards
+
+class IncrementalTruckPlan:
+    """
+    Live plan for one truck whose manifest keeps changing.
+    The reachability bitsets of DPSubsetSumSolver are kept between edits in
+    two chains: one over the whole manifest in the order packages were added
+    (for the best possible load) and one over the 'loose' packages, those
+    not in the part of the stack that stays put (stack[:fixed]). Adding a
+    package is one shift-or per chain; removing one recomputes only the
+    bitsets after it, so recent additions are the cheapest to drop.
+
+    replan() returns the LoadDiff with the fewest pops among the loads that
+    fill the truck as much as possible. It starts from the loose chain and
+    puts stack packages back into play one pop at a time, so its work grows
+    with the number of pops rather than with the manifest.
+    """
+    def __init__(self, truck_capacity: int, stack: List[Package] = ()):
+        self.capacity = truck_capacity
+        self._mask = (1 << (truck_capacity + 1)) - 1
+        self.order: List[Package] = []  # Manifest, in the order packages were added
+        self._history = [1]             # _history[i] = reachable totals of order[:i]
+        self.loose: List[Package] = []  # Manifest minus stack[:fixed]
+        self._loose = [1]               # _loose[i] = reachable totals of loose[:i]
+        self._ids: Dict[str, Package] = {}
+        for package in stack:
+            self.add(package)
+        self.stack: List[Package] = list(stack)  # What is on the truck, bottom to top
+        self.fixed = len(self.stack)
+        self.loose, self._loose = [], [1]
+
+    def _shift(self, reachable: int, package: Package) -> int:
+        if 0 <= package.size <= self.capacity:
+            return (reachable | (reachable << package.size)) & self._mask
+        return reachable
+
+    def _extend(self, chain: List[int], packages: List[Package]):
+        reachable = chain[-1]
+        for package in packages:
+            reachable = self._shift(reachable, package)
+            chain.append(reachable)
+
+    @staticmethod
+    def _position(packages: List[Package], package: Package) -> int:
+        return next((i for i, p in enumerate(packages) if p is package), -1)
+
+    def __contains__(self, tracking_id: str) -> bool:
+        return tracking_id in self._ids
+
+    def add(self, package: Package):
+        if package.tracking_id in self._ids:
+            raise ValueError(f"Package {package.tracking_id} is already on the manifest")
+        self._ids[package.tracking_id] = package
+        self.order.append(package)
+        self._history.append(self._shift(self._history[-1], package))
+        self.loose.append(package)
+        self._loose.append(self._shift(self._loose[-1], package))
+
+    def remove(self, tracking_id: str):
+        package = self._ids.pop(tracking_id)
+        position = self._position(self.order, package)
+        del self.order[position]
+        del self._history[position + 1:]
+        self._extend(self._history, self.order[position:])
+
+        depth = self._position(self.stack[:self.fixed], package)
+        if depth >= 0:
+            # It has to come off the truck, so nothing above it stays put
+            released = self.stack[depth + 1:self.fixed]
+            self.fixed = depth
+            self.loose.extend(released)
+            self._extend(self._loose, released)
+        else:
+            position = self._position(self.loose, package)
+            del self.loose[position]
+            del self._loose[position + 1:]
+            self._extend(self._loose, self.loose[position:])
+
+    def best_load(self) -> int:
+        return self._history[-1].bit_length() - 1
+
+    def replan(self) -> LoadDiff:
+        best = self.best_load()
+        prefix_loads = [0]
+        for package in self.stack[:self.fixed]:
+            prefix_loads.append(prefix_loads[-1] + package.size)
+
+        # reachable = totals of the packages above a kept prefix of length 'keep'
+        keep = self.fixed
+        added = list(self.loose)     # Packages in the order they entered 'reachable'
+        history = self._loose[:-1]   # history[i] = reachable before added[i]
+        reachable = self._loose[-1]
+        while True:
+            room = self.capacity - prefix_loads[keep]
+            if room >= 0:
+                target = (reachable & ((1 << (room + 1)) - 1)).bit_length() - 1
+                if prefix_loads[keep] + target == best:
+                    break
+            keep -= 1
+            history.append(reachable)
+            added.append(self.stack[keep])
+            reachable = self._shift(reachable, self.stack[keep])
+
+        chosen = set()
+        for i in range(len(added) - 1, -1, -1):
+            if not (history[i] >> target) & 1:
+                chosen.add(id(added[i]))
+                target -= added[i].size
+        pushes = [p for p in added if id(p) in chosen]
+        return LoadDiff(len(self.stack) - keep, pushes, best)
+
+    def applied(self, diff: LoadDiff):
+        """Record that the dock carried out 'diff'"""
+        keep = len(self.stack) - diff.pops
+        pushed = {id(p) for p in diff.pushes}
+        # Loose packages keep their order (and their chain up to the first one
+        # pushed); popped packages that stay off the truck go to the end
+        first = next((i for i, p in enumerate(self.loose) if id(p) in pushed), len(self.loose))
+        rest = [p for p in self.loose[first:] + self.stack[keep:self.fixed] if id(p) not in pushed]
+        del self.loose[first:]
+        del self._loose[first + 1:]
+        self.loose.extend(rest)
+        self._extend(self._loose, rest)
+        self.stack = self.stack[:keep] + diff.pushes
+        self.fixed = len(self.stack)
+
+# --- Defragmentation ---
+
+@dataclass
+class Move:
+    tracking_id: str
+    size: int
+    from_bin: int
+    to_bin: int
+
+def _find_destination(index: FreeSpaceIndex, size: int, exclude: int, reserved: Dict[int, int]) -> Optional[int]:
+    """Tightest slot other than 'exclude' with room for 'size' once 'reserved' space is taken off"""
+    key = index.best_fit_key(size)
+    while key is not None:
+        slot = key & FreeSpaceIndex.SLOT_MASK
+        if slot != exclude and (key >> FreeSpaceIndex.SLOT_BITS) - reserved.get(slot, 0) >= size:
+            return slot
+        key = index.key_after(key)
     return None
 
-def optimize_truck_loading(truck_capacity: int, packages: List[Package]) -> Optional[List[Package]]:
-    """
-    Uses Backtracking to find a subset of packages that fits into the truck.
-    Returns the list of packages if a valid combination is found, else None.
-    This is a variation of the Subset Sum problem / Knapsack.
-    For this specific requirement: "if they don't fit, backtrack".
-    We will try to fit as many as possible or a specific set. 
-    Let's interpret the requirement: "calculate if a specific set of packages can fit... if not backtrack".
-    Actually, the prompt says: "Recursively try to fit Package A... If truck overflows, Backtrack... try skipping to Package C".
-    This implies finding *any* valid combination that maximizes usage or just fits a sequence?
-    Let's implement a standard backtracking to find a combination that fits.
-    """
-    
-    valid_combination = []
-    
-    def backtrack(start_index, current_load, current_path):
-        if current_load <= truck_capacity:
-            # We found a valid state. We can keep trying to add more, 
-            # or if we have a specific target (like "all fragile bundles"), we check that.
-            # For this generic "optimize" function, let's try to fit as many as possible?
-            # Or simply return the first valid combination that is "maximal" in some sense?
-            # Let's stick to the prompt's logic: Try A, then B. If fail, remove B, try C.
-            
-            # If we are at the end of the list, or just want to return this valid path:
-            if start_index == len(packages):
-                return list(current_path)
-            
-            # Try adding the next package
-            pkg = packages[start_index]
-            if current_load + pkg.size <= truck_capacity:
-                current_path.append(pkg)
-                result = backtrack(start_index + 1, current_load + pkg.size, current_path)
-                if result: return result
-                current_path.pop() # Backtrack
-            
-            # Skip the current package and try the next one
-            return backtrack(start_index + 1, current_load, current_path)
-            
-        return None
+def plan_defragmentation(inventory: BinInventory, locations: PackageLocations, target_size: int,
+                         max_moves: int = 50, max_candidates: int = 32) -> List[Move]:
+    """
+    Fewest package moves that open 'target_size' of free space in one bin.
+    The 'max_candidates' bins with the most free space among those large
+    enough are tried; for each, its largest packages are moved out first
+    (the k largest free the most space that k moves can), each to the
+    tightest other bin that fits it. The candidate needing the fewest moves
+    wins. Returns [] when the space already exists or no plan within
+    'max_moves' does. Only the 1-D model is handled: with bin dimensions
+    or weight limits a move would need the 3-D checks.
+    """
+    if inventory.dimensional or inventory.best_fit(target_size) is not None:
+        return []
+    index = inventory.free_index
+    best: Optional[List[Move]] = None
+    tried = 0
+    for free, slot in reversed(index.ordered()):
+        if tried >= max_candidates:
+            break
+        source = inventory[slot]
+        if source.capacity < target_size:
+            continue
+        tried += 1
+        needed = target_size - free
+        reserved: Dict[int, int] = {}
+        moves, freed = [], 0
+        for tracking_id, size, _ in sorted(locations.contents(source.bin_id), key=lambda c: c[1], reverse=True):
+            if freed >= needed or len(moves) >= max_moves or (best is not None and len(moves) >= len(best) - 1):
+                break
+            destination = _find_destination(index, size, slot, reserved)
+            if destination is None:
+                continue
+            reserved[destination] = reserved.get(destination, 0) + size
+            moves.append(Move(tracking_id, size, source.bin_id, inventory[destination].bin_id))
+            freed += size
+        if freed >= needed and (best is None or len(moves) < len(best)):
+            best = moves
+            if len(best) == 1:
+                break
+    return best or []
+
+# --- Fleet planning ---
+
+# Below this many packages a fleet is planned in-process: starting worker
+# processes costs more than the solves themselves
+FLEET_PARALLEL_MIN_PACKAGES = 20_000
+
+@dataclass
+class FleetPlan:
+    loads: Dict[str, List[Package]] = field(default_factory=dict)  # truck_id -> packages in loading order
+    unassigned: List[Package] = field(default_factory=list)
+
+def _fleet_components(trucks: List[Truck], packages: List[Package]) -> List[Tuple[List[Truck], List[Package]]]:
+    """
+    Split a fleet into groups that share no destination, as (trucks, packages).
+    Trucks in different groups never compete for a package, so each group can
+    be planned on its own. A truck without a route joins every destination.
+    """
+    parent: Dict[object, object] = {}
+
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        parent[node] = root
+        return root
+
+    def union(a, b):
+        parent[find(a)] = find(b)
+
+    destinations = {p.destination for p in packages}
+    for truck in trucks:
+        route = truck.destinations or destinations
+        find(("truck", truck.truck_id))
+        for destination in route:
+            union(("truck", truck.truck_id), ("dest", destination))
+
+    groups: Dict[object, Tuple[List[Truck], List[Package]]] = {}
+    for truck in trucks:
+        groups.setdefault(find(("truck", truck.truck_id)), ([], []))[0].append(truck)
+    for package in packages:
+        node = ("dest", package.destination)
+        if node in parent and find(node) in groups:
+            groups[find(node)][1].append(package)
+    return list(groups.values())
+
+def _plan_component(trucks: List[Truck], packages: List[Package], engine: str,
+                    time_limit: Optional[float]) -> Tuple[List[Tuple[str, List[int]]], List[Tuple[str, float]]]:
+    """
+    Fill the trucks of one group one after another, each with the best subset
+    of what is left for its route. Trucks with the narrowest routes go first,
+    since they have the fewest packages to choose from.
+    Returns (truck_id, positions in 'packages') pairs, plus the (engine,
+    seconds) of each solve for the caller to record (it may run in a pool).
+    """
+    remaining = set(range(len(packages)))
+    result, timings = [], []
+    for truck in sorted(trucks, key=lambda t: (not t.destinations, len(t.destinations), -t.capacity)):
+        pool = [i for i in sorted(remaining) if truck.serves(packages[i].destination)]
+        load, engine_name, seconds = solve_truck_loading(truck.capacity, [packages[i] for i in pool], engine, time_limit)
+        if engine_name:
+            timings.append((engine_name, seconds))
+        chosen = {id(p) for p in load or ()}
+        taken = [i for i in pool if id(packages[i]) in chosen]
+        remaining.difference_update(taken)
+        result.append((truck.truck_id, taken))
+    return result, timings
+
+def plan_fleet(trucks: List[Truck], packages: List[Package], engine: str = "auto",
+               time_limit: Optional[float] = None, workers: Optional[int] = None,
+               pool: Optional[Executor] = None) -> FleetPlan:
+    """
+    Assign a package pool to a fleet of trucks (bin packing across trucks,
+    grouped by Package.destination). The fleet is split into groups of trucks
+    whose routes share no destination; groups are independent subproblems and
+    are solved in parallel on a process pool, each truck with the
+    optimize_truck_loading engines.
+
+    workers: processes to use (1 = plan in this process); by default the pool
+    is only used for large pools with more than one group.
+    pool: executor to run the groups on (e.g. PlanningJobs.executor());
+    without one a process_pool is started for the call.
+    Packages no truck could take end up in 'unassigned'.
+    """
+    components = [c for c in _fleet_components(trucks, packages) if c[1]]
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(packages) >= FLEET_PARALLEL_MIN_PACKAGES else 1
+    workers = min(workers, len(components))
+
+    with TRUCK_PLAN_SECONDS.time(engine="Fleet"):
+        if workers > 1 and pool is not None:
+            futures = [pool.submit(_plan_component, t, p, engine, time_limit) for t, p in components]
+            results = [f.result() for f in futures]
+        elif workers > 1:
+            with process_pool(workers) as own_pool:
+                futures = [own_pool.submit(_plan_component, t, p, engine, time_limit) for t, p in components]
+                results = [f.result() for f in futures]
+        else:
+            results = [_plan_component(t, p, engine, time_limit) for t, p in components]
+
+    plan = FleetPlan(loads={truck.truck_id: [] for truck in trucks})
+    assigned = set()
+    for (_, component_packages), (loads, timings) in zip(components, results):
+        for engine_name, seconds in timings:
+            TRUCK_PLAN_SECONDS.observe(seconds, engine=engine_name)
+        for truck_id, positions in loads:
+            plan.loads[truck_id] = [component_packages[i] for i in positions]
+            assigned.update(id(component_packages[i]) for i in positions)
+    plan.unassigned = [p for p in packages if id(p) not in assigned]
+    return plan
+
+# --- 3-D truck packing ---
+
+@dataclass
+class Placement:
+    """Where a package sits in the truck: offsets from the back-left-floor corner and its oriented size"""
+    package: Package
+    x: int  # along the length, 0 = back wall of the truck
+    y: int  # across the width
+    z: int  # height above the floor
+    length: int
+    width: int
+    height: int
+
+class _Wall:
+    """Slice of the truck across its full width and height, filled with shelves"""
+    __slots__ = ("x", "depth", "shelves", "used_height")
+
+    def __init__(self, x: int, depth: int):
+        self.x = x
+        self.depth = depth
+        self.shelves = []  # [z, height, used_width]
+        self.used_height = 0
+
+def pack_truck_3d(truck_dimensions: Dimensions, packages: List[Package], max_weight: int = 0,
+                  open_walls: int = 3) -> List[Placement]:
+    """
+    Wall-building first-fit-decreasing heuristic for loading boxes into a truck.
+    Packages are taken largest first. The truck fills from the back in walls
+    (slices across the whole width and height, as deep as the box that opens
+    them); each wall is filled with shelves stacked from the floor, and each
+    shelf with boxes side by side. A box goes into the first shelf of the last
+    'open_walls' walls it fits in, in any orientation, else onto a new shelf,
+    else it opens a new wall. Runs in O(n log n + n * shelves per wall), so
+    thousands of boxes plan in well under a second.
+
+    Packages without dimensions, too big for any free slot, or over the
+    remaining 'max_weight' (0 = no limit) are left out. Returns placements back
+    to front, i.e. in loading order for the LIFO dock.
+    """
+    truck_length, truck_width, truck_height = truck_dimensions
+    boxes = sorted((p for p in packages if p.dimensions),
+                   key=lambda p: (max(p.dimensions), p.volume), reverse=True)
+    walls: List[_Wall] = []
+    placements: List[Placement] = []
+    used_length = 0
+    total_weight = 0
+
+    with TRUCK_PLAN_SECONDS.time(engine="Wall3D"):
+        for package in boxes:
+            if max_weight and total_weight + package.weight > max_weight:
+                continue
+            orientations = set(permutations(package.dimensions))  # (length, width, height)
+            smallest = min(package.dimensions)
+            placement = None
+
+            for wall in walls[-open_walls:]:
+                if wall.depth < smallest:
+                    continue
+                # Existing shelves: the narrowest orientation leaves the most room beside it
+                for shelf in wall.shelves:
+                    z, shelf_height, used_width = shelf
+                    room = truck_width - used_width
+                    if room < smallest or shelf_height < smallest:
+                        continue
+                    fits = [o for o in orientations
+                            if o[0] <= wall.depth and o[1] <= room and o[2] <= shelf_height]
+                    if fits:
+                        d, w, h = min(fits, key=lambda o: (o[1], -o[2]))
+                        placement = Placement(package, wall.x, used_width, z, d, w, h)
+                        shelf[2] += w
+                        break
+                if placement:
+                    break
+                # New shelf on top: the flattest orientation wastes the least height
+                headroom = truck_height - wall.used_height
+                fits = [o for o in orientations if o[0] <= wall.depth and o[1] <= truck_width and o[2] <= headroom]
+                if fits:
+                    d, w, h = min(fits, key=lambda o: (o[2], o[1]))
+                    placement = Placement(package, wall.x, 0, wall.used_height, d, w, h)
+                    wall.shelves.append([wall.used_height, h, w])
+                    wall.used_height += h
+                    break
+
+            if placement is None:
+                # New wall: as deep as the box's longest side, so later boxes fit its depth
+                fits = [o for o in orientations if o[0] <= truck_length - used_length
+                        and o[1] <= truck_width and o[2] <= truck_height]
+                if not fits:
+                    continue
+                d, w, h = max(fits, key=lambda o: (o[0], -o[2]))
+                wall = _Wall(used_length, d)
+                wall.shelves.append([0, h, w])
+                wall.used_height = h
+                walls.append(wall)
+                used_length += d
+                placement = Placement(package, wall.x, 0, 0, d, w, h)
+
+            placements.append(placement)
+            total_weight += package.weight
 
-    # To make it interesting, let's try to fit as many items as possible from the start
-    # The prompt describes a specific flow: Try A, then B...
-    return backtrack(0, 0, [])
+    placements.sort(key=lambda p: (p.x, p.z, p.y))
+    return placements
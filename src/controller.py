@@ -1,93 +1,921 @@
-from typing import List
-from models import StorageBin, Package
-from structures import ConveyorBelt, LoadingDock
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Optional, TextIO
+import logging
+import os
+import threading
+import time
+from models import StorageUnit, Package, Truck
+from structures import (BestFitCache, ConveyorBelt, JournaledConveyorBelt, JournaledLoadingDock, LoadingDock,
+                        PriorityConveyor, SharedConveyorBelt, SharedLoadingDock, FreeSpaceIndex, package_row)
+from inventory import BinInventory, InventoryShard, PackageLocations
 from database import Database
-from algorithms import find_best_fit_bin, optimize_truck_loading
+from importer import parse_bins
+from planner import PlanningJobs
+from algorithms import IncrementalTruckPlan, Move, find_best_fit_bin, optimize_truck_loading, pack_truck_3d, plan_defragmentation, plan_fleet
+from models import Dimensions
+from metrics import (ASSIGNMENT_FAILURES, BEST_FIT_CACHE, BEST_FIT_SECONDS, BIN_UTILIZATION, BINS_IMPORTED,
+                     DEFRAG_MOVES, LANE_DEPTH, PACKAGES_PICKED, PACKAGES_STORED, QUEUE_DEPTH, QUEUE_OP_SECONDS,
+                     ZONE_UTILIZATION)
+
+logger = logging.getLogger(__name__)
+
+# Hot-path series, bound once
+CONVEYOR_PUSH_SECONDS = QUEUE_OP_SECONDS.labels(queue="conveyor", op="push")
+CONVEYOR_POP_SECONDS = QUEUE_OP_SECONDS.labels(queue="conveyor", op="pop")
+DOCK_PUSH_SECONDS = QUEUE_OP_SECONDS.labels(queue="dock", op="push")
+NO_SUITABLE_BIN = ASSIGNMENT_FAILURES.labels(reason="no_suitable_bin")
 
 class LogiMaster:
+    """
+    Singleton controller.
+    Concurrency model: API handlers run on a threadpool, so every shared
+    structure carries its own lock (conveyor, loading dock, each bin, the
+    free-space index and the database connection). 'storage_lock' makes a
+    best-fit search and the matching occupy_space one atomic step, so two
+    threads can never pick the same last bit of space.
+
+    With LOGISTECH_SHARED_STATE=1 several worker processes can run side by
+    side: SQLite holds the authoritative bin loads, conveyor and loading dock.
+    Bin space is reserved with a conditional UPDATE, and each process keeps
+    its in-memory inventory as a cache that is refreshed from the bins
+    change feed whenever the change counter has moved.
+
+    With LOGISTECH_DURABLE_STATE=1 (single process) the conveyor, the docks
+    and bin loads stay in memory but every change is journaled to SQLite.
+    checkpoint() snapshots them every LOGISTECH_SNAPSHOT_INTERVAL seconds
+    and truncates the journal, so a restart loads the last snapshot and
+    replays only the tail.
+
+    With LOGISTECH_ZONE_POLICY=nearest or least_loaded (single process) the
+    inventory is also split into one shard per zone (location prefix), each
+    with its own free-space index and lock. Plain packages are claimed zone
+    by zone under that zone's lock only, so ingest into different zones
+    does not serialize on storage_lock. Steps that touch several bins at
+    once (batches, defragmentation moves, reloads) take every zone lock.
+    """
     _instance = None
+    _instance_lock = threading.Lock()
+
+    # How often a shared-state assignment is retried after another worker took the space
+    RESERVATION_RETRIES = 5
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(LogiMaster, cls).__new__(cls)
-            cls._instance._initialized = False
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(LogiMaster, cls).__new__(cls)
+                cls._instance._initialized = False
+                cls._instance._init_lock = threading.Lock()
         return cls._instance
 
     def __init__(self):
-        if self._initialized:
-            return
-        self.bin_inventory: List[StorageBin] = []
-        self.conveyor_queue = ConveyorBelt()
-        self.loading_stack = LoadingDock()
-        self.db = Database()
-        self._initialized = True
+        with self._init_lock:
+            if self._initialized:
+                return
+            self.storage_lock = threading.RLock()
+            self.shared_state = os.getenv("LOGISTECH_SHARED_STATE", "0") == "1"
+            self.zone_policy = os.getenv("LOGISTECH_ZONE_POLICY") or None
+            if self.zone_policy not in (None, "nearest", "least_loaded"):
+                raise ValueError(f"Unknown zone policy: {self.zone_policy}")
+            if self.zone_policy and self.shared_state:
+                logger.warning("Zone shards are not used in shared-state mode")
+                self.zone_policy = None
+            # Zones by distance for the 'nearest' policy (default: alphabetical)
+            self.zone_order = [z for z in os.getenv("LOGISTECH_ZONE_ORDER", "").split(",") if z]
+            self.bin_inventory = BinInventory()
+            self.free_index: FreeSpaceIndex = self.bin_inventory.free_index
+            self.best_fit_cache: BestFitCache = self.bin_inventory.best_fit_cache
+            self.db = Database()
+            self._state_version = 0
+            self.durable_state = not self.shared_state and os.getenv("LOGISTECH_DURABLE_STATE", "0") == "1"
+            self._checkpoint_version = -1
+            if self.shared_state:
+                self.conveyor_queue = SharedConveyorBelt(self.db)
+                self.loading_stack = SharedLoadingDock(self.db)
+            elif self.durable_state:
+                self.conveyor_queue = self._make_conveyor()
+                self.loading_stack = JournaledLoadingDock(self.db)
+            else:
+                self.conveyor_queue = self._make_conveyor()
+                self.loading_stack = LoadingDock()
+            # Dock door -> LoadingDock; door 1 is 'loading_stack'
+            self.docks: Dict[int, LoadingDock] = {1: self.loading_stack}
+            self._docks_lock = threading.Lock()
+            self._workers: List[threading.Thread] = []
+            self._workers_stop = threading.Event()
+            self._checkpoint_stop = threading.Event()
+            self.locations = PackageLocations(self.db)
+            # Largest package that found no bin since the last defragmentation
+            self.largest_unplaced = 0
+            self._defrag_stop = threading.Event()
+            self.planner = PlanningJobs()
+            # Dock door -> live plan of the truck being loaded there
+            self.truck_plans: Dict[int, IncrementalTruckPlan] = {}
+            self.ready = threading.Event()
+            self.warmup_error: Optional[str] = None
+            self.inventory_snapshot = os.getenv("LOGISTECH_INVENTORY_SNAPSHOT")
+            self._initialized = True
+            QUEUE_DEPTH.set_function(self._queue_depths)
+            BIN_UTILIZATION.set_function(lambda: self.bin_inventory.utilization())
+            if self.zone_policy:
+                ZONE_UTILIZATION.set_function(lambda: {(shard.zone,): shard.utilization()
+                                                       for shard in self.bin_inventory.shards.values()})
+            BEST_FIT_CACHE.set_function(lambda: {(stat,): value for stat, value in self.best_fit_cache.stats().items()})
+            if isinstance(self.conveyor_queue, PriorityConveyor):
+                LANE_DEPTH.set_function(lambda: {(lane,): n for lane, n in self.conveyor_queue.depths().items()})
+            if os.getenv("LOGISTECH_WARMUP", "eager") == "background":
+                threading.Thread(target=self._warm_up_in_background, name="inventory-warmup", daemon=True).start()
+            else:
+                self.warm_up()
+
+    def warm_up(self):
+        """
+        Load the inventory and the package locations (and recover durable
+        state, or rebuild bin loads from the locations), then set 'ready'.
+        With LOGISTECH_WARMUP=background this runs on a thread so the process
+        can answer health checks while large inventories load.
+        """
+        start = time.perf_counter()
         self.load_inventory()
+        self.locations.restore(self.db.iter_locations())
+        if self.durable_state:
+            self.recover()
+            interval = float(os.getenv("LOGISTECH_SNAPSHOT_INTERVAL", 60))
+            if interval > 0:
+                threading.Thread(target=self._checkpoint_periodically, args=(interval,),
+                                 name="state-checkpoint", daemon=True).start()
+        elif not self.shared_state:
+            self._restore_loads_from_locations()
+        defrag_interval = float(os.getenv("LOGISTECH_DEFRAG_INTERVAL", 0))
+        if defrag_interval > 0:
+            threading.Thread(target=self._defragment_periodically, args=(defrag_interval,),
+                             name="defragmenter", daemon=True).start()
+        self.ready.set()
+        logger.info("Ready with %d bins and %d stored packages after %.1f ms",
+                    len(self.bin_inventory), len(self.locations), (time.perf_counter() - start) * 1000)
+
+    def _restore_loads_from_locations(self):
+        """
+        Without durable or shared state bin loads are not written back, but
+        package locations are: put the stored packages back onto the loads
+        read from the bins table, so their space is not handed out again.
+        """
+        with self._exclusive():
+            for bin_id, (size, weight) in self.locations.totals_by_bin().items():
+                storage_bin = self.bin_inventory.get(bin_id)
+                if storage_bin is None:
+                    logger.warning("Stored packages point at missing bin %s", bin_id)
+                    continue
+                try:
+                    storage_bin.restore_load(storage_bin.current_load + size, storage_bin.current_weight + weight)
+                except ValueError:
+                    logger.warning("Bin %s cannot hold its %d stored units; load left at %d",
+                                   bin_id, size, storage_bin.current_load)
+
+    def _warm_up_in_background(self):
+        try:
+            self.warm_up()
+        except Exception as e:
+            self.warmup_error = str(e)
+            logger.exception("Warm-up failed")
+
+    def _make_conveyor(self) -> ConveyorBelt:
+        """FIFO belt, or the multi-lane PriorityConveyor with LOGISTECH_CONVEYOR=priority"""
+        if os.getenv("LOGISTECH_CONVEYOR", "fifo") != "priority":
+            return JournaledConveyorBelt(self.db) if self.durable_state else ConveyorBelt()
+        if self.durable_state:
+            logger.warning("The priority conveyor is not journaled; its lanes are lost on restart")
+        oversize = os.getenv("LOGISTECH_OVERSIZE_SIZE")
+        return PriorityConveyor(oversize_size=int(oversize) if oversize else None,
+                                max_attempts=int(os.getenv("LOGISTECH_RETRY_ATTEMPTS", 3)))
+
+    def _queue_depths(self):
+        depths = {("conveyor",): len(self.conveyor_queue.queue), ("dock",): len(self.loading_stack.stack)}
+        for door, dock in list(self.docks.items()):
+            if door != 1:
+                depths[(f"dock{door}",)] = len(dock.stack)
+        return depths
+
+    def dock(self, door: int) -> LoadingDock:
+        """
+        Loading dock for a dock door, created on first use.
+        Only door 1 is shared between worker processes in shared-state mode;
+        the other doors are kept in memory (journaled with durable state).
+        """
+        with self._docks_lock:
+            dock = self.docks.get(door)
+            if dock is None:
+                dock = self.docks[door] = JournaledLoadingDock(self.db, door) if self.durable_state else LoadingDock()
+            return dock
 
     def load_inventory(self):
-        """Load bins from DB and sort them for Binary Search"""
-        rows = self.db.load_bins()
-        self.bin_inventory = [StorageBin(r[0], r[1], r[2]) for r in rows]
-        self.bin_inventory.sort() # Critical for Binary Search
+        """Load bins from DB into the columnar inventory, sorted for Binary Search"""
+        if self.durable_state and len(self.bin_inventory):
+            # Live loads are only in memory and the journal: write them back first
+            self.checkpoint()
+        # Read the counter first so changes made while loading are replayed later
+        state_version = self.db.state_version()
+        # Continue numbering after the old inventory so change-feed clients resync
+        base_version = self.bin_inventory.version + 1
+        inventory = None
+        if self.inventory_snapshot:
+            # Binary snapshot (LOGISTECH_INVENTORY_SNAPSHOT), only if no bin changed since it was written
+            inventory = BinInventory.load(self.inventory_snapshot, state_version, base_version)
+        if inventory is None:
+            inventory = BinInventory.from_rows(self.db.iter_bins(), base_version)
+            if self.inventory_snapshot:
+                inventory.save(self.inventory_snapshot, state_version)
+        if self.durable_state:
+            inventory.subscribe(self._journal_load)
+        if self.zone_policy:
+            inventory.shard_by_zone()
+        with self._exclusive():
+            self.bin_inventory = inventory
+            self.free_index = inventory.free_index
+            self.best_fit_cache = inventory.best_fit_cache
+            self._state_version = state_version
+
+    def import_bins(self, stream: TextIO, fmt: str = "csv", chunk_size: int = 5000, max_errors: int = 100):
+        """
+        Provision bins from a CSV or JSON Lines stream (see importer.parse_bins).
+        Records are validated as they are read and inserted 'chunk_size' at a
+        time, one transaction per chunk, so memory stays flat however large
+        the file. Each committed chunk is merged into the live inventory
+        (BinInventory.add_bins) instead of reloading it; storage claims only
+        wait for one chunk at a time. Invalid records and taken bin_ids are
+        skipped and reported (the first 'max_errors' of them).
+        """
+        result = {"imported": 0, "skipped": 0, "errors": []}
+
+        def skip(line: int, error: str):
+            result["skipped"] += 1
+            if len(result["errors"]) < max_errors:
+                result["errors"].append({"line": line, "error": error})
+
+        chunk = []
+
+        def commit_chunk():
+            with self._exclusive():
+                inserted, duplicates = self.db.insert_bins([row for _, row in chunk])
+                self.bin_inventory.add_bins(inserted)
+            for n in duplicates:
+                skip(chunk[n][0], f"Bin {chunk[n][1][0]} already exists")
+            result["imported"] += len(inserted)
+            chunk.clear()
+
+        for line, row, error in parse_bins(stream, fmt):
+            if error is not None:
+                skip(line, error)
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= chunk_size:
+                commit_chunk()
+        if chunk:
+            commit_chunk()
+        result["errors"].sort(key=lambda e: e["line"])  # Taken bin_ids are only found per chunk
+        BINS_IMPORTED.inc(result["imported"], result="imported")
+        BINS_IMPORTED.inc(result["skipped"], result="skipped")
+        logger.info("Imported %d bins, skipped %d", result["imported"], result["skipped"])
+        return result
+
+    def _journal_load(self, storage_bin, old_load: int):
+        # Absolute values, so replaying an entry twice is harmless
+        self.db.journal("bin", "load", [storage_bin.bin_id, storage_bin.current_load, storage_bin.current_weight])
+
+    def checkpoint(self) -> Optional[int]:
+        """
+        Snapshot the conveyor and docks, write changed bin loads back to the
+        bins table and truncate the journal (durable state only).
+        State changes wait for the few milliseconds this takes. Returns the
+        journal seq the snapshot covers.
+        """
+        if not self.durable_state:
+            return None
+        with self._docks_lock:
+            docks = sorted(self.docks.items())
+        inventory = self.bin_inventory
+        journaled = isinstance(self.conveyor_queue, JournaledConveyorBelt)
+        with ExitStack() as stack:
+            # Same order as every writer: structure lock first, then the database
+            if journaled:
+                stack.enter_context(self.conveyor_queue.lock)
+            for _, dock in docks:
+                stack.enter_context(dock.lock)
+            stack.enter_context(inventory.lock)
+            state = {
+                "conveyor": [package_row(p) for p in self.conveyor_queue.queue] if journaled else [],
+                "docks": {door: [package_row(p) for p in dock.stack] for door, dock in docks},
+            }
+            changes = inventory.changed_since(self._checkpoint_version)
+            rows = changes[1] if changes is not None else range(len(inventory))
+            bin_loads = [(ref.bin_id, ref.current_load, ref.current_weight) for ref in map(inventory.__getitem__, rows)]
+            seq = self.db.write_snapshot(state, bin_loads)
+            self._checkpoint_version = inventory.version
+        logger.info("Checkpoint at journal seq %d (%d bins written back)", seq, len(bin_loads))
+        return seq
+
+    def recover(self):
+        """Rebuild the conveyor, docks and bin loads from the last snapshot plus the journal tail"""
+        start = time.perf_counter()
+        seq, state = self.db.latest_snapshot()
+        if state:
+            if hasattr(self.conveyor_queue, "restore"):
+                self.conveyor_queue.restore(state["conveyor"])
+            for door, rows in state["docks"].items():
+                self.dock(int(door)).restore(rows)
+        tail = self.db.journal_since(seq)
+        for _, target, op, data in tail:
+            if target == "bin":
+                storage_bin = self.bin_inventory.get(data[0])
+                try:
+                    if storage_bin is not None:
+                        storage_bin.restore_load(data[1], data[2])
+                except ValueError:
+                    logger.warning("Skipping journaled load %s for resized bin %s", data[1], data[0])
+            elif target == JournaledConveyorBelt.TARGET:
+                if hasattr(self.conveyor_queue, "replay"):
+                    self.conveyor_queue.replay(op, data)
+            else:
+                self.dock(int(target.split(":")[1])).replay(op, data)
+        logger.info("Recovered state from snapshot %d and %d journal entries in %.1f ms",
+                    seq, len(tail), (time.perf_counter() - start) * 1000)
+        if tail:
+            self.checkpoint()
+
+    def _checkpoint_periodically(self, interval: float):
+        while not self._checkpoint_stop.wait(interval):
+            try:
+                self.checkpoint()
+            except Exception:
+                logger.exception("Checkpoint failed")
+
+    def _sync_shared_state(self):
+        """Refresh cached bin loads written by other worker processes"""
+        if not self.shared_state:
+            return
+        changes = self.db.bin_changes_since(self._state_version)
+        if changes is None:
+            self.load_inventory()
+            return
+        version, changed = changes
+        added = []
+        for bin_id, state in changed.items():
+            storage_bin = self.bin_inventory.get(bin_id)
+            if storage_bin is None and state is not None:
+                added.append(bin_id)
+                continue
+            if state is None or storage_bin.capacity != state[0]:
+                # Bins were removed or resized: rebuild the sorted inventory
+                self.load_inventory()
+                return
+            storage_bin.restore_load(state[1], state[2])
+        if added:
+            # Bins another worker imported are merged in, no reload needed
+            self.bin_inventory.add_bins(self.db.bins_by_id(added))
+        self._state_version = version
+
+    @contextmanager
+    def _exclusive(self):
+        """storage_lock plus every zone shard's lock, so no claim runs meanwhile"""
+        with ExitStack() as stack:
+            stack.enter_context(self.storage_lock)
+            for shard in self.bin_inventory.shards.values():
+                stack.enter_context(shard.lock)
+            yield
+
+    def _zones_for(self, inventory: BinInventory, package: Package) -> List[InventoryShard]:
+        """Shards in the order the zone policy tries them"""
+        shards = list(inventory.shards.values())
+        if self.zone_policy == "least_loaded":
+            return sorted(shards, key=InventoryShard.utilization)
+        ranks = {zone: n for n, zone in enumerate(self.zone_order or sorted(inventory.shards))}
+        home = ranks.get(package.zone, 0)
+        return sorted(shards, key=lambda shard: (abs(ranks.get(shard.zone, len(ranks)) - home),
+                                                 ranks.get(shard.zone, len(ranks))))
+
+    def _claim_in_zones(self, package: Package) -> Optional[StorageUnit]:
+        """Best fit within the first zone (by the zone policy) that has room, under that zone's lock"""
+        with BEST_FIT_SECONDS.time():
+            while True:
+                inventory = self.bin_inventory
+                for shard in self._zones_for(inventory, package):
+                    with shard.lock:
+                        if inventory is not self.bin_inventory:
+                            break  # Reloaded meanwhile: start again on the new inventory
+                        row = shard.free_index.best_fit(package.size)
+                        if row is not None:
+                            best_bin = inventory[row]
+                            best_bin.occupy_space(package.size)
+                            return best_bin
+                else:
+                    return None
+
+    def _claim_best_fit(self, package: Package) -> Optional[StorageUnit]:
+        """
+        Find the best-fit bin for a package and occupy its volume (and weight)
+        in it as one atomic step. Packages with dimensions or weight are matched
+        against bin dimensions and weight limits (3-D model).
+        In shared-state mode the space is reserved in SQLite first; if another
+        worker got there first the cache is refreshed and the search retried.
+        """
+        volume = package.volume
+        plain = package.dimensions is None and not package.weight
+        if plain and self.zone_policy:
+            return self._claim_in_zones(package)
+        with self._exclusive() if self.zone_policy else self.storage_lock, BEST_FIT_SECONDS.time():
+            for _ in range(self.RESERVATION_RETRIES):
+                self._sync_shared_state()
+                if plain:
+                    best_bin = find_best_fit_bin(self.bin_inventory, volume, self.best_fit_cache)
+                else:
+                    best_bin = self.bin_inventory.best_fit_package(package)
+                if best_bin is None:
+                    return None
+                if self.shared_state and not self.db.reserve_bin_space(best_bin.bin_id, volume, package.weight):
+                    continue
+                best_bin.occupy_space(volume, package.weight)
+                return best_bin
+        return None
 
     def process_arrival(self, package: Package):
         """Ingest a package onto the conveyor belt"""
-        print(f"Package {package.tracking_id} arrived (Size: {package.size}).")
-        self.conveyor_queue.add_package(package)
+        logger.debug("Package %s arrived (size %d)", package.tracking_id, package.size)
+        with CONVEYOR_PUSH_SECONDS.time():
+            self.conveyor_queue.add_package(package)
 
     def assign_storage(self):
         """Process next package from queue and find best bin"""
-        package = self.conveyor_queue.get_next_package()
+        with CONVEYOR_POP_SECONDS.time():
+            package = self.conveyor_queue.get_next_package()
         if not package:
             return {"success": False, "reason": "No packages on conveyor"}
 
-        best_bin = find_best_fit_bin(self.bin_inventory, package.size)
-        
+        try:
+            best_bin = self._claim_best_fit(package)
+        except Exception as e:
+            logger.exception("Error assigning storage for package %s", package.tracking_id)
+            ASSIGNMENT_FAILURES.inc(reason="error")
+            return {"success": False, "reason": str(e)}
+
         if best_bin:
-            try:
-                best_bin.occupy_space(package.size)
-                print(f"Assigned Package {package.tracking_id} to Bin {best_bin.bin_id} (Capacity: {best_bin.capacity}).")
-                self.db.log_shipment(package.tracking_id, best_bin.bin_id, "STORED")
-                return {
-                    "success": True,
-                    "package_id": package.tracking_id,
-                    "bin_id": best_bin.bin_id,
-                    "bin_capacity": best_bin.capacity,
-                    "bin_location": best_bin.location_code
-                }
-            except Exception as e:
-                print(f"Error assigning storage: {e}")
-                return {"success": False, "reason": str(e)}
+            logger.debug("Assigned package %s to bin %s (capacity %d)",
+                         package.tracking_id, best_bin.bin_id, best_bin.capacity)
+            PACKAGES_STORED.inc()
+            self.locations.add(package.tracking_id, best_bin.bin_id, package.volume, package.weight,
+                               package.destination)
+            self.db.log_shipment(package.tracking_id, best_bin.bin_id, "STORED")
+            self._publish_locations()
+            return {
+                "success": True,
+                "package_id": package.tracking_id,
+                "bin_id": best_bin.bin_id,
+                "bin_capacity": best_bin.capacity,
+                "bin_location": best_bin.location_code
+            }
         else:
-            print(f"No suitable bin found for Package {package.tracking_id} (Size: {package.size}).")
+            logger.info("No suitable bin found for package %s (size %d)", package.tracking_id, package.size)
+            NO_SUITABLE_BIN.inc()
+            self.largest_unplaced = max(self.largest_unplaced, package.volume)
+            # The priority conveyor retries the package later instead of dropping it
+            retry = getattr(self.conveyor_queue, "retry", None)
             return {
                 "success": False,
                 "reason": "No suitable bin found",
-                "package_size": package.size
+                "package_size": package.size,
+                "requeued": bool(retry and retry(package))
             }
 
-    def load_truck(self, truck_capacity: int, packages_to_load: List[Package]):
-        """Attempt to load a set of packages using backtracking"""
-        print(f"Attempting to load truck (Capacity: {truck_capacity})...")
-        optimized_load = optimize_truck_loading(truck_capacity, packages_to_load)
-        
+    def _publish_locations(self):
+        """
+        In shared-state mode other workers locate and pick packages through
+        the package_locations table, so new locations are written at once
+        instead of waiting in the group-commit buffer.
+        """
+        if self.shared_state:
+            self.db.flush()
+
+    def start_workers(self, count: int, poll_interval: float = 0.05):
+        """
+        Drain the conveyor with 'count' background threads. Each worker runs
+        assign_storage in a loop and naps for 'poll_interval' seconds when
+        the conveyor has nothing due.
+        """
+        self.stop_workers()
+        self._workers_stop.clear()
+        for n in range(count):
+            worker = threading.Thread(target=self._drain, args=(poll_interval,),
+                                      name=f"conveyor-worker-{n}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop_workers(self):
+        self._workers_stop.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _drain(self, poll_interval: float):
+        while not self._workers_stop.is_set():
+            result = self.assign_storage()
+            if result.get("reason") == "No packages on conveyor":
+                self._workers_stop.wait(poll_interval)
+
+    def assign_storage_batch(self, packages: List[Package]):
+        """
+        Store many packages at once, bypassing the conveyor.
+        Packages are taken smallest first and merged against the bins ordered by
+        free space: bins too small for one package are too small for every later
+        (larger) one, so a single forward pass gives each package its best fit.
+        Packages with dimensions or weight need the 3-D checks and are placed
+        one by one afterwards.
+        Results are returned in input order; stored packages are logged in one transaction.
+        """
+        plain = [i for i, p in enumerate(packages) if p.dimensions is None and not p.weight]
+        order = sorted(plain, key=lambda i: packages[i].size)
+        results = [None] * len(packages)
+        log_entries = []
+        pos = 0
+        current_bin, current_free = None, 0
+
+        with self._exclusive():
+            self._sync_shared_state()
+            candidates = self.free_index.ordered()
+            planned = []
+            for i in order:
+                package = packages[i]
+                while current_free < package.size and pos < len(candidates):
+                    current_free, slot = candidates[pos]
+                    current_bin = self.bin_inventory[slot]
+                    pos += 1
+                if current_bin is None or current_free < package.size:
+                    continue
+                current_free -= package.size
+                planned.append((i, current_bin))
+
+            if self.shared_state:
+                reserved = self.db.reserve_bin_space_many([(b.bin_id, packages[i].size) for i, b in planned])
+            else:
+                reserved = [True] * len(planned)
+
+            for (i, planned_bin), ok in zip(planned, reserved):
+                package = packages[i]
+                if ok:
+                    planned_bin.occupy_space(package.size)
+                    stored_bin = planned_bin
+                else:
+                    # Another worker took the space first: fall back to a fresh search
+                    stored_bin = self._claim_best_fit(package)
+                    if stored_bin is None:
+                        continue
+                log_entries.append((package.tracking_id, stored_bin.bin_id, "STORED"))
+                self.locations.add(package.tracking_id, stored_bin.bin_id, package.volume, package.weight,
+                                   package.destination)
+                results[i] = self._batch_result(package, stored_bin)
+
+            if len(plain) < len(packages):
+                plain_set = set(plain)
+                for i, package in enumerate(packages):
+                    if i in plain_set:
+                        continue
+                    stored_bin = self._claim_best_fit(package)
+                    if stored_bin is not None:
+                        log_entries.append((package.tracking_id, stored_bin.bin_id, "STORED"))
+                        self.locations.add(package.tracking_id, stored_bin.bin_id, package.volume, package.weight,
+                                   package.destination)
+                        results[i] = self._batch_result(package, stored_bin)
+
+        for i, package in enumerate(packages):
+            if results[i] is None:
+                results[i] = {
+                    "success": False,
+                    "package_id": package.tracking_id,
+                    "reason": "No suitable bin found",
+                    "package_size": package.size
+                }
+
+        self.db.log_shipments(log_entries)
+        self._publish_locations()
+        PACKAGES_STORED.inc(len(log_entries))
+        if len(log_entries) < len(packages):
+            NO_SUITABLE_BIN.inc(len(packages) - len(log_entries))
+        logger.info("Batch stored %d of %d packages", len(log_entries), len(packages))
+        return results
+
+    def defragment(self, target_size: Optional[int] = None, max_moves: int = 50,
+                   moves_per_second: Optional[float] = None, stop: Optional[threading.Event] = None):
+        """
+        Move packages between bins until one bin has 'target_size' free
+        (default: the largest package that recently found no bin).
+        The plan is computed once (see algorithms.plan_defragmentation) and
+        then executed one move at a time, each holding storage_lock only for
+        that move, at most 'moves_per_second' (LOGISTECH_DEFRAG_RATE) so
+        ingest is never stalled. A move whose package or room has gone since
+        planning is skipped. Moves are logged as MOVED shipment events.
+        """
+        target = target_size or self.largest_unplaced
+        if not target:
+            return {"target_size": 0, "planned": 0, "moved": 0, "fits": True}
+        if moves_per_second is None:
+            moves_per_second = float(os.getenv("LOGISTECH_DEFRAG_RATE", 50))
+        with self.storage_lock:
+            self._sync_shared_state()
+            moves = plan_defragmentation(self.bin_inventory, self.locations, target, max_moves)
+
+        moved = 0
+        for n, move in enumerate(moves):
+            if stop is not None and stop.is_set():
+                break
+            if n and moves_per_second > 0:
+                time.sleep(1 / moves_per_second)
+            if self._apply_move(move):
+                moved += 1
+        fits = self.bin_inventory.best_fit(target) is not None
+        if fits and target >= self.largest_unplaced:
+            self.largest_unplaced = 0
+        logger.info("Defragmentation for size %d: %d of %d planned moves done, fits=%s",
+                    target, moved, len(moves), fits)
+        return {"target_size": target, "planned": len(moves), "moved": moved, "fits": fits}
+
+    def _apply_move(self, move: Move) -> bool:
+        with self._exclusive():
+            self._sync_shared_state()
+            entry = self.locations.get(move.tracking_id)
+            source = self.bin_inventory.get(move.from_bin)
+            destination = self.bin_inventory.get(move.to_bin)
+            if entry is None or entry[0] != move.from_bin or source is None or destination is None:
+                return False
+            size, weight = entry[1], entry[2]
+            # Check both ends before touching either, so a move is done completely or not at all
+            if destination.free_capacity < size or source.current_load < size:
+                return False
+            if destination.max_weight and destination.current_weight + weight > destination.max_weight:
+                return False
+            if self.shared_state:
+                if not self.db.reserve_bin_space(move.to_bin, size, weight):
+                    return False
+                self.db.release_bin_space(move.from_bin, size, weight)
+            destination.occupy_space(size, weight)
+            source.free_space(size, weight)
+            self.locations.move(move.tracking_id, move.to_bin)
+        self.db.log_shipment(move.tracking_id, move.to_bin, "MOVED")
+        self._publish_locations()
+        DEFRAG_MOVES.inc()
+        return True
+
+    def _defragment_periodically(self, interval: float):
+        while not self._defrag_stop.wait(interval):
+            if self.largest_unplaced:
+                try:
+                    self.defragment(stop=self._defrag_stop)
+                except Exception:
+                    logger.exception("Defragmentation failed")
+
+    def locate(self, tracking_id: str) -> Optional[dict]:
+        """Bin holding a stored package, from the in-memory index (SQLite in shared-state mode)"""
+        if self.shared_state:
+            row = self.db.locate(tracking_id)
+            entry = row[1:] if row else None
+        else:
+            entry = self.locations.get(tracking_id)
+        if entry is None:
+            return None
+        bin_id, size, weight, destination = entry
+        storage_bin = self.bin_inventory.get(bin_id)
+        return {
+            "tracking_id": tracking_id,
+            "bin_id": bin_id,
+            "bin_location": storage_bin.location_code if storage_bin is not None else None,
+            "size": size,
+            "weight": weight,
+            "destination": destination
+        }
+
+    def pick(self, tracking_ids: List[str], door: Optional[int] = None):
+        """
+        Retrieve stored packages: free their space in the bins, drop them from
+        the location index and log them as PICKED. The pick list comes back
+        ordered by location code so one walk through the aisles collects a
+        whole batch (e.g. everything for one truck). With 'door' the packages
+        are loaded onto that dock door in pick order.
+        In shared-state mode the location rows are taken from SQLite in one
+        transaction, so two workers can never pick the same package.
+        """
+        with self.storage_lock:
+            self._sync_shared_state()
+            if self.shared_state:
+                rows = self.db.take_locations(tracking_ids)
+                for row in rows:
+                    self.locations.remove(row[0])
+                entries = {row[0]: row[1:] for row in rows}
+            else:
+                entries = {}
+                for tracking_id in dict.fromkeys(tracking_ids):
+                    entry = self.locations.remove(tracking_id)
+                    if entry is not None:
+                        entries[tracking_id] = entry
+
+            picks = []
+            for tracking_id, (bin_id, size, weight, destination) in entries.items():
+                storage_bin = self.bin_inventory.get(bin_id)
+                location = storage_bin.location_code if storage_bin is not None else ""
+                picks.append((location, bin_id, tracking_id, size, weight, destination))
+                if storage_bin is None:
+                    continue
+                if self.shared_state:
+                    self.db.release_bin_space(bin_id, size, weight)
+                storage_bin.free_space(size, weight)
+        picks.sort()
+
+        if door is not None:
+            dock = self.dock(door)
+            for _, _, tracking_id, size, weight, destination in picks:
+                dock.load_package(Package(tracking_id, size, destination, weight=weight))
+        self.db.log_shipments([(tracking_id, bin_id, "PICKED") for _, bin_id, tracking_id, *_ in picks])
+        PACKAGES_PICKED.inc(len(picks))
+        logger.info("Picked %d of %d packages", len(picks), len(tracking_ids))
+        return {
+            "picks": [{"tracking_id": tracking_id, "bin_id": bin_id, "bin_location": location, "size": size,
+                       "destination": destination}
+                      for location, bin_id, tracking_id, size, _, destination in picks],
+            "missing": [tracking_id for tracking_id in tracking_ids if tracking_id not in entries]
+        }
+
+    @staticmethod
+    def _batch_result(package: Package, stored_bin: StorageUnit) -> dict:
+        return {
+            "success": True,
+            "package_id": package.tracking_id,
+            "bin_id": stored_bin.bin_id,
+            "bin_location": stored_bin.location_code
+        }
+
+    def load_truck(self, truck_capacity: int, packages_to_load: List[Package],
+                   truck_dimensions: Optional[Dimensions] = None, max_weight: int = 0):
+        """
+        Attempt to load a set of packages using backtracking.
+        With 'truck_dimensions' (length, width, height) the 3-D wall-building
+        packer places the boxes instead ('truck_capacity' is then unused) and
+        the result lists where each one goes.
+        """
+        placements = None
+        if truck_dimensions:
+            logger.info("Attempting to load truck (%s x %s x %s)", *truck_dimensions)
+            placements = pack_truck_3d(truck_dimensions, packages_to_load, max_weight)
+            optimized_load = [placement.package for placement in placements]
+        else:
+            logger.info("Attempting to load truck (capacity %d)", truck_capacity)
+            optimized_load = optimize_truck_loading(truck_capacity, packages_to_load)
+
         if optimized_load:
-            print("Optimal load found. Loading truck...")
-            loaded_info = []
+            logger.info("Optimal load found, loading %d packages", len(optimized_load))
+            return self._load_onto_dock(self.loading_stack, optimized_load, placements)
+        else:
+            logger.info("Could not find a valid combination to load")
+            return {"success": False, "reason": "No valid combination found"}
+
+    def _load_onto_dock(self, dock: LoadingDock, packages: List[Package], placements=None):
+        loaded_info = []
+        # Hold the dock for the whole load so concurrent loads don't interleave
+        with dock.lock:
             try:
-                for pkg in optimized_load:
-                    self.loading_stack.load_package(pkg)
+                for n, pkg in enumerate(packages):
+                    with DOCK_PUSH_SECONDS.time():
+                        dock.load_package(pkg)
                     self.db.log_shipment(pkg.tracking_id, -1, "LOADED") # -1 for truck
-                    loaded_info.append({"id": pkg.tracking_id, "size": pkg.size, "dest": pkg.destination})
-                
+                    info = {"id": pkg.tracking_id, "size": pkg.size, "dest": pkg.destination}
+                    if placements:
+                        placement = placements[n]
+                        info["position"] = [placement.x, placement.y, placement.z]
+                        info["oriented"] = [placement.length, placement.width, placement.height]
+                    loaded_info.append(info)
+
                 return {
                     "success": True,
                     "loaded_packages": loaded_info,
                     "count": len(loaded_info)
                 }
             except Exception as e:
-                print(f"Error during loading: {e}. Rolling back...")
-                self.loading_stack.rollback_load(len(optimized_load))
+                logger.warning("Error during loading: %s. Rolling back", e)
+                dock.rollback_load(len(loaded_info))
                 return {"success": False, "reason": str(e)}
-        else:
-            print("Could not find a valid combination to load.")
+
+    def replan_truck(self, door: int = 1, capacity: Optional[int] = None, add: List[Package] = (),
+                     remove: List[str] = (), apply: bool = True):
+        """
+        Edit the manifest of the truck at a dock door and re-plan it
+        incrementally (see algorithms.IncrementalTruckPlan). The first call
+        for a door needs 'capacity'; the packages already on the dock start
+        the manifest. Returns the change as LIFO pops plus pushes, carried out
+        on the dock unless 'apply' is False.
+        """
+        dock = self.dock(door)
+        with dock.lock:
+            plan = self.truck_plans.get(door)
+            on_dock = dock.snapshot()
+            if plan is None or (capacity is not None and capacity != plan.capacity):
+                if capacity is None:
+                    return {"success": False, "reason": f"No truck plan at dock {door}; give its capacity"}
+                plan = self.truck_plans[door] = IncrementalTruckPlan(capacity, on_dock)
+            elif [p.tracking_id for p in on_dock] != [p.tracking_id for p in plan.stack]:
+                # The dock was changed outside the plan: start again from what is on it
+                loaded = {id(p) for p in plan.stack}
+                waiting = [p for p in plan.order if id(p) not in loaded]
+                plan = self.truck_plans[door] = IncrementalTruckPlan(plan.capacity, on_dock)
+                for package in waiting:
+                    plan.add(package)
+            for tracking_id in remove:
+                if tracking_id in plan:
+                    plan.remove(tracking_id)
+            for package in add:
+                plan.add(package)
+            diff = plan.replan()
+            if apply:
+                popped = [p.tracking_id for p in plan.stack[len(plan.stack) - diff.pops:]]
+                dock.rollback_load(diff.pops)
+                for package in diff.pushes:
+                    with DOCK_PUSH_SECONDS.time():
+                        dock.load_package(package)
+                plan.applied(diff)
+                self.db.log_shipments([(tracking_id, -1, "ROLLBACK") for tracking_id in reversed(popped)]
+                                      + [(p.tracking_id, -1, "LOADED") for p in diff.pushes])
+        logger.info("Re-planned dock %d: %d pops, %d pushes, load %d", door, diff.pops, len(diff.pushes), diff.load)
+        return {
+            "success": True,
+            "pops": diff.pops,
+            "pushes": [p.tracking_id for p in diff.pushes],
+            "load": diff.load,
+            "capacity": plan.capacity,
+            "applied": apply
+        }
+
+    def commit_plan(self, job_id: str, door: int = 1):
+        """
+        Load a finished planning job (see planner.PlanningJobs) onto a dock
+        door. Planning never touches the docks; this is the only step that does.
+        """
+        job = self.planner.get(job_id)
+        if job is None:
+            return {"success": False, "reason": f"Unknown planning job {job_id}"}
+        with self.planner.lock:
+            if job.status != "done":
+                return {"success": False, "reason": f"Planning job is {job.status}"}
+            job.committed = True
+        load = job.load
+        if not load:
             return {"success": False, "reason": "No valid combination found"}
+        logger.info("Committing planning job %s: %d packages onto dock %d", job_id, len(load), door)
+        result = self._load_onto_dock(self.dock(door), load)
+        if not result["success"]:
+            job.committed = False
+        return result
+
+    def load_fleet(self, trucks: List[Truck], packages: List[Package], workers: Optional[int] = None):
+        """
+        Plan a whole fleet at once (see algorithms.plan_fleet, on the planner's
+        process pool) and load each truck onto the dock of its door. Trucks
+        sharing a door are loaded one after another onto the same dock.
+        All or nothing: every door involved is held (locks taken in door
+        order) for the whole load, so if a push fails the failing truck and
+        every truck loaded before it are unloaded again without touching
+        anyone else's packages. LOADED rows are only logged once the whole
+        fleet is on its docks.
+        """
+        logger.info("Planning %d trucks for %d packages", len(trucks), len(packages))
+        plan = plan_fleet(trucks, packages, workers=workers, pool=self.planner.executor())
+        docks = {door: self.dock(door) for door in sorted({truck.dock for truck in trucks})}
+        log_entries = []
+        loaded = []
+        pushed = []  # (dock, count) per truck, to undo in reverse order
+        with ExitStack() as stack:
+            for dock in docks.values():
+                stack.enter_context(dock.lock)
+            for truck in trucks:
+                load = plan.loads.get(truck.truck_id, [])
+                dock = docks[truck.dock]
+                count = 0
+                try:
+                    for pkg in load:
+                        with DOCK_PUSH_SECONDS.time():
+                            dock.load_package(pkg)
+                        count += 1
+                except Exception as e:
+                    logger.warning("Error loading truck %s: %s. Rolling back the fleet", truck.truck_id, e)
+                    dock.rollback_load(count)
+                    for loaded_dock, loaded_count in reversed(pushed):
+                        loaded_dock.rollback_load(loaded_count)
+                    return {"success": False, "reason": str(e), "truck_id": truck.truck_id}
+                pushed.append((dock, count))
+                log_entries.extend((pkg.tracking_id, -1, "LOADED") for pkg in load)
+                loaded.append({
+                    "truck_id": truck.truck_id,
+                    "dock": truck.dock,
+                    "capacity": truck.capacity,
+                    "load": sum(pkg.size for pkg in load),
+                    "packages": [pkg.tracking_id for pkg in load]
+                })
+        self.db.log_shipments(log_entries)
+        logger.info("Fleet loaded %d of %d packages", len(log_entries), len(packages))
+        return {
+            "success": bool(log_entries),
+            "trucks": loaded,
+            "unassigned": [pkg.tracking_id for pkg in plan.unassigned]
+        }
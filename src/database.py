@@ -1,18 +1,124 @@
 import sqlite3
+import json
 import os
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from metrics import DB_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+QUEUE_TABLES = {"conveyor_queue", "loading_dock"}
+SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+DAY_MS = 86_400_000
+BIN_3D_COLUMNS = ("length", "width", "height", "max_weight", "current_weight")
+QUEUE_3D_COLUMNS = ("length", "width", "height", "weight")
+QUEUE_COLUMNS = "tracking_id, size, destination, " + ", ".join(QUEUE_3D_COLUMNS)
+
+def now_ms() -> int:
+    """Current time as integer epoch milliseconds (how shipment_logs stores timestamps)"""
+    return int(time.time() * 1000)
+
+def format_timestamp(epoch_ms):
+    """Epoch milliseconds as a local ISO-8601 string for display"""
+    if epoch_ms is None:
+        return None
+    return datetime.fromtimestamp(epoch_ms / 1000).isoformat(timespec="milliseconds")
+
+def _parse_legacy_timestamp(value):
+    """Timestamps used to be stored as ISO text; convert them to epoch milliseconds"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+    except ValueError:
+        return None
 
 class Database:
-    def __init__(self, db_name="logistech.db"):
-        self.db_name = db_name
+    """
+    SQLite access layer.
+    Shipment logs are buffered in memory and written with executemany in a
+    single transaction once 'log_batch_size' rows are pending, when the oldest
+    pending row is 'log_flush_interval' seconds old (0 disables the timer),
+    or at shutdown.
+
+    Package locations (which bin holds which package) are written through
+    the same buffer: record_location/forget_location queue upserts and
+    deletes that reach 'package_locations' with the next group commit.
+
+    State journal: with durable state on, conveyor/dock pushes and pops and
+    bin load changes are appended to 'state_journal' through the same buffer
+    (and the same group commit) as the shipment logs, so the journal always
+    reaches disk as an ordered prefix. write_snapshot stores the whole
+    queue/dock state, writes bin loads back to the bins table and truncates
+    the journal; recovery loads the last snapshot and replays the tail.
+
+    Log retention: rows older than 'log_retention_days' are moved in small
+    chunks into monthly partition tables (shipment_logs_YYYYMM) in a separate
+    archive SQLite file, attached as 'archive'. A background compactor does
+    this every 'log_compaction_interval' seconds (0 disables it), holding the
+    connection only for one chunk at a time. query_logs reads across the hot
+    table and the archive transparently.
+    Every setting can also come from a LOGISTECH_* environment variable.
+    """
+    def __init__(self, db_name=None, journal_mode=None, synchronous=None,
+                 log_batch_size=None, log_flush_interval=None, archive_name=None,
+                 log_retention_days=None, log_compaction_interval=None):
+        self.db_name = db_name or os.getenv("LOGISTECH_DB", "logistech.db")
+        self.journal_mode = (journal_mode or os.getenv("LOGISTECH_JOURNAL_MODE", "WAL")).upper()
+        self.synchronous = (synchronous or os.getenv("LOGISTECH_SYNCHRONOUS", "NORMAL")).upper()
+        self.log_batch_size = int(log_batch_size if log_batch_size is not None
+                                  else os.getenv("LOGISTECH_LOG_BATCH_SIZE", 500))
+        self.log_flush_interval = float(log_flush_interval if log_flush_interval is not None
+                                        else os.getenv("LOGISTECH_LOG_FLUSH_INTERVAL", 1.0))
+        self.log_retention_days = float(log_retention_days if log_retention_days is not None
+                                        else os.getenv("LOGISTECH_LOG_RETENTION_DAYS", 30))
+        self.log_compaction_interval = float(log_compaction_interval if log_compaction_interval is not None
+                                             else os.getenv("LOGISTECH_LOG_COMPACTION_INTERVAL", 60))
+        self.archive_name = archive_name or os.getenv("LOGISTECH_ARCHIVE_DB") or self._default_archive_name()
+        if self.journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unsupported journal mode: {self.journal_mode}")
+        if self.synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unsupported synchronous level: {self.synchronous}")
+
+        self._lock = threading.RLock()  # Guards the shared connection and the log buffer
+        self._log_buffer = []
+        self._journal_buffer = []
+        self._location_buffer = {}  # tracking_id -> location row, or None to delete it
+        self._buffer_started = None
+        self._closed = threading.Event()
+
         # Connect to SQLite database
         try:
             self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            self.conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            self.conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self.conn.execute("ATTACH DATABASE ? AS archive", (self.archive_name,))
+            self.conn.execute(f"PRAGMA archive.journal_mode={self.journal_mode}")
+            self.conn.execute(f"PRAGMA archive.synchronous={self.synchronous}")
             self.create_tables()
         except sqlite3.Error as err:
-            print(f"Error connecting to database: {err}")
+            logger.error("Error connecting to database %s: %s", self.db_name, err)
             raise
 
+        if self.log_flush_interval > 0:
+            flusher = threading.Thread(target=self._flush_periodically, name="log-flusher", daemon=True)
+            flusher.start()
+        if self.log_compaction_interval > 0 and self.log_retention_days > 0:
+            compactor = threading.Thread(target=self._compact_periodically, name="log-compactor", daemon=True)
+            compactor.start()
+        atexit.register(self.close)
+
+    def _default_archive_name(self):
+        if self.db_name == ":memory:":
+            return ":memory:"
+        root, _ = os.path.splitext(self.db_name)
+        return f"{root}_archive.db"
+
     def create_tables(self):
         cursor = self.conn.cursor()
         
@@ -25,37 +131,607 @@ class Database:
             )
         ''')
 
+        # Bin loads are persisted so several worker processes share one view;
+        # inner dimensions and weights describe bins for the 3-D model (0 = unconstrained).
+        # Older databases predate these columns.
+        cursor.execute("PRAGMA table_info(bins)")
+        bin_columns = {col[1] for col in cursor.fetchall()}
+        for column in ("current_load",) + BIN_3D_COLUMNS:
+            if column not in bin_columns:
+                cursor.execute(f"ALTER TABLE bins ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+        # Change feed for bins: every insert/delete/load change appends a row, and
+        # MAX(version) is the change counter that process-local caches compare against
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bin_changes (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                bin_id INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS bins_load_changed AFTER UPDATE OF current_load, capacity, current_weight ON bins
+            BEGIN INSERT INTO bin_changes (bin_id) VALUES (NEW.bin_id); END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS bins_added AFTER INSERT ON bins
+            BEGIN INSERT INTO bin_changes (bin_id) VALUES (NEW.bin_id); END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS bins_removed AFTER DELETE ON bins
+            BEGIN INSERT INTO bin_changes (bin_id) VALUES (OLD.bin_id); END
+        ''')
+
+        # Shared conveyor (FIFO) and loading dock (LIFO), ordered by seq
+        for table in sorted(QUEUE_TABLES):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tracking_id TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    destination TEXT
+                )
+            ''')
+            cursor.execute(f"PRAGMA table_info({table})")
+            queue_columns = {col[1] for col in cursor.fetchall()}
+            for column in QUEUE_3D_COLUMNS:
+                if column not in queue_columns:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+        # Durable in-memory state: append-only journal of (target, op, JSON data)
+        # and the latest snapshot of the conveyor and docks, tagged with the
+        # last journal seq it includes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS state_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                target TEXT NOT NULL,
+                op TEXT NOT NULL,
+                data TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS state_snapshots (
+                journal_seq INTEGER PRIMARY KEY,
+                created INTEGER NOT NULL,
+                state TEXT NOT NULL
+            )
+        ''')
+
+        # Where every stored package is: rebuilt into PackageLocations at startup
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS package_locations (
+                tracking_id TEXT PRIMARY KEY,
+                bin_id INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                weight INTEGER NOT NULL DEFAULT 0,
+                destination TEXT
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_package_locations_bin ON package_locations (bin_id)")
+
         # Shipment Logs Table
+        # Timestamps are integer epoch milliseconds: compact, and range scans
+        # compare integers. Early databases had no id column and stored ISO text.
+        cursor.execute("PRAGMA table_info(shipment_logs)")
+        log_columns = {col[1]: col[2].upper() for col in cursor.fetchall()}
+        needs_rebuild = bool(log_columns) and ("id" not in log_columns or log_columns["timestamp"] != "INTEGER")
+        if needs_rebuild:
+            cursor.execute("ALTER TABLE shipment_logs RENAME TO shipment_logs_old")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS shipment_logs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 tracking_id TEXT,
                 bin_id INTEGER,
-                timestamp TEXT,
+                timestamp INTEGER,
                 status TEXT
             )
         ''')
+        if needs_rebuild:
+            order = "id" if "id" in log_columns else "timestamp"
+            cursor.execute(f"SELECT tracking_id, bin_id, timestamp, status FROM shipment_logs_old ORDER BY {order}")
+            cursor.executemany(
+                "INSERT INTO shipment_logs (tracking_id, bin_id, timestamp, status) VALUES (?, ?, ?, ?)",
+                [(r[0], r[1], _parse_legacy_timestamp(r[2]), r[3]) for r in cursor.fetchall()])
+            cursor.execute("DROP TABLE shipment_logs_old")
+
+        # Catalog of archive partitions, used to skip partitions a query cannot match
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive.log_partitions (
+                name TEXT PRIMARY KEY,
+                min_id INTEGER, max_id INTEGER,
+                min_ts INTEGER, max_ts INTEGER,
+                row_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Every /logs query is "newest first" (id DESC), optionally filtered on one
+        # column, so (column, id) indexes serve both the filter and the keyset cursor
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shipment_logs_tracking ON shipment_logs (tracking_id, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shipment_logs_bin ON shipment_logs (bin_id, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shipment_logs_status ON shipment_logs (status, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shipment_logs_timestamp ON shipment_logs (timestamp)")
         
         self.conn.commit()
         cursor.close()
 
     def load_bins(self):
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT bin_id, capacity, location_code, current_load FROM bins')
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def iter_bins(self, batch_size=10_000):
+        """
+        Stream (bin_id, capacity, location_code, current_load, length, width,
+        height, max_weight, current_weight) rows without materializing them all
+        """
         cursor = self.conn.cursor()
-        cursor.execute('SELECT bin_id, capacity, location_code FROM bins')
-        rows = cursor.fetchall()
+        with self._lock:
+            cursor.execute('SELECT bin_id, capacity, location_code, current_load, '
+                           + ', '.join(BIN_3D_COLUMNS) + ' FROM bins')
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
         cursor.close()
+
+    def bins_by_id(self, bin_ids):
+        """Rows as iter_bins yields them, for specific bins"""
+        rows = []
+        with self._lock:
+            for i in range(0, len(bin_ids), 500):  # Stay under SQLite's bound-variable limit
+                batch = list(bin_ids[i:i + 500])
+                rows += self.conn.execute(
+                    'SELECT bin_id, capacity, location_code, current_load, ' + ', '.join(BIN_3D_COLUMNS)
+                    + f' FROM bins WHERE bin_id IN ({", ".join("?" * len(batch))})', batch).fetchall()
         return rows
 
-    def log_shipment(self, tracking_id, bin_id, status):
-        cursor = self.conn.cursor()
-        timestamp = datetime.now().isoformat()
-        # SQLite uses ? as placeholder
-        cursor.execute('''
-            INSERT INTO shipment_logs (tracking_id, bin_id, timestamp, status)
-            VALUES (?, ?, ?, ?)
-        ''', (tracking_id, bin_id, timestamp, status))
-        self.conn.commit()
+    def insert_bins(self, rows):
+        """
+        Insert one chunk of validated bins in a single transaction. Rows are
+        (bin_id, capacity, location_code, current_load, length, width, height,
+        max_weight, current_weight); a bin_id of None is assigned by SQLite.
+        Returns (inserted rows with their bin_ids, indexes into 'rows' that
+        were skipped because the bin_id is already taken).
+        """
+        with self.write_transaction("insert_bins") as conn:
+            explicit = [row[0] for row in rows if row[0] is not None]
+            taken = set()
+            for i in range(0, len(explicit), 500):
+                batch = explicit[i:i + 500]
+                taken.update(bin_id for (bin_id,) in conn.execute(
+                    f'SELECT bin_id FROM bins WHERE bin_id IN ({", ".join("?" * len(batch))})', batch))
+            with_id, without_id, skipped = [], [], []
+            for n, row in enumerate(rows):
+                if row[0] is None:
+                    without_id.append(row)
+                elif row[0] in taken:
+                    skipped.append(n)
+                else:
+                    taken.add(row[0])
+                    with_id.append(row)
+            columns = "bin_id, capacity, location_code, current_load, " + ", ".join(BIN_3D_COLUMNS)
+            insert = f"INSERT INTO bins ({columns}) VALUES ({', '.join('?' * 9)})"
+            conn.executemany(insert, with_id)
+            if without_id:
+                conn.executemany(insert, without_id)
+                # AUTOINCREMENT numbers one executemany contiguously, ending at the last rowid
+                last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first = last - len(without_id) + 1
+                without_id = [(first + n,) + tuple(row[1:]) for n, row in enumerate(without_id)]
+        return with_id + without_id, skipped
+
+    @contextmanager
+    def write_transaction(self, operation="write"):
+        """
+        BEGIN IMMEDIATE takes SQLite's write lock up front, so read-then-write
+        steps are atomic across processes sharing the database file.
+        The transaction is timed under 'operation' in the DB write metrics.
+        """
+        with self._lock, DB_WRITE_SECONDS.time(operation=operation):
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+    # --- Shared bin state (multi-process) ---
+
+    def state_version(self) -> int:
+        """Change counter for the bins table"""
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(version), 0) FROM bin_changes").fetchone()[0]
+
+    def bin_changes_since(self, version):
+        """
+        Bins changed after 'version' as (latest_version, {bin_id: (capacity, current_load, current_weight)}).
+        Deleted bins map to None. Returns None if that part of the feed was trimmed,
+        in which case the caller has to reload everything.
+        """
+        with self._lock:
+            oldest = self.conn.execute("SELECT MIN(version) FROM bin_changes").fetchone()[0]
+            if oldest is not None and version < oldest - 1:
+                return None
+            rows = self.conn.execute('''
+                SELECT c.version, c.bin_id, b.capacity, b.current_load, b.current_weight
+                FROM bin_changes c LEFT JOIN bins b ON b.bin_id = c.bin_id
+                WHERE c.version > ? ORDER BY c.version
+            ''', (version,)).fetchall()
+        changes = {}
+        for latest, bin_id, capacity, current_load, current_weight in rows:
+            version = latest
+            changes[bin_id] = (capacity, current_load, current_weight) if capacity is not None else None
+        return version, changes
+
+    def trim_bin_changes(self, keep=100_000):
+        """Drop all but the newest 'keep' change feed rows"""
+        with self.write_transaction("trim_bin_changes") as conn:
+            conn.execute("DELETE FROM bin_changes WHERE version <= (SELECT MAX(version) FROM bin_changes) - ?",
+                         (keep,))
+
+    def reserve_bin_space(self, bin_id, amount, weight=0) -> bool:
+        """Atomically add 'amount' (and 'weight') to a bin's load if it still fits"""
+        return self.reserve_bin_space_many([(bin_id, amount, weight)])[0]
+
+    def reserve_bin_space_many(self, reservations):
+        """
+        Apply several (bin_id, amount[, weight]) reservations in one transaction;
+        one bool per reservation
+        """
+        results = []
+        with self.write_transaction("reserve_bin_space") as conn:
+            for bin_id, amount, *weight in reservations:
+                weight = weight[0] if weight else 0
+                cursor = conn.execute('''
+                    UPDATE bins SET current_load = current_load + ?, current_weight = current_weight + ?
+                    WHERE bin_id = ? AND current_load + ? <= capacity
+                      AND (max_weight = 0 OR current_weight + ? <= max_weight)
+                ''', (amount, weight, bin_id, amount, weight))
+                results.append(cursor.rowcount == 1)
+        return results
+
+    def release_bin_space(self, bin_id, amount, weight=0) -> bool:
+        with self.write_transaction("release_bin_space") as conn:
+            cursor = conn.execute('''
+                UPDATE bins SET current_load = current_load - ?, current_weight = MAX(0, current_weight - ?)
+                WHERE bin_id = ? AND current_load - ? >= 0
+            ''', (amount, weight, bin_id, amount))
+            return cursor.rowcount == 1
+
+    # --- Shared conveyor / loading dock (multi-process) ---
+
+    def queue_push(self, table, entries):
+        """
+        Append (tracking_id, size, destination, length, width, height, weight)
+        entries to a queue table; the trailing 3-D columns may be left out
+        """
+        if table not in QUEUE_TABLES:
+            raise ValueError(f"Unknown queue table: {table}")
+        entries = [tuple(entry) + (0,) * (7 - len(entry)) for entry in entries]
+        with self.write_transaction("queue_push") as conn:
+            conn.executemany(f"INSERT INTO {table} ({QUEUE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+
+    def queue_pop(self, table, count=1, newest=False):
+        """Remove and return up to 'count' entries from the oldest (FIFO) or newest (LIFO) end"""
+        if table not in QUEUE_TABLES:
+            raise ValueError(f"Unknown queue table: {table}")
+        order = "DESC" if newest else "ASC"
+        with self.write_transaction("queue_pop") as conn:
+            rows = conn.execute(f"SELECT seq, {QUEUE_COLUMNS} FROM {table} ORDER BY seq {order} LIMIT ?",
+                                (count,)).fetchall()
+            conn.executemany(f"DELETE FROM {table} WHERE seq = ?", [(r[0],) for r in rows])
+        return [r[1:] for r in rows]
+
+    def queue_rows(self, table, limit=-1):
+        """Entries of a queue table from oldest to newest"""
+        if table not in QUEUE_TABLES:
+            raise ValueError(f"Unknown queue table: {table}")
+        with self._lock:
+            return self.conn.execute(f"SELECT {QUEUE_COLUMNS} FROM {table} ORDER BY seq LIMIT ?",
+                                     (limit,)).fetchall()
+
+    # --- Package locations ---
+
+    def record_location(self, tracking_id, bin_id, size, weight=0, destination=None):
+        """Buffer 'tracking_id is in bin_id' for the next group commit"""
+        with self._lock:
+            self._mark_buffer_start()
+            self._location_buffer[tracking_id] = (tracking_id, bin_id, size, weight, destination)
+            self._flush_if_due()
+
+    def forget_location(self, tracking_id):
+        with self._lock:
+            self._mark_buffer_start()
+            self._location_buffer[tracking_id] = None
+            self._flush_if_due()
+
+    def iter_locations(self, batch_size=10_000):
+        """Stream (tracking_id, bin_id, size, weight, destination) rows of every stored package"""
+        with self._lock:
+            self.flush()
+            cursor = self.conn.execute("SELECT tracking_id, bin_id, size, weight, destination FROM package_locations")
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
         cursor.close()
 
+    def take_locations(self, tracking_ids):
+        """
+        Delete and return the location rows of 'tracking_ids' in one
+        transaction, so two workers can never pick the same package
+        """
+        with self._lock:
+            self.flush()
+            with self.write_transaction("take_locations") as conn:
+                rows = []
+                for tracking_id in tracking_ids:
+                    row = conn.execute("SELECT tracking_id, bin_id, size, weight, destination FROM package_locations "
+                                       "WHERE tracking_id = ?", (tracking_id,)).fetchone()
+                    if row is not None:
+                        conn.execute("DELETE FROM package_locations WHERE tracking_id = ?", (tracking_id,))
+                        rows.append(row)
+        return rows
+
+    def locate(self, tracking_id):
+        """(tracking_id, bin_id, size, weight, destination) of a stored package, or None"""
+        with self._lock:
+            self.flush()
+            return self.conn.execute("SELECT tracking_id, bin_id, size, weight, destination FROM package_locations "
+                                     "WHERE tracking_id = ?", (tracking_id,)).fetchone()
+
+    # --- State journal and snapshots (crash recovery) ---
+
+    def journal(self, target, op, data=None):
+        """Append one state change, e.g. ("conveyor", "push", package row), to the buffered journal"""
+        entry = (target, op, json.dumps(data))
+        with self._lock:
+            self._mark_buffer_start()
+            self._journal_buffer.append(entry)
+            self._flush_if_due()
+
+    def journal_since(self, seq):
+        """Journal entries after 'seq' as (seq, target, op, data), oldest first"""
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute("SELECT seq, target, op, data FROM state_journal WHERE seq > ? ORDER BY seq",
+                                     (seq,)).fetchall()
+        return [(s, target, op, json.loads(data)) for s, target, op, data in rows]
+
+    def latest_snapshot(self):
+        """(journal_seq, state) of the newest snapshot, or (0, None) when there is none"""
+        with self._lock:
+            row = self.conn.execute("SELECT journal_seq, state FROM state_snapshots "
+                                    "ORDER BY journal_seq DESC LIMIT 1").fetchone()
+        return (row[0], json.loads(row[1])) if row else (0, None)
+
+    def write_snapshot(self, state, bin_loads):
+        """
+        Store 'state' (JSON-serializable) as of the current end of the journal,
+        write (bin_id, current_load, current_weight) rows back to the bins
+        table and drop the journal entries the snapshot covers.
+        Callers must stop state changes while this runs. Returns the journal seq.
+        """
+        with self._lock:
+            self.flush()
+            seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM state_journal").fetchone()[0]
+            with self.write_transaction("snapshot") as conn:
+                conn.executemany("UPDATE bins SET current_load = ?, current_weight = ? WHERE bin_id = ?",
+                                 [(load, weight, bin_id) for bin_id, load, weight in bin_loads])
+                conn.execute("INSERT OR REPLACE INTO state_snapshots (journal_seq, created, state) VALUES (?, ?, ?)",
+                             (seq, now_ms(), json.dumps(state)))
+                conn.execute("DELETE FROM state_snapshots WHERE journal_seq < ?", (seq,))
+                conn.execute("DELETE FROM state_journal WHERE seq <= ?", (seq,))
+        return seq
+
+    def log_shipment(self, tracking_id, bin_id, status):
+        timestamp = now_ms()
+        with self._lock:
+            self._mark_buffer_start()
+            self._log_buffer.append((tracking_id, bin_id, timestamp, status))
+            self._flush_if_due()
+
+    def log_shipments(self, entries):
+        """Log many (tracking_id, bin_id, status) entries in one transaction"""
+        timestamp = now_ms()
+        with self._lock:
+            self._log_buffer.extend((tracking_id, bin_id, timestamp, status)
+                                    for tracking_id, bin_id, status in entries)
+            self.flush()
+
+    def query_logs(self, tracking_id=None, bin_id=None, status=None, before_id=None,
+                   since=None, until=None, limit=50):
+        """
+        Shipment logs, newest first, pending buffered rows included.
+        Reads the hot table first and then archive partitions (newest first)
+        until 'limit' rows are found; limit=-1 returns everything.
+        Keyset pagination: pass the id of the last row you got as 'before_id'
+        to fetch the next page. Each filter is served by a (column, id) index;
+        since/until (epoch ms, until exclusive) also prune archive partitions.
+        """
+        conditions, params = [], []
+        for column, value in (("tracking_id", tracking_id), ("bin_id", bin_id), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            self.flush()
+            sources = [("main.shipment_logs", None)] + [
+                (f"archive.{name}", max_id) for name, max_id in self.conn.execute('''
+                    SELECT name, max_id FROM archive.log_partitions
+                    WHERE (:before IS NULL OR min_id < :before)
+                      AND (:since IS NULL OR max_ts >= :since)
+                      AND (:until IS NULL OR min_ts < :until)
+                    ORDER BY max_id DESC
+                ''', {"before": before_id, "since": since, "until": until})
+            ]
+            results = []
+            for source, max_id in sources:
+                if results and 0 <= limit <= len(results) and max_id is not None and max_id < results[-1][0]:
+                    break  # Older partitions cannot beat the rows already found
+                cursor = self.conn.execute(f'''
+                    SELECT id, tracking_id, bin_id, timestamp, status FROM {source}
+                    {where} ORDER BY id DESC LIMIT ?
+                ''', params + [limit])
+                results.extend(cursor.fetchall())
+                results.sort(key=lambda r: r[0], reverse=True)
+                if limit >= 0:
+                    del results[limit:]
+        return results
+
+    def package_history(self, tracking_id):
+        """Every log row for one package (hot and archived), oldest first"""
+        return list(reversed(self.query_logs(tracking_id=tracking_id, limit=-1)))
+
+    # --- Log retention ---
+
+    def archive_logs(self, older_than=None, chunk_size=1000) -> int:
+        """
+        Move up to 'chunk_size' of the oldest logs written before 'older_than'
+        (epoch ms, default: now minus the retention period) into monthly
+        archive partitions, in one short transaction. Returns rows moved.
+        """
+        if older_than is None:
+            older_than = now_ms() - int(self.log_retention_days * DAY_MS)
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute('''
+                SELECT id, tracking_id, bin_id, timestamp, status FROM shipment_logs
+                WHERE timestamp < ? ORDER BY timestamp LIMIT ?
+            ''', (older_than, chunk_size)).fetchall()
+            if not rows:
+                return 0
+
+            partitions = {}
+            for row in rows:
+                name = "shipment_logs_" + datetime.fromtimestamp(row[3] / 1000).strftime("%Y%m")
+                partitions.setdefault(name, []).append(row)
+
+            with self.write_transaction("archive_logs") as conn:
+                for name, part_rows in partitions.items():
+                    self._create_partition(conn, name)
+                    conn.executemany(f"INSERT OR REPLACE INTO archive.{name} VALUES (?, ?, ?, ?, ?)", part_rows)
+                    conn.execute('''
+                        INSERT INTO archive.log_partitions (name, min_id, max_id, min_ts, max_ts, row_count)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(name) DO UPDATE SET
+                            min_id = min(min_id, excluded.min_id), max_id = max(max_id, excluded.max_id),
+                            min_ts = min(min_ts, excluded.min_ts), max_ts = max(max_ts, excluded.max_ts),
+                            row_count = row_count + excluded.row_count
+                    ''', (name, min(r[0] for r in part_rows), max(r[0] for r in part_rows),
+                          min(r[3] for r in part_rows), max(r[3] for r in part_rows), len(part_rows)))
+                conn.executemany("DELETE FROM shipment_logs WHERE id = ?", [(r[0],) for r in rows])
+        return len(rows)
+
+    def _create_partition(self, conn, name):
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS archive.{name} (
+                id INTEGER PRIMARY KEY,
+                tracking_id TEXT,
+                bin_id INTEGER,
+                timestamp INTEGER,
+                status TEXT
+            )
+        ''')
+        for column in ("tracking_id", "bin_id", "status"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{name}_{column} ON {name} ({column}, id)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{name}_timestamp ON {name} (timestamp)")
+
+    def compact_logs(self, older_than=None, chunk_size=1000, pause=0.01) -> int:
+        """
+        Archive every expired log, one chunk per transaction, pausing between
+        chunks so buffered writers and readers get the connection in between.
+        """
+        moved = 0
+        while not self._closed.is_set():
+            count = self.archive_logs(older_than, chunk_size)
+            moved += count
+            if count < chunk_size:
+                break
+            time.sleep(pause)
+        return moved
+
+    def _compact_periodically(self):
+        while not self._closed.wait(self.log_compaction_interval):
+            try:
+                self.compact_logs()
+            except sqlite3.Error as err:
+                logger.warning("Log compaction failed: %s", err)
+
+    def _pending(self) -> int:
+        return len(self._log_buffer) + len(self._journal_buffer) + len(self._location_buffer)
+
+    def _mark_buffer_start(self):
+        if self._buffer_started is None:
+            self._buffer_started = time.monotonic()
+
+    def _flush_if_due(self):
+        if self._pending() >= self.log_batch_size or self._buffer_is_stale():
+            self.flush()
+
+    def _buffer_is_stale(self) -> bool:
+        return (self.log_flush_interval > 0 and self._buffer_started is not None
+                and time.monotonic() - self._buffer_started >= self.log_flush_interval)
+
+    def flush(self):
+        """Write all buffered shipment logs, journal entries and locations in one transaction"""
+        with self._lock:
+            if not self._pending():
+                return
+            rows = self._log_buffer
+            # SQLite uses ? as placeholder
+            with DB_WRITE_SECONDS.time(operation="log_flush"), self.conn:  # Commits once, or rolls back on error
+                self.conn.executemany('''
+                    INSERT INTO shipment_logs (tracking_id, bin_id, timestamp, status)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+                self.conn.executemany("INSERT INTO state_journal (target, op, data) VALUES (?, ?, ?)",
+                                      self._journal_buffer)
+                locations = self._location_buffer.values()
+                self.conn.executemany("INSERT OR REPLACE INTO package_locations "
+                                      "(tracking_id, bin_id, size, weight, destination) VALUES (?, ?, ?, ?, ?)",
+                                      [row for row in locations if row is not None])
+                self.conn.executemany("DELETE FROM package_locations WHERE tracking_id = ?",
+                                      [(tracking_id,) for tracking_id, row in self._location_buffer.items()
+                                       if row is None])
+            self._log_buffer = []
+            self._journal_buffer = []
+            self._location_buffer = {}
+            self._buffer_started = None
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.log_flush_interval):
+            try:
+                with self._lock:
+                    if self._buffer_is_stale():
+                        self.flush()
+            except sqlite3.Error as err:
+                # e.g. "database is locked" under shared-state workers; the buffer is kept for the next tick
+                logger.warning("Timed log flush failed: %s", err)
+
     def close(self):
-        self.conn.close()
+        if self._closed.is_set():
+            return
+        with self._lock:
+            self._closed.set()
+            self.flush()
+            self.conn.close()
+        atexit.unregister(self.close)
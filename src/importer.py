@@ -0,0 +1,93 @@
+from typing import Iterator, Optional, TextIO, Tuple
+import csv
+import json
+from database import BIN_3D_COLUMNS
+from structures import FreeSpaceIndex
+
+BIN_FIELDS = ("bin_id", "capacity", "location_code", "current_load") + BIN_3D_COLUMNS
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# (line number, validated bins row or None, error message or None)
+ParsedBin = Tuple[int, Optional[tuple], Optional[str]]
+
+def _integer(record: dict, name: str, default: Optional[int] = 0, required: bool = False) -> Optional[int]:
+    value = record.get(name)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"'{name}' is required")
+        return default
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"'{name}' must be an integer")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer") from None
+    if number < 0:
+        raise ValueError(f"'{name}' must not be negative")
+    return number
+
+def bin_row(record: dict) -> tuple:
+    """
+    Validate one bin record (CSV row or JSON object) and return it as a
+    (bin_id, capacity, location_code, current_load, length, width, height,
+    max_weight, current_weight) row for Database.insert_bins.
+    bin_id is optional (None = assigned on insert); raises ValueError.
+    """
+    unknown = set(record) - set(BIN_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    bin_id = _integer(record, "bin_id", None)
+    if bin_id == 0:
+        raise ValueError("'bin_id' must be positive")
+    capacity = _integer(record, "capacity", required=True)
+    if capacity == 0:
+        raise ValueError("'capacity' must be positive")
+    if capacity > FreeSpaceIndex.MAX_FREE:
+        raise ValueError(f"'capacity' must not exceed {FreeSpaceIndex.MAX_FREE}")
+    location_code = record.get("location_code")
+    if not isinstance(location_code, str) or not location_code.strip():
+        raise ValueError("'location_code' is required")
+    current_load = _integer(record, "current_load")
+    if current_load > capacity:
+        raise ValueError("'current_load' exceeds 'capacity'")
+    extra = [_integer(record, name) for name in BIN_3D_COLUMNS]
+    max_weight, current_weight = extra[3], extra[4]
+    if max_weight and current_weight > max_weight:
+        raise ValueError("'current_weight' exceeds 'max_weight'")
+    return (bin_id, capacity, location_code.strip(), current_load, *extra)
+
+def parse_bins(stream: TextIO, fmt: str = "csv") -> Iterator[ParsedBin]:
+    """
+    Read bin records one line at a time from a CSV file (header row with
+    BIN_FIELDS column names) or JSON Lines, validating as it goes. Bad
+    records come back with their error instead of ending the import; an
+    unusable CSV header raises ValueError.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        header = reader.fieldnames or []
+        missing = {"capacity", "location_code"} - set(header)
+        unknown = set(header) - set(BIN_FIELDS)
+        if missing or unknown:
+            raise ValueError(f"CSV header needs capacity and location_code and only {', '.join(BIN_FIELDS)}")
+        for record in reader:
+            try:
+                if None in record:
+                    raise ValueError("More values than header columns")
+                yield reader.line_num, bin_row(record), None
+            except ValueError as e:
+                yield reader.line_num, None, str(e)
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object")
+            yield line_no, bin_row(record), None
+        except ValueError as e:  # json.JSONDecodeError is a ValueError
+            yield line_no, None, str(e)
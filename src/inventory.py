@@ -0,0 +1,635 @@
+from array import array
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from models import Dimensions, Package, StorageUnit
+from structures import BestFitCache, DimensionIndex, FreeSpaceIndex
+import bisect
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"LGINV1\n"
+# Columns saved in a binary snapshot, in file order (3-D columns only when dimensional)
+SNAPSHOT_COLUMNS = ("bin_ids", "capacities", "loads", "location_codes", "_ids_sorted", "_rows_by_id")
+SNAPSHOT_3D_COLUMNS = ("dims_major", "dims_mid", "dims_minor", "max_weights", "weights")
+
+def _splice(column: array, points: List[int], values: List[int]) -> array:
+    """Copy of 'column' with values[j] inserted before index points[j] (points ascending)"""
+    result, start = array(column.typecode), 0
+    for point, value in zip(points, values):
+        result += column[start:point]
+        result.append(value)
+        start = point
+    result += column[start:]
+    return result
+
+def zone_of(location_code: str) -> str:
+    """Zone prefix of a location code: the leading letters ('A' for 'A1', 'BX' for 'BX12')"""
+    end = 0
+    while end < len(location_code) and location_code[end].isalpha():
+        end += 1
+    return location_code[:end]
+
+class InventoryShard:
+    """
+    The bins of one zone inside a BinInventory: their own FreeSpaceIndex
+    (slots are inventory rows), running capacity and load totals, and a lock
+    that serializes best-fit claims within the zone only.
+    """
+    def __init__(self, zone: str):
+        self.zone = zone
+        self.free_index = FreeSpaceIndex()
+        self.lock = threading.RLock()
+        self.bins = 0
+        self.capacity = 0
+        self.load = 0
+
+    def utilization(self) -> float:
+        return self.load / self.capacity if self.capacity else 0.0
+
+class BinRef(StorageUnit):
+    """
+    Lightweight view of one row of a BinInventory.
+    Behaves like a StorageBin (same attributes and occupy/free API) but keeps
+    no state of its own, so views can be created on demand and thrown away.
+    """
+    __slots__ = ("_inventory", "row")
+
+    def __init__(self, inventory: "BinInventory", row: int):
+        self._inventory = inventory
+        self.row = row
+
+    @property
+    def bin_id(self) -> int:
+        return self._inventory.bin_ids[self.row]
+
+    @property
+    def capacity(self) -> int:
+        return self._inventory.capacities[self.row]
+
+    @property
+    def current_load(self) -> int:
+        return self._inventory.loads[self.row]
+
+    @property
+    def location_code(self) -> str:
+        return self._inventory.locations[self._inventory.location_codes[self.row]]
+
+    @property
+    def free_capacity(self) -> int:
+        return self.capacity - self.current_load
+
+    @property
+    def dimensions(self) -> Optional[Dimensions]:
+        return self._inventory.dimensions_of(self.row)
+
+    @property
+    def max_weight(self) -> int:
+        inventory = self._inventory
+        return inventory.max_weights[self.row] if inventory.dimensional else 0
+
+    @property
+    def current_weight(self) -> int:
+        inventory = self._inventory
+        return inventory.weights[self.row] if inventory.dimensional else 0
+
+    def occupy_space(self, amount: int, weight: int = 0):
+        self._inventory.occupy(self.row, amount, weight)
+
+    def free_space(self, amount: int, weight: int = 0):
+        self._inventory.free(self.row, amount, weight)
+
+    def restore_load(self, load: int, weight: Optional[int] = None):
+        self._inventory.restore_load(self.row, load, weight)
+
+    def __eq__(self, other):
+        return isinstance(other, BinRef) and other._inventory is self._inventory and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self._inventory), self.row))
+
+    def __lt__(self, other):
+        return self.capacity < other.capacity
+
+    def __repr__(self):
+        return f"StorageBin(id={self.bin_id}, capacity={self.capacity}, load={self.current_load})"
+
+class BinInventory:
+    """
+    Columnar bin store.
+    bin_id, capacity and current_load live in array('q') columns ordered by
+    capacity (row = position in that order), location codes are interned
+    into a small table and stored per row as array('I') codes. No Python
+    object exists per bin, so a million bins cost a few tens of MB.
+    A FreeSpaceIndex over rows is kept in step with every load change.
+    Bins added later through add_bins() are appended after the sorted rows.
+
+    Best-fit lookups go through a BestFitCache that every load change keeps
+    exact (size LOGISTECH_BEST_FIT_CACHE_SIZE, 0 disables it).
+
+    Bins may also have inner dimensions and a weight limit (3-D model). Those
+    columns (dims largest first, max_weights, weights) and the DimensionIndex
+    over them only exist when at least one bin uses them ('dimensional'),
+    so a plain 1-D inventory pays nothing for them.
+
+    shard_by_zone() splits the bins into one InventoryShard per zone prefix
+    of their location codes; the shards' indexes are then kept in step too.
+
+    Every load change bumps 'version' and is recorded in a bounded change
+    log, so clients can ask which bins changed since the version they last
+    saw. A reloaded inventory starts above the previous version
+    ('base_version'), which forces clients of the old one to resync.
+    """
+    CHANGE_LOG_SIZE = 65_536
+
+    def __init__(self, base_version: int = 0, cache_size: Optional[int] = None):
+        self.bin_ids = array('q')
+        self.capacities = array('q')
+        self.loads = array('q')
+        self.location_codes = array('I')
+        self.dimensional = False
+        self.dims_major, self.dims_mid, self.dims_minor = array('q'), array('q'), array('q')
+        self.max_weights = array('q')
+        self.weights = array('q')
+        self.dimension_index: Optional[DimensionIndex] = None
+        self.locations: List[str] = []
+        self._location_lookup = {}
+        # bin_id -> row, as two arrays sorted by bin_id (binary search, no dict per bin)
+        self._ids_sorted = array('q')
+        self._rows_by_id = array('q')
+        self.free_index = FreeSpaceIndex()
+        if cache_size is None:
+            cache_size = int(os.getenv("LOGISTECH_BEST_FIT_CACHE_SIZE", 1024))
+        self.best_fit_cache = BestFitCache(self.free_index, cache_size)
+        # Makes check-and-update of a load atomic; re-entrant so a checkpoint can hold it while reading
+        self.lock = threading.RLock()
+        self._listeners: List[Callable[[BinRef, int], None]] = []
+        self.base_version = base_version
+        self.version = base_version
+        self._changes = deque(maxlen=self.CHANGE_LOG_SIZE)  # (version, row)
+        self.shards: Dict[str, InventoryShard] = {}
+        self._shard_by_code: List[InventoryShard] = []  # Location code -> shard, once sharded
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], base_version: int = 0) -> "BinInventory":
+        """
+        Bulk load from (bin_id, capacity, location_code, current_load) rows,
+        e.g. straight from a database cursor, then sort by capacity in C.
+        Rows may carry (length, width, height, max_weight, current_weight)
+        after those four columns for the 3-D model.
+        """
+        bin_ids, capacities, loads, codes = array('q'), array('q'), array('q'), array('I')
+        extra = [array('q') for _ in range(5)]  # major, mid, minor, max_weight, weight
+        inventory = cls(base_version)
+        dimensional = False
+        for row in rows:
+            bin_ids.append(row[0])
+            capacities.append(row[1])
+            codes.append(inventory._intern(row[2]))
+            loads.append(row[3] or 0)
+            if len(row) > 4:
+                major, mid, minor = sorted((row[4] or 0, row[5] or 0, row[6] or 0), reverse=True)
+                for column, value in zip(extra, (major, mid, minor, row[7] or 0, row[8] or 0)):
+                    column.append(value)
+                dimensional = dimensional or major > 0 or bool(row[7])
+            else:
+                for column in extra:
+                    column.append(0)
+
+        order = sorted(range(len(capacities)), key=capacities.__getitem__)
+        inventory.bin_ids = array('q', map(bin_ids.__getitem__, order))
+        inventory.capacities = array('q', map(capacities.__getitem__, order))
+        inventory.loads = array('q', map(loads.__getitem__, order))
+        inventory.location_codes = array('I', map(codes.__getitem__, order))
+        if dimensional:
+            inventory.dimensional = True
+            (inventory.dims_major, inventory.dims_mid, inventory.dims_minor,
+             inventory.max_weights, inventory.weights) = (array('q', map(c.__getitem__, order)) for c in extra)
+        inventory._rebuild_lookups()
+        return inventory
+
+    def save(self, path: str, state_version: int):
+        """
+        Write the sorted columns, lookups and free-space keys to a binary
+        snapshot tagged with the database change counter they reflect.
+        load() then only copies bytes into arrays; nothing is parsed or sorted.
+        The file is replaced atomically.
+        """
+        with self.lock:
+            columns = [(name, getattr(self, name)) for name in SNAPSHOT_COLUMNS]
+            if self.dimensional:
+                columns += [(name, getattr(self, name)) for name in SNAPSHOT_3D_COLUMNS]
+            columns = [(name, array(column.typecode, column)) for name, column in columns]
+            columns.append(("free_keys", self.free_index.keys()))
+            locations = list(self.locations)
+        header = json.dumps({
+            "state_version": state_version,
+            "byteorder": sys.byteorder,
+            "dimensional": self.dimensional,
+            "locations": locations,
+            "columns": [(name, column.typecode, column.itemsize, len(column)) for name, column in columns],
+        }).encode()
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for _, column in columns:
+                column.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, state_version: int, base_version: int = 0) -> Optional["BinInventory"]:
+        """
+        Inventory from a snapshot written by save(), or None when the file is
+        missing, unreadable or was taken at another database change counter
+        (the bins changed since, so the caller has to load them from the database).
+        """
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    return None
+                (length,) = struct.unpack("<Q", f.read(8))
+                header = json.loads(f.read(length))
+                if header["state_version"] != state_version or header["byteorder"] != sys.byteorder:
+                    return None
+                inventory = cls(base_version)
+                for name, typecode, itemsize, count in header["columns"]:
+                    column = array(typecode)
+                    if column.itemsize != itemsize:
+                        return None
+                    column.fromfile(f, count)  # One C-level read per column
+                    if name == "free_keys":
+                        inventory.free_index.restore(column)
+                    else:
+                        setattr(inventory, name, column)
+        except (OSError, EOFError, ValueError, KeyError, struct.error) as err:
+            logger.warning("Ignoring inventory snapshot %s: %s", path, err)
+            return None
+        inventory.locations = header["locations"]
+        inventory._location_lookup = {location: code for code, location in enumerate(inventory.locations)}
+        if header["dimensional"]:
+            inventory.dimensional = True
+            inventory._rebuild_dimension_index()
+        return inventory
+
+    def add_bins(self, rows: Iterable[tuple]) -> List[int]:
+        """
+        Merge new bins (rows as for from_rows) into the live inventory without
+        a reload: they are appended as new rows, and the bin_id lookup, the
+        free-space index and zone shards are spliced in one pass each. Rows
+        past the original ones are therefore not in capacity order; nothing
+        relies on that, best-fit goes through the free-space index. Each new
+        row is recorded in the change log. Returns the new rows.
+        """
+        rows = list(rows)
+        with self.lock:
+            start = len(self.bin_ids)
+            ids = sorted((row[0], start + n) for n, row in enumerate(rows))
+            for n, (bin_id, _) in enumerate(ids):
+                if (n and ids[n - 1][0] == bin_id) or self.row_of(bin_id) is not None:
+                    raise ValueError(f"Bin {bin_id} already exists")
+            for row in rows:
+                if row[1] > FreeSpaceIndex.MAX_FREE:
+                    raise ValueError(f"Bin {row[0]} capacity exceeds {FreeSpaceIndex.MAX_FREE}")
+            if not self.dimensional and any(len(row) > 4 and (any(row[4:7]) or row[7]) for row in rows):
+                # First bins with a 3-D shape: give the existing ones unconstrained columns
+                for name in SNAPSHOT_3D_COLUMNS:
+                    setattr(self, name, array('q', bytes(8 * start)))
+                self.dimensional = True
+            for row in rows:
+                self.bin_ids.append(row[0])
+                self.capacities.append(row[1])
+                self.location_codes.append(self._intern(row[2]))
+                self.loads.append(row[3] or 0)
+                if self.dimensional:
+                    extra = [value or 0 for value in row[4:9]] if len(row) > 4 else [0] * 5
+                    columns = (self.dims_major, self.dims_mid, self.dims_minor, self.max_weights, self.weights)
+                    for column, value in zip(columns, sorted(extra[:3], reverse=True) + extra[3:]):
+                        column.append(value)
+
+            points = [bisect.bisect_left(self._ids_sorted, bin_id) for bin_id, _ in ids]
+            self._ids_sorted = _splice(self._ids_sorted, points, [bin_id for bin_id, _ in ids])
+            self._rows_by_id = _splice(self._rows_by_id, points, [row for _, row in ids])
+            new_rows = range(start, len(self.bin_ids))
+            self.free_index.insert_many((row, self.capacities[row] - self.loads[row]) for row in new_rows)
+            self.best_fit_cache.clear()
+            if self.dimensional:
+                self._rebuild_dimension_index()
+            if self._shard_by_code:
+                self._add_to_shards(new_rows)
+            for row in new_rows:
+                self.version += 1
+                self._changes.append((self.version, row))
+            return list(new_rows)
+
+    def _add_to_shards(self, rows: range):
+        # Caller holds self.lock
+        for location in self.locations[len(self._shard_by_code):]:
+            zone = zone_of(location)
+            if zone not in self.shards:
+                self.shards[zone] = InventoryShard(zone)
+                self.shards = dict(sorted(self.shards.items()))
+            self._shard_by_code.append(self.shards[zone])
+        free_by_shard = {}
+        for row in rows:
+            shard = self._shard_by_code[self.location_codes[row]]
+            capacity, load = self.capacities[row], self.loads[row]
+            shard.bins += 1
+            shard.capacity += capacity
+            shard.load += load
+            free_by_shard.setdefault(shard, []).append((row, capacity - load))
+        for shard, free in free_by_shard.items():
+            shard.free_index.insert_many(free)
+
+    def _intern(self, location_code: str) -> int:
+        code = self._location_lookup.get(location_code)
+        if code is None:
+            code = len(self.locations)
+            self.locations.append(location_code)
+            self._location_lookup[location_code] = code
+        return code
+
+    def _rebuild_lookups(self):
+        by_id = sorted(range(len(self.bin_ids)), key=self.bin_ids.__getitem__)
+        self._ids_sorted = array('q', map(self.bin_ids.__getitem__, by_id))
+        self._rows_by_id = array('q', by_id)
+        self.free_index.build(c - l for c, l in zip(self.capacities, self.loads))
+        self.best_fit_cache.clear()
+        if self.dimensional:
+            self._rebuild_dimension_index()
+
+    def _rebuild_dimension_index(self):
+        self.dimension_index = DimensionIndex(
+            list(zip(self.dims_major, self.dims_mid, self.dims_minor)),
+            (c - l for c, l in zip(self.capacities, self.loads)),
+            (self._free_weight(row) for row in range(len(self.bin_ids))))
+
+    def shard_by_zone(self):
+        """Build one InventoryShard per zone (see zone_of) from the current loads"""
+        with self.lock:
+            shards = {}
+            by_code = [shards.setdefault(zone_of(location), InventoryShard(zone_of(location)))
+                       for location in self.locations]
+            free_by_shard = {zone: [] for zone in shards}
+            for row, code in enumerate(self.location_codes):
+                shard = by_code[code]
+                capacity, load = self.capacities[row], self.loads[row]
+                shard.bins += 1
+                shard.capacity += capacity
+                shard.load += load
+                free_by_shard[shard.zone].append(((capacity - load) << FreeSpaceIndex.SLOT_BITS) | row)
+            for zone, keys in free_by_shard.items():
+                keys.sort()
+                shards[zone].free_index.restore(array('q', keys))
+            self.shards = dict(sorted(shards.items()))
+            self._shard_by_code = by_code
+
+    def shard_of(self, row: int) -> Optional[InventoryShard]:
+        return self._shard_by_code[self.location_codes[row]] if self._shard_by_code else None
+
+    def _free_weight(self, row: int) -> int:
+        limit = self.max_weights[row]
+        return limit - self.weights[row] if limit else DimensionIndex.UNBOUNDED
+
+    def dimensions_of(self, row: int) -> Optional[Dimensions]:
+        """Inner dimensions of a bin, largest first (None when unconstrained)"""
+        if not self.dimensional or not self.dims_major[row]:
+            return None
+        return self.dims_major[row], self.dims_mid[row], self.dims_minor[row]
+
+    def __len__(self) -> int:
+        return len(self.bin_ids)
+
+    def __getitem__(self, row: int) -> BinRef:
+        if row < 0:
+            row += len(self.bin_ids)
+        if not 0 <= row < len(self.bin_ids):
+            raise IndexError("bin row out of range")
+        return BinRef(self, row)
+
+    def __iter__(self) -> Iterator[BinRef]:
+        for row in range(len(self.bin_ids)):
+            yield BinRef(self, row)
+
+    def row_of(self, bin_id: int) -> Optional[int]:
+        i = bisect.bisect_left(self._ids_sorted, bin_id)
+        if i < len(self._ids_sorted) and self._ids_sorted[i] == bin_id:
+            return self._rows_by_id[i]
+        return None
+
+    def get(self, bin_id: int) -> Optional[BinRef]:
+        row = self.row_of(bin_id)
+        return BinRef(self, row) if row is not None else None
+
+    def best_fit(self, size: int) -> Optional[BinRef]:
+        """Bin with the least free space that still fits 'size' (O(1) for cached sizes)"""
+        row = self.best_fit_cache.best_fit(size)
+        return BinRef(self, row) if row is not None else None
+
+    def best_fit_package(self, package: Package) -> Optional[BinRef]:
+        """
+        Tightest bin for a package under the 3-D model: its dimensions must
+        fit the bin's, and its volume and weight the bin's remaining room.
+        Packages without dimensions or weight use the plain best_fit.
+        """
+        if self.dimension_index is None or (package.dimensions is None and not package.weight):
+            return self.best_fit(package.volume)
+        row = self.dimension_index.best_fit(package.dimensions, package.volume, package.weight)
+        return BinRef(self, row) if row is not None else None
+
+    def best_fit_in_zone(self, size: int, zone: str) -> Optional[BinRef]:
+        """Tightest bin of one zone's shard that fits 'size'"""
+        shard = self.shards.get(zone)
+        row = shard.free_index.best_fit(size) if shard is not None else None
+        return BinRef(self, row) if row is not None else None
+
+    def subscribe(self, callback: Callable[[BinRef, int], None]):
+        """Register callback(bin, old_load), called after every load change"""
+        self._listeners.append(callback)
+
+    def _set_load(self, row: int, load: int, weight: Optional[int] = None):
+        # Caller holds self.lock
+        old_load = self.loads[row]
+        weight_changed = self.dimensional and weight is not None and weight != self.weights[row]
+        if load == old_load and not weight_changed:
+            return
+        capacity = self.capacities[row]
+        self.loads[row] = load
+        if weight_changed:
+            self.weights[row] = weight
+        if load != old_load:
+            self.free_index.move(row, capacity - old_load, capacity - load)
+            self.best_fit_cache.moved(row, capacity - old_load, capacity - load)
+            if self._shard_by_code:
+                shard = self._shard_by_code[self.location_codes[row]]
+                shard.free_index.move(row, capacity - old_load, capacity - load)
+                shard.load += load - old_load
+        if self.dimension_index is not None:
+            self.dimension_index.update(row, capacity - load, self._free_weight(row))
+        self.version += 1
+        self._changes.append((self.version, row))
+        if self._listeners:
+            ref = BinRef(self, row)
+            for callback in self._listeners:
+                callback(ref, old_load)
+
+    def occupy(self, row: int, amount: int, weight: int = 0):
+        with self.lock:
+            if self.loads[row] + amount > self.capacities[row]:
+                raise ValueError("Bin capacity exceeded")
+            new_weight = None
+            if self.dimensional:
+                new_weight = self.weights[row] + weight
+                if self.max_weights[row] and new_weight > self.max_weights[row]:
+                    raise ValueError("Bin weight limit exceeded")
+            self._set_load(row, self.loads[row] + amount, new_weight)
+
+    def free(self, row: int, amount: int, weight: int = 0):
+        with self.lock:
+            if self.loads[row] - amount < 0:
+                raise ValueError("Cannot free more space than occupied")
+            new_weight = max(0, self.weights[row] - weight) if self.dimensional else None
+            self._set_load(row, self.loads[row] - amount, new_weight)
+
+    def restore_load(self, row: int, load: int, weight: Optional[int] = None):
+        """Overwrite a load (and weight) with values read back from storage"""
+        with self.lock:
+            if not 0 <= load <= self.capacities[row]:
+                raise ValueError("Restored load is outside the bin capacity")
+            self._set_load(row, load, weight)
+
+    def columns(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, int, int, str]]:
+        """
+        (bin_id, capacity, current_load, location_code) per row, read straight
+        from a consistent copy of the columns (for serialization).
+        """
+        with self.lock:
+            bin_ids = self.bin_ids[start:stop]
+            capacities = self.capacities[start:stop]
+            loads = self.loads[start:stop]
+            codes = self.location_codes[start:stop]
+        return zip(bin_ids, capacities, loads, map(self.locations.__getitem__, codes))
+
+    def changed_since(self, version: int) -> Optional[Tuple[int, List[int]]]:
+        """
+        (current_version, rows changed after 'version'), or None when the change
+        log no longer covers that version (or it belongs to another inventory)
+        and the caller has to fetch everything again.
+        """
+        with self.lock:
+            if version == self.version:
+                return self.version, []
+            if version < self.base_version or version > self.version:
+                return None
+            if not self._changes or self._changes[0][0] > version + 1:
+                return None
+            rows = set()
+            for changed_version, row in reversed(self._changes):
+                if changed_version <= version:
+                    break
+                rows.add(row)
+            return self.version, sorted(rows)
+
+    def utilization(self) -> float:
+        """Occupied share of the total capacity"""
+        with self.lock:
+            capacity = sum(self.capacities)
+            return sum(self.loads) / capacity if capacity else 0.0
+
+    def rows_in_zone(self, zone: str) -> List[int]:
+        """Rows whose location code starts with the given zone prefix"""
+        codes = {code for code, location in enumerate(self.locations) if zone_of(location) == zone}
+        return [row for row, code in enumerate(self.location_codes) if code in codes]
+
+    def row_values(self, rows: Iterable[int]) -> List[Tuple[int, int, int, str]]:
+        """(bin_id, capacity, current_load, location_code) for specific rows"""
+        with self.lock:
+            return [(self.bin_ids[r], self.capacities[r], self.loads[r],
+                     self.locations[self.location_codes[r]]) for r in rows]
+
+class PackageLocations:
+    """
+    Which packages sit in which bin: tracking_id -> (bin_id, size, weight,
+    destination) plus the contents of every bin, both O(1) to update.
+    Kept in step by the controller whenever it stores, moves or picks a
+    package. With a database every change is also written through its
+    group-commit buffer, and restore() rebuilds the index at startup.
+    """
+    def __init__(self, db=None):
+        self._by_package = {}  # tracking_id -> (bin_id, size, weight, destination)
+        self._by_bin = {}      # bin_id -> {tracking_id: None}, in storing order
+        self.lock = threading.Lock()
+        self.db = db
+
+    def restore(self, rows: Iterable[Tuple[str, int, int, int, Optional[str]]]):
+        """Replace the index with (tracking_id, bin_id, size, weight, destination) rows"""
+        by_package, by_bin = {}, {}
+        for tracking_id, bin_id, size, weight, destination in rows:
+            by_package[tracking_id] = (bin_id, size, weight, destination)
+            by_bin.setdefault(bin_id, {})[tracking_id] = None
+        with self.lock:
+            self._by_package, self._by_bin = by_package, by_bin
+
+    def add(self, tracking_id: str, bin_id: int, size: int, weight: int = 0, destination: Optional[str] = None):
+        with self.lock:
+            self._remove(tracking_id)
+            self._put(tracking_id, (bin_id, size, weight, destination))
+
+    def remove(self, tracking_id: str) -> Optional[Tuple[int, int, int, Optional[str]]]:
+        with self.lock:
+            entry = self._remove(tracking_id)
+            if entry is not None and self.db is not None:
+                self.db.forget_location(tracking_id)
+            return entry
+
+    def _put(self, tracking_id: str, entry: Tuple[int, int, int, Optional[str]]):
+        self._by_package[tracking_id] = entry
+        self._by_bin.setdefault(entry[0], {})[tracking_id] = None
+        if self.db is not None:
+            self.db.record_location(tracking_id, *entry)
+
+    def _remove(self, tracking_id: str) -> Optional[Tuple[int, int, int, Optional[str]]]:
+        entry = self._by_package.pop(tracking_id, None)
+        if entry is not None:
+            contents = self._by_bin[entry[0]]
+            del contents[tracking_id]
+            if not contents:
+                del self._by_bin[entry[0]]
+        return entry
+
+    def move(self, tracking_id: str, bin_id: int):
+        with self.lock:
+            entry = self._remove(tracking_id)
+            if entry is None:
+                raise KeyError(tracking_id)
+            self._put(tracking_id, (bin_id,) + entry[1:])
+
+    def get(self, tracking_id: str) -> Optional[Tuple[int, int, int, Optional[str]]]:
+        return self._by_package.get(tracking_id)
+
+    def contents(self, bin_id: int) -> List[Tuple[str, int, int]]:
+        """(tracking_id, size, weight) of every package in a bin"""
+        with self.lock:
+            return [(tracking_id,) + self._by_package[tracking_id][1:3] for tracking_id in self._by_bin.get(bin_id, ())]
+
+    def tracking_ids(self, bin_id: int) -> List[str]:
+        with self.lock:
+            return list(self._by_bin.get(bin_id, ()))
+
+    def totals_by_bin(self) -> Dict[int, Tuple[int, int]]:
+        """bin_id -> (total size, total weight) of the packages stored in it"""
+        with self.lock:
+            totals = {}
+            for bin_id, contents in self._by_bin.items():
+                entries = [self._by_package[tracking_id] for tracking_id in contents]
+                totals[bin_id] = (sum(entry[1] for entry in entries), sum(entry[2] for entry in entries))
+            return totals
+
+    def __len__(self) -> int:
+        return len(self._by_package)
@@ -1,3 +1,4 @@
+import logging
 from controller import LogiMaster
 from models import Package
 from database import Database
@@ -17,11 +18,13 @@ def setup_dummy_data():
         (4, 50, 'B2'),
         (5, 100, 'C1')
     ]
-    cursor.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (%s, %s, %s)", bins)
+    cursor.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)", bins)
     db.conn.commit()
     db.close()
 
 def main():
+    # The controller reports every step through logging; show all of it in the demo
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     print("=== LogisTech System Startup ===")
     setup_dummy_data()
     
@@ -60,7 +63,7 @@ def main():
     # Truck capacity 100
     # 30+40+20 = 90 (Fits)
     # 30+40+50 = 120 (Too big)
-    # The backtracking should find a combination that fits.
+    # 30+20+50 = 100 (Fills the truck exactly, so the planner picks this one)
     controller.load_truck(100, truck_pkgs)
 
     print("\n--- Verification Complete ---")
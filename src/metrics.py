@@ -0,0 +1,308 @@
+from bisect import bisect_left
+from collections import Counter as _SampleCounter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import os
+import sys
+import threading
+import time
+
+# Latency buckets in seconds, 10us .. 10s
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+class Metric:
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if not labels and not self.labelnames:
+            return ()
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Monotonically increasing count, one series per label combination"""
+    TYPE = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key: Tuple[str, ...], amount: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def labels(self, **labels) -> "_BoundCounter":
+        """Series with fixed label values, for hot paths (skips the per-call label lookup)"""
+        return _BoundCounter(self, self._key(labels))
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(Metric):
+    """
+    Value that can go up and down. Either set explicitly, or computed at
+    scrape time by a function installed with set_function (returning a
+    number, or a {label values tuple: number} dict for labelled gauges).
+    """
+    TYPE = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], object]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Optional[Callable[[], object]]):
+        """Replace the scrape-time callback (None removes it)"""
+        self._function = function
+
+    def samples(self):
+        function = self._function
+        if function is not None:
+            value = function()
+            values = list(value.items()) if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class _Timer:
+    __slots__ = ("_histogram", "_key", "_start")
+
+    def __init__(self, histogram: "Histogram", key: Tuple[str, ...]):
+        self._histogram = histogram
+        self._key = key
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram._observe(self._key, time.perf_counter() - self._start)
+        return False
+
+class Histogram(Metric):
+    """Latency distribution in fixed buckets (seconds), with sum and count"""
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: Tuple[str, ...], value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def time(self, **labels) -> _Timer:
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, self._key(labels))
+
+    def labels(self, **labels) -> "_BoundHistogram":
+        """Series with fixed label values, for hot paths (skips the per-call label lookup)"""
+        return _BoundHistogram(self, self._key(labels))
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(values[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class _BoundCounter:
+    __slots__ = ("_counter", "_key")
+
+    def __init__(self, counter: Counter, key: Tuple[str, ...]):
+        self._counter = counter
+        self._key = key
+
+    def inc(self, amount: float = 1):
+        self._counter._inc(self._key, amount)
+
+class _BoundHistogram:
+    __slots__ = ("_histogram", "_key")
+
+    def __init__(self, histogram: Histogram, key: Tuple[str, ...]):
+        self._histogram = histogram
+        self._key = key
+
+    def observe(self, value: float):
+        self._histogram._observe(self._key, value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._histogram, self._key)
+
+# --- LogisTech metrics ---
+
+BEST_FIT_SECONDS = Histogram("logistech_best_fit_seconds", "Best-fit bin search (including the space claim)")
+TRUCK_PLAN_SECONDS = Histogram("logistech_truck_plan_seconds", "Truck load optimization", ["engine"])
+DB_WRITE_SECONDS = Histogram("logistech_db_write_seconds", "Database write transactions", ["operation"])
+QUEUE_OP_SECONDS = Histogram("logistech_queue_op_seconds", "Conveyor and loading dock operations", ["queue", "op"])
+PACKAGES_STORED = Counter("logistech_packages_stored_total", "Packages assigned to a bin")
+PACKAGES_PICKED = Counter("logistech_packages_picked_total", "Packages retrieved from their bin")
+ASSIGNMENT_FAILURES = Counter("logistech_assignment_failures_total", "Failed storage assignments", ["reason"])
+PLANNER_JOBS = Counter("logistech_planner_jobs_total", "Truck planning jobs by outcome (cached, shared, solved, failed)",
+                       ["result"])
+DEFRAG_MOVES = Counter("logistech_defrag_moves_total", "Packages moved between bins by defragmentation")
+BINS_IMPORTED = Counter("logistech_bins_imported_total", "Bin records from imports by outcome (imported, skipped)",
+                        ["result"])
+QUEUE_DEPTH = Gauge("logistech_queue_depth", "Packages waiting in a queue", ["queue"])
+LANE_DEPTH = Gauge("logistech_lane_depth", "Packages waiting per priority conveyor lane", ["lane"])
+LANE_WAIT_SECONDS = Histogram("logistech_lane_wait_seconds", "Time packages waited in a conveyor lane", ["lane"],
+                              buckets=(0.001, 0.01, 0.1, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0))
+BIN_UTILIZATION = Gauge("logistech_bin_utilization_ratio", "Occupied share of total bin capacity")
+ZONE_UTILIZATION = Gauge("logistech_zone_utilization_ratio", "Occupied share of bin capacity per zone shard", ["zone"])
+BEST_FIT_CACHE = Gauge("logistech_best_fit_cache", "Best-fit cache entries, hits, misses, evictions, updates and hit rate", ["stat"])
+
+class SamplingProfiler:
+    """
+    Opt-in wall-clock sampling profiler.
+    A daemon thread records the stack of every other thread each 'interval'
+    seconds; folded() returns the counts in the collapsed-stack format that
+    flame graph tools read ("module:function;module:function count").
+    Enabled with LOGISTECH_PROFILE_INTERVAL (seconds, 0 = off).
+    """
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = _SampleCounter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["SamplingProfiler"]:
+        interval = float(os.getenv("LOGISTECH_PROFILE_INTERVAL", 0))
+        return cls(interval) if interval > 0 else None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own_id)
+
+    def sample(self, exclude: Optional[int] = None):
+        """Record one stack per thread"""
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stacks.append(";".join(reversed(names)))
+        with self._lock:
+            self.samples.update(stacks)
+
+    def folded(self) -> str:
+        with self._lock:
+            items = self.samples.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
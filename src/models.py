@@ -1,37 +1,112 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import Optional, Tuple
+
+Dimensions = Tuple[int, int, int]
+
+def oriented(dimensions: Optional[Dimensions]) -> Optional[Dimensions]:
+    """Dimensions largest first; items may be rotated, so this is all that matters for fitting"""
+    return tuple(sorted(dimensions, reverse=True)) if dimensions else None
+
+def fits_within(item: Dimensions, space: Dimensions) -> bool:
+    """Whether a box fits inside a space in some axis-aligned orientation"""
+    return all(i <= s for i, s in zip(oriented(item), oriented(space)))
 
 @dataclass
 class Package:
     tracking_id: str
     size: int
     destination: str
+    # Optional 3-D model: (length, width, height) and weight. Without dimensions
+    # 'size' is the package's volume, as in the original 1-D model.
+    dimensions: Optional[Dimensions] = None
+    weight: int = 0
+    deadline: Optional[float] = None  # SLA deadline, epoch seconds
+    zone: Optional[str] = None  # Zone it arrives in, for the 'nearest' zone policy
+
+    @property
+    def volume(self) -> int:
+        if self.dimensions:
+            length, width, height = self.dimensions
+            return length * width * height
+        return self.size
+
+@dataclass
+class Truck:
+    truck_id: str
+    capacity: int
+    # Destinations on the truck's route; empty means it takes any destination
+    destinations: Tuple[str, ...] = ()
+    dock: int = 1  # Dock door it is loaded at
+
+    def serves(self, destination: str) -> bool:
+        return not self.destinations or destination in self.destinations
 
 class StorageUnit(ABC):
+    __slots__ = ()
+
     @abstractmethod
-    def occupy_space(self, amount: int):
+    def occupy_space(self, amount: int, weight: int = 0):
         pass
 
     @abstractmethod
-    def free_space(self, amount: int):
+    def free_space(self, amount: int, weight: int = 0):
         pass
 
 class StorageBin(StorageUnit):
-    def __init__(self, bin_id: int, capacity: int, location_code: str):
+    """
+    Bin with a volume 'capacity'. Optionally 'dimensions' (inner length, width,
+    height) limit which items fit at all, and 'max_weight' limits the total
+    weight stored; 0/None means unconstrained.
+    The live inventory keeps bins in a columnar BinInventory instead; its
+    BinRef views offer the same attributes and methods.
+    """
+    __slots__ = ("bin_id", "capacity", "location_code", "current_load", "dimensions", "max_weight",
+                 "current_weight")
+
+    def __init__(self, bin_id: int, capacity: int, location_code: str,
+                 dimensions: Optional[Dimensions] = None, max_weight: int = 0):
         self.bin_id = bin_id
         self.capacity = capacity
         self.location_code = location_code
         self.current_load = 0
+        self.dimensions = dimensions
+        self.max_weight = max_weight
+        self.current_weight = 0
 
-    def occupy_space(self, amount: int):
+    @property
+    def free_capacity(self) -> int:
+        return self.capacity - self.current_load
+
+    def can_hold(self, package: Package) -> bool:
+        """Whether the package fits right now (dimensions, free volume and weight)"""
+        if self.dimensions and package.dimensions and not fits_within(package.dimensions, self.dimensions):
+            return False
+        if self.max_weight and self.current_weight + package.weight > self.max_weight:
+            return False
+        return package.volume <= self.free_capacity
+
+    def occupy_space(self, amount: int, weight: int = 0):
         if self.current_load + amount > self.capacity:
             raise ValueError("Bin capacity exceeded")
+        if self.max_weight and self.current_weight + weight > self.max_weight:
+            raise ValueError("Bin weight limit exceeded")
         self.current_load += amount
+        self.current_weight += weight
 
-    def free_space(self, amount: int):
+    def free_space(self, amount: int, weight: int = 0):
         if self.current_load - amount < 0:
             raise ValueError("Cannot free more space than occupied")
         self.current_load -= amount
+        self.current_weight = max(0, self.current_weight - weight)
+
+    def restore_load(self, load: int, weight: Optional[int] = None):
+        """Overwrite the load (and weight) with values read back from storage"""
+        if not 0 <= load <= self.capacity:
+            raise ValueError("Restored load is outside the bin capacity")
+        self.current_load = load
+        if weight is not None:
+            self.current_weight = weight
 
     def __lt__(self, other):
         # Critical for Binary Search: sort by capacity
@@ -0,0 +1,171 @@
+from collections import Counter as Multiset, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from models import Package
+from algorithms import process_pool, solve_truck_loading
+from metrics import PLANNER_JOBS, TRUCK_PLAN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+def plan_key(capacity: int, sizes: List[int]) -> str:
+    """
+    Canonical hash of a 1-D manifest: the solve depends only on the capacity
+    and the multiset of sizes, so reordered or relabelled manifests share it
+    """
+    canonical = json.dumps([capacity, sorted(sizes)], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+# (sizes of the best load or None if nothing fits, engine class name, solve seconds)
+PlanResult = Tuple[Optional[List[int]], str, float]
+
+def _solve_sizes(capacity: int, sizes: List[int]) -> PlanResult:
+    """Runs in a pool process; the timing goes back to the parent, which records it"""
+    chosen, engine, seconds = solve_truck_loading(capacity, [Package(str(i), size, "") for i, size in enumerate(sizes)])
+    return (sorted(p.size for p in chosen) if chosen else None), engine, seconds
+
+def _select(packages: List[Package], sizes: Optional[List[int]]) -> List[Package]:
+    """Packages matching a chosen multiset of sizes, in manifest order"""
+    wanted = Multiset(sizes or ())
+    selected = []
+    for package in packages:
+        if wanted[package.size]:
+            wanted[package.size] -= 1
+            selected.append(package)
+    return selected
+
+@dataclass
+class PlanJob:
+    job_id: str
+    capacity: int
+    packages: List[Package]
+    key: str
+    future: Future
+    cached: bool = False
+    committed: bool = False
+    created: float = field(default_factory=time.time)
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        if self.future.exception() is not None:
+            return "failed"
+        return "committed" if self.committed else "done"
+
+    @property
+    def load(self) -> List[Package]:
+        """Planned packages (blocks until the solve is finished)"""
+        return _select(self.packages, self.future.result()[0])
+
+class PlanningJobs:
+    """
+    Truck-planning job queue.
+    submit() returns a job at once; the subset-sum solve runs on a process
+    pool ('workers' processes, LOGISTECH_PLANNER_WORKERS, 0 = solve in the
+    calling thread) so API threads never wait on the GIL of a long solve.
+    Results are cached by plan_key (LRU of 'cache_size' manifests,
+    LOGISTECH_PLANNER_CACHE_SIZE) and identical manifests submitted while
+    one is still solving share its future. Only the newest 'max_jobs' jobs
+    are kept for lookup. solve() gives up after 'timeout' seconds
+    (LOGISTECH_PLANNER_TIMEOUT).
+    """
+    def __init__(self, workers: Optional[int] = None, cache_size: Optional[int] = None, max_jobs: int = 10_000,
+                 timeout: Optional[float] = None):
+        self.workers = int(workers if workers is not None
+                           else os.getenv("LOGISTECH_PLANNER_WORKERS", os.cpu_count() or 1))
+        self.cache_size = int(cache_size if cache_size is not None
+                              else os.getenv("LOGISTECH_PLANNER_CACHE_SIZE", 1024))
+        self.max_jobs = max_jobs
+        self.timeout = float(timeout if timeout is not None else os.getenv("LOGISTECH_PLANNER_TIMEOUT", 30))
+        self._cache: "OrderedDict[str, PlanResult]" = OrderedDict()
+        self._in_flight = {}  # plan_key -> Future
+        self._jobs: "OrderedDict[str, PlanJob]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._pool = None
+        self.lock = threading.RLock()  # Reentrant: a finished future runs _finished at once
+
+    def submit(self, capacity: int, packages: List[Package]) -> PlanJob:
+        sizes = [p.size for p in packages]
+        key = plan_key(capacity, sizes)
+        with self.lock:
+            cached = key in self._cache
+            if cached:
+                self._cache.move_to_end(key)
+                future = Future()
+                future.set_result(self._cache[key])
+                PLANNER_JOBS.inc(result="cached")
+            elif key in self._in_flight:
+                future = self._in_flight[key]
+                PLANNER_JOBS.inc(result="shared")
+            else:
+                future = self._start(capacity, sizes)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda f, key=key: self._finished(key, f))
+            job = PlanJob(f"plan-{next(self._ids)}", capacity, list(packages), key, future, cached)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return job
+
+    def _start(self, capacity: int, sizes: List[int]) -> Future:
+        # Caller holds self.lock
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(_solve_sizes(capacity, sizes))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.executor().submit(_solve_sizes, capacity, sizes)
+
+    def _finished(self, key: str, future: Future):
+        with self.lock:
+            self._in_flight.pop(key, None)
+            if future.exception() is not None:
+                PLANNER_JOBS.inc(result="failed")
+                logger.warning("Planning job failed: %s", future.exception())
+                return
+            PLANNER_JOBS.inc(result="solved")
+            _, engine, seconds = future.result()
+            if engine:
+                TRUCK_PLAN_SECONDS.observe(seconds, engine=engine)
+            if self.cache_size > 0:
+                self._cache[key] = future.result()
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        """The job pool, for other planning work to share (None with workers=0)"""
+        if self.workers <= 0:
+            return None
+        with self.lock:
+            if self._pool is None:
+                self._pool = process_pool(self.workers)
+            return self._pool
+
+    def get(self, job_id: str) -> Optional[PlanJob]:
+        return self._jobs.get(job_id)
+
+    def solve(self, capacity: int, packages: List[Package], timeout: Optional[float] = None) -> List[Package]:
+        """
+        Submit and wait: the planned load, straight from the cache when seen
+        before. Raises TimeoutError after 'timeout' (default self.timeout) seconds.
+        """
+        job = self.submit(capacity, packages)
+        job.future.result(timeout if timeout is not None else self.timeout)
+        return job.load
+
+    def shutdown(self):
+        with self.lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,283 @@
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+import heapq
+import itertools
+import math
+import os
+import random
+import sqlite3
+import time
+from models import Package
+from database import _parse_legacy_timestamp
+from controller import LogiMaster
+
+# Event kinds; at equal times the lower number runs first
+ARRIVAL, STORE, PICK, TRUCK, SAMPLE = range(5)
+
+# (time in simulated seconds, kind, payload)
+Event = Tuple[float, int, object]
+
+SIMULATION_ENV = {
+    "LOGISTECH_DB": ":memory:",
+    "LOGISTECH_ARCHIVE_DB": ":memory:",
+    "LOGISTECH_LOG_FLUSH_INTERVAL": "0",
+    "LOGISTECH_LOG_COMPACTION_INTERVAL": "0",
+    "LOGISTECH_CONVEYOR": "fifo",
+    "LOGISTECH_SHARED_STATE": "0",
+    "LOGISTECH_DURABLE_STATE": "0",
+    "LOGISTECH_WARMUP": "eager",
+    "LOGISTECH_INVENTORY_SNAPSHOT": "",
+    "LOGISTECH_DEFRAG_INTERVAL": "0",
+    "LOGISTECH_PLANNER_WORKERS": "0",
+}
+
+@contextmanager
+def in_memory_controller(bins: Iterable[Tuple[int, int, str, int]]):
+    """
+    A fresh LogiMaster on an in-memory database holding 'bins'
+    (bin_id, capacity, location_code, current_load), with every background
+    thread off. It replaces the process-wide singleton while it is open.
+    """
+    previous = {name: os.environ.get(name) for name in SIMULATION_ENV}
+    os.environ.update(SIMULATION_ENV)
+    LogiMaster._instance = None
+    controller = LogiMaster()
+    try:
+        conn = controller.db.conn
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code, current_load) VALUES (?, ?, ?, ?)",
+                         bins)
+        conn.commit()
+        controller.load_inventory()
+        yield controller
+    finally:
+        controller.db.close()
+        LogiMaster._instance = None
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def poisson_arrivals(rate: float, count: int, sizes: Callable[[random.Random], int],
+                     destinations: Sequence[str] = ("NYC",), dwell: float = 3600.0,
+                     seed: int = 42) -> Iterator[Event]:
+    """
+    'count' arrivals at 'rate' packages per simulated second (exponential
+    gaps). Each package stays stored for an exponential time with mean
+    'dwell' seconds and is then due for picking (dwell=0: never picked).
+    """
+    rng = random.Random(seed)
+    now = 0.0
+    for i in range(count):
+        now += rng.expovariate(rate)
+        stay = rng.expovariate(1 / dwell) if dwell > 0 else None
+        yield now, ARRIVAL, (Package(f"SIM{i:08d}", sizes(rng), rng.choice(destinations)), stay)
+
+def recorded_bins(db_path: str) -> List[Tuple[int, int, str, int]]:
+    """Bins of a recorded database, all empty (the replay fills them again)"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return [(bin_id, capacity, location, 0) for bin_id, capacity, location
+                in conn.execute("SELECT bin_id, capacity, location_code FROM bins ORDER BY bin_id")]
+    finally:
+        conn.close()
+
+def replay_events(db_path: str, sizes: Callable[[random.Random], int], seed: int = 42,
+                  batch_size: int = 10_000) -> Iterator[Event]:
+    """
+    Arrivals and picks from a recorded shipment_logs table, oldest first,
+    timed relative to the first row: STORED rows become arrivals and PICKED
+    rows picks (archived partitions are not replayed). Logs carry no sizes,
+    so a package still in package_locations keeps its recorded size and the
+    rest are drawn from 'sizes'.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        known = {}
+        # Databases from before the location index have no sizes at all
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'package_locations'").fetchone():
+            known = dict(conn.execute("SELECT tracking_id, size FROM package_locations"))
+        cursor = conn.execute('''
+            SELECT tracking_id, timestamp, status FROM shipment_logs
+            WHERE status IN ('STORED', 'PICKED') ORDER BY rowid
+        ''')
+        start = None
+        while rows := cursor.fetchmany(batch_size):
+            for tracking_id, timestamp, status in rows:
+                timestamp = _parse_legacy_timestamp(timestamp)  # Older databases store ISO text
+                if timestamp is None:
+                    continue
+                if start is None:
+                    start = timestamp
+                at = (timestamp - start) / 1000
+                if status == "STORED":
+                    size = known.get(tracking_id) or sizes(rng)
+                    yield at, ARRIVAL, (Package(tracking_id, size, ""), None)
+                else:
+                    yield at, PICK, tracking_id
+    finally:
+        conn.close()
+
+@dataclass
+class SimulationReport:
+    events: int = 0
+    simulated_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    arrivals: int = 0
+    stored: int = 0
+    dropped: int = 0
+    picked: int = 0
+    max_queue_depth: int = 0
+    # (simulated seconds, bin utilization, conveyor depth) every sample interval
+    utilization: List[Tuple[float, float, int]] = field(default_factory=list)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def speedup(self) -> float:
+        """Simulated seconds per wall-clock second"""
+        return self.simulated_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def drop_rate(self) -> float:
+        """Share of processed packages that found no bin"""
+        processed = self.stored + self.dropped
+        return self.dropped / processed if processed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "events": self.events,
+            "simulated_seconds": round(self.simulated_seconds, 1),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "events_per_second": round(self.events_per_second, 1),
+            "speedup": round(self.speedup, 1),
+            "arrivals": self.arrivals,
+            "stored": self.stored,
+            "dropped": self.dropped,
+            "drop_rate": round(self.drop_rate, 4),
+            "picked": self.picked,
+            "max_queue_depth": self.max_queue_depth,
+            "utilization": [[round(t, 1), round(u, 4), depth] for t, u, depth in self.utilization],
+        }
+
+class Simulation:
+    """
+    Discrete-event simulation of the warehouse on a live LogiMaster.
+    Events run in simulated-time order from a heap, so hours of traffic
+    replay as fast as the controller can take them. The source stream
+    (poisson_arrivals, replay_events or any time-ordered events) is read
+    lazily, one event ahead, so millions of arrivals need no memory up front.
+
+    - ARRIVAL puts the package on the conveyor; the conveyor stores one
+      package every 'service_time' seconds (0 = as soon as it arrives).
+    - STORE runs assign_storage; a package no bin can take is dropped.
+      A stored package with a dwell time becomes due for picking after it.
+    - Due packages are picked in one batch per truck, every 'truck_interval'
+      seconds (0 = at once); whatever is still due at the end of the run
+      leaves on a final truck.
+    - Every 'sample_interval' seconds the bin utilization and conveyor
+      depth are recorded. Unless 'keep_logs' is set, the in-memory shipment
+      log is emptied there too, so long runs stay flat in memory.
+    """
+    def __init__(self, controller: LogiMaster, service_time: float = 0.0, truck_interval: float = 900.0,
+                 sample_interval: float = 3600.0, keep_logs: bool = False):
+        self.controller = controller
+        self.service_time = service_time
+        self.truck_interval = truck_interval
+        self.sample_interval = sample_interval
+        self.keep_logs = keep_logs
+        self.now = 0.0
+        self.report = SimulationReport()
+        self._heap = []
+        self._seq = itertools.count()
+        self._outstanding = 0  # STORE and PICK events in the heap; trucks and samples recur forever
+        self._conveyor = deque()  # Dwell times of the packages on the conveyor, in belt order
+        self._due: List[str] = []
+
+    def schedule(self, at: float, kind: int, payload=None):
+        if kind in (STORE, PICK):
+            self._outstanding += 1
+        heapq.heappush(self._heap, (at, kind, next(self._seq), payload))
+
+    def run(self, source: Iterable[Event], until: float = math.inf) -> SimulationReport:
+        """Run until the source is exhausted and every package is handled, or simulated time passes 'until'"""
+        source = iter(source)
+        pending = next(source, None)
+        if self.sample_interval > 0:
+            self.schedule(self.now, SAMPLE)
+        if self.truck_interval > 0:
+            self.schedule(self.now + self.truck_interval, TRUCK)
+        handlers = {ARRIVAL: self._arrival, STORE: self._store, PICK: self._pick,
+                    TRUCK: self._truck, SAMPLE: self._sample}
+        report = self.report
+        started = time.perf_counter()
+        while pending is not None or self._outstanding:
+            # At equal times, source events go before heap events of a later kind
+            if pending is not None and (not self._heap or pending[:2] <= self._heap[0][:2]):
+                at, kind, payload = pending
+                if at > until:
+                    break
+                pending = next(source, None)
+            else:
+                at, kind, _, payload = heapq.heappop(self._heap)
+                if at > until:
+                    break
+                if kind in (STORE, PICK):
+                    self._outstanding -= 1
+            self.now = at
+            handlers[kind](payload)
+            report.events += 1
+        report.wall_seconds += time.perf_counter() - started
+        report.simulated_seconds = self.now
+        self._truck(reschedule=False)
+        self._sample(reschedule=False)
+        return report
+
+    def _arrival(self, payload):
+        package, dwell = payload
+        self.report.arrivals += 1
+        self.controller.process_arrival(package)
+        self._conveyor.append(dwell)
+        self.report.max_queue_depth = max(self.report.max_queue_depth, len(self._conveyor))
+        if len(self._conveyor) == 1:
+            self.schedule(self.now + self.service_time, STORE)
+
+    def _store(self, payload=None):
+        dwell = self._conveyor.popleft()
+        result = self.controller.assign_storage()
+        if result["success"]:
+            self.report.stored += 1
+            if dwell is not None:
+                self.schedule(self.now + dwell, PICK, result["package_id"])
+        else:
+            self.report.dropped += 1
+        if self._conveyor:
+            self.schedule(self.now + self.service_time, STORE)
+
+    def _pick(self, tracking_id):
+        self._due.append(tracking_id)
+        if self.truck_interval <= 0:
+            self._truck(reschedule=False)
+
+    def _truck(self, payload=None, reschedule: bool = True):
+        if self._due:
+            self.report.picked += len(self.controller.pick(self._due)["picks"])
+            self._due = []
+        if reschedule:
+            self.schedule(self.now + self.truck_interval, TRUCK)
+
+    def _sample(self, payload=None, reschedule: bool = True):
+        self.report.utilization.append((self.now, self.controller.bin_inventory.utilization(),
+                                        len(self._conveyor)))
+        if not self.keep_logs:
+            db = self.controller.db
+            db.flush()
+            with db.write_transaction("simulation") as conn:
+                conn.execute("DELETE FROM shipment_logs")
+        if reschedule:
+            self.schedule(self.now + self.sample_interval, SAMPLE)
@@ -1,42 +1,660 @@
-from collections import deque
-from typing import List, Optional
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from models import Package
+from metrics import LANE_WAIT_SECONDS
+from array import array
+import bisect
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 class ConveyorBelt:
-    """FIFO Queue for incoming packages"""
+    """FIFO Queue for incoming packages (thread-safe)"""
     def __init__(self):
         self.queue = deque()
+        self.lock = threading.Lock()
 
     def add_package(self, package: Package):
-        self.queue.append(package)
+        with self.lock:
+            self.queue.append(package)
 
     def get_next_package(self) -> Optional[Package]:
-        if self.queue:
-            return self.queue.popleft()
-        return None
+        with self.lock:
+            if self.queue:
+                return self.queue.popleft()
+            return None
 
     def is_empty(self) -> bool:
         return len(self.queue) == 0
 
+    def snapshot(self) -> List[Package]:
+        """Copy of the queue that is safe to iterate while other threads add/pop"""
+        with self.lock:
+            return list(self.queue)
+
 class LoadingDock:
-    """LIFO Stack for truck loading with rollback capability"""
+    """LIFO Stack for truck loading with rollback capability (thread-safe)"""
     def __init__(self):
         self.stack: List[Package] = []
+        # Re-entrant so callers can hold it across a whole multi-package load
+        self.lock = threading.RLock()
 
     def load_package(self, package: Package):
-        self.stack.append(package)
-        print(f"Loaded package {package.tracking_id} onto truck.")
+        with self.lock:
+            self.stack.append(package)
+        logger.debug("Loaded package %s onto truck", package.tracking_id)
 
     def rollback_load(self, count: int = 1):
         """Simulate unloading items from the back (LIFO)"""
-        for _ in range(count):
+        with self.lock:
+            for _ in range(count):
+                if self.stack:
+                    removed = self.stack.pop()
+                    logger.info("Rolled back: unloaded package %s", removed.tracking_id)
+                else:
+                    logger.info("Truck is empty, nothing to roll back")
+
+    def view_top(self) -> Optional[Package]:
+        with self.lock:
             if self.stack:
-                removed = self.stack.pop()
-                print(f"Rolled back: Unloaded package {removed.tracking_id}")
-            else:
-                print("Truck is empty, nothing to rollback.")
+                return self.stack[-1]
+            return None
+
+    def snapshot(self) -> List[Package]:
+        with self.lock:
+            return list(self.stack)
+
+def package_row(package: Package) -> tuple:
+    """Package as a queue table row (see Database.queue_push)"""
+    length, width, height = package.dimensions or (0, 0, 0)
+    return (package.tracking_id, package.size, package.destination, length, width, height, package.weight)
+
+def row_package(row) -> Package:
+    tracking_id, size, destination, length, width, height, weight = row
+    dimensions = (length, width, height) if length else None
+    return Package(tracking_id, size, destination, dimensions, weight)
+
+class SharedConveyorBelt(ConveyorBelt):
+    """
+    FIFO conveyor kept in SQLite (conveyor_queue table) so every worker
+    process sees and drains the same queue.
+    """
+    TABLE = "conveyor_queue"
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+
+    @property
+    def queue(self) -> deque:
+        return deque(self.snapshot())
+
+    def add_package(self, package: Package):
+        self.db.queue_push(self.TABLE, [package_row(package)])
+
+    def get_next_package(self) -> Optional[Package]:
+        rows = self.db.queue_pop(self.TABLE)
+        return row_package(rows[0]) if rows else None
+
+    def is_empty(self) -> bool:
+        return not self.db.queue_rows(self.TABLE, limit=1)
+
+    def snapshot(self) -> List[Package]:
+        return [row_package(row) for row in self.db.queue_rows(self.TABLE)]
+
+class SharedLoadingDock(LoadingDock):
+    """LIFO loading dock kept in SQLite (loading_dock table), shared by all worker processes"""
+    TABLE = "loading_dock"
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.RLock()
+
+    @property
+    def stack(self) -> List[Package]:
+        return self.snapshot()
+
+    def load_package(self, package: Package):
+        self.db.queue_push(self.TABLE, [package_row(package)])
+        logger.debug("Loaded package %s onto truck", package.tracking_id)
+
+    def rollback_load(self, count: int = 1):
+        removed = self.db.queue_pop(self.TABLE, count, newest=True)
+        for row in removed:
+            logger.info("Rolled back: unloaded package %s", row[0])
+        if len(removed) < count:
+            logger.info("Truck is empty, nothing to roll back")
 
     def view_top(self) -> Optional[Package]:
-        if self.stack:
-            return self.stack[-1]
-        return None
+        stack = self.snapshot()
+        return stack[-1] if stack else None
+
+    def snapshot(self) -> List[Package]:
+        return [row_package(row) for row in self.db.queue_rows(self.TABLE)]
+
+class JournaledConveyorBelt(ConveyorBelt):
+    """
+    In-memory FIFO conveyor that appends every push and pop to the database
+    state journal (inside its lock, so the journal order is the queue order)
+    and can be rebuilt from a snapshot plus the journal after a restart.
+    """
+    TARGET = "conveyor"
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    def add_package(self, package: Package):
+        with self.lock:
+            self.queue.append(package)
+            self.db.journal(self.TARGET, "push", package_row(package))
+
+    def get_next_package(self) -> Optional[Package]:
+        with self.lock:
+            if not self.queue:
+                return None
+            package = self.queue.popleft()
+            self.db.journal(self.TARGET, "pop", package.tracking_id)
+            return package
+
+    def restore(self, rows: Iterable):
+        with self.lock:
+            self.queue = deque(row_package(row) for row in rows)
+
+    def replay(self, op: str, data):
+        """Apply one journal entry without journaling it again"""
+        with self.lock:
+            if op == "push":
+                self.queue.append(row_package(data))
+            elif self.queue:
+                self.queue.popleft()
+
+class JournaledLoadingDock(LoadingDock):
+    """LIFO loading dock that journals every push and pop, like JournaledConveyorBelt"""
+    def __init__(self, db, door: int = 1):
+        super().__init__()
+        self.db = db
+        self.target = f"dock:{door}"
+
+    def load_package(self, package: Package):
+        with self.lock:
+            self.stack.append(package)
+            self.db.journal(self.target, "push", package_row(package))
+        logger.debug("Loaded package %s onto truck", package.tracking_id)
+
+    def rollback_load(self, count: int = 1):
+        with self.lock:
+            for _ in range(count):
+                if self.stack:
+                    removed = self.stack.pop()
+                    self.db.journal(self.target, "pop", removed.tracking_id)
+                    logger.info("Rolled back: unloaded package %s", removed.tracking_id)
+                else:
+                    logger.info("Truck is empty, nothing to roll back")
+
+    def restore(self, rows: Iterable):
+        with self.lock:
+            self.stack = [row_package(row) for row in rows]
+
+    def replay(self, op: str, data):
+        with self.lock:
+            if op == "push":
+                self.stack.append(row_package(data))
+            elif self.stack:
+                self.stack.pop()
+
+class PriorityConveyor(ConveyorBelt):
+    """
+    Multi-lane conveyor. Each package is put in a lane on arrival; lanes are
+    served in strict priority order and each lane is a heap ordered by
+    deadline (earliest first, packages without one after those, FIFO), so
+    add and pop are O(log n).
+
+    Default lanes:
+    - urgent: the package's SLA deadline, or its destination's cutoff, is
+      less than 'urgent_within' seconds away
+    - retry: packages that found no bin, served once their backoff is over
+    - oversize: size >= 'oversize_size' (None = no oversize lane)
+    - standard: everything else
+    A package is retried up to 'max_attempts' times, with the backoff
+    doubling from 'retry_delay' seconds, then moved to 'dead_letters'.
+    Depth and wait time are exported per lane.
+    """
+    LANES = ("urgent", "retry", "oversize", "standard")
+    RETRY_LANE = "retry"
+
+    def __init__(self, oversize_size: Optional[int] = None, urgent_within: float = 3600.0,
+                 retry_delay: float = 1.0, max_attempts: int = 3,
+                 classify: Optional[Callable[[Package], str]] = None, clock: Callable[[], float] = time.time):
+        self.oversize_size = oversize_size
+        self.urgent_within = urgent_within
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.classify = classify or self._classify
+        self.clock = clock
+        self.cutoffs: Dict[str, float] = {}  # destination -> epoch seconds of its last truck
+        self.lanes: Dict[str, list] = {lane: [] for lane in self.LANES}  # heaps of (key, seq, enqueued, package)
+        self.attempts: Dict[str, int] = {}  # tracking_id -> failed assignments so far
+        self.dead_letters: List[Package] = []
+        self.lock = threading.Lock()
+        self._seq = itertools.count()
+        self._wait = {lane: LANE_WAIT_SECONDS.labels(lane=lane) for lane in self.LANES}
+
+    def deadline(self, package: Package) -> Optional[float]:
+        """Earlier of the package's SLA deadline and its destination's cutoff"""
+        deadlines = [d for d in (package.deadline, self.cutoffs.get(package.destination)) if d is not None]
+        return min(deadlines) if deadlines else None
+
+    def _classify(self, package: Package) -> str:
+        deadline = self.deadline(package)
+        if deadline is not None and deadline - self.clock() <= self.urgent_within:
+            return "urgent"
+        if self.oversize_size is not None and package.size >= self.oversize_size:
+            return "oversize"
+        return "standard"
+
+    def set_cutoff(self, destination: str, cutoff: Optional[float]):
+        """Cutoff (epoch seconds) for a destination; applies to packages added afterwards"""
+        with self.lock:
+            if cutoff is None:
+                self.cutoffs.pop(destination, None)
+            else:
+                self.cutoffs[destination] = cutoff
+
+    def _push(self, lane: str, key: float, package: Package):
+        heapq.heappush(self.lanes[lane], (key, next(self._seq), self.clock(), package))
+
+    def add_package(self, package: Package):
+        lane = self.classify(package)
+        deadline = self.deadline(package)
+        with self.lock:
+            self._push(lane, deadline if deadline is not None else float("inf"), package)
+
+    def retry(self, package: Package) -> bool:
+        """
+        Requeue a package that found no bin. Returns False when it has used up
+        its attempts and went to the dead-letter list instead.
+        """
+        with self.lock:
+            attempts = self.attempts.get(package.tracking_id, 0) + 1
+            if attempts >= self.max_attempts:
+                self.attempts.pop(package.tracking_id, None)
+                self.dead_letters.append(package)
+                logger.warning("Package %s dead-lettered after %d attempts", package.tracking_id, attempts)
+                return False
+            self.attempts[package.tracking_id] = attempts
+            # The retry lane is keyed on when the package may be tried again
+            self._push(self.RETRY_LANE, self.clock() + self.retry_delay * 2 ** (attempts - 1), package)
+            return True
+
+    def get_next_package(self) -> Optional[Package]:
+        with self.lock:
+            now = self.clock()
+            for lane, heap in self.lanes.items():
+                if not heap or (lane == self.RETRY_LANE and heap[0][0] > now):
+                    continue
+                _, _, enqueued, package = heapq.heappop(heap)
+                self._wait[lane].observe(max(0.0, now - enqueued))
+                return package
+            return None
+
+    def requeue_dead_letters(self) -> int:
+        """Give every dead-lettered package a fresh set of attempts"""
+        with self.lock:
+            packages, self.dead_letters = self.dead_letters, []
+        for package in packages:
+            self.add_package(package)
+        return len(packages)
+
+    def depths(self) -> Dict[str, int]:
+        with self.lock:
+            return {lane: len(heap) for lane, heap in self.lanes.items()}
+
+    @property
+    def queue(self) -> List[Package]:
+        return self.snapshot()
+
+    def is_empty(self) -> bool:
+        return not any(self.lanes.values())
+
+    def snapshot(self) -> List[Package]:
+        """Packages in the order they would be served if nothing else arrived"""
+        with self.lock:
+            return [entry[3] for heap in self.lanes.values() for entry in sorted(heap)]
+
+class FreeSpaceIndex:
+    """
+    Sorted multiset of bins keyed on remaining free space.
+    Each entry packs (free_space, slot) into one int so that bisect can find
+    the tightest bin with enough room in O(log n). 'slot' is the caller's
+    position for the bin (e.g. its row in the inventory). Keys live in an
+    array('q'), 8 bytes per bin, so free space is limited to MAX_FREE
+    (2^31 - 1); larger values are rejected when a bin is indexed.
+    """
+    SLOT_BITS = 32
+    SLOT_MASK = (1 << SLOT_BITS) - 1
+    MAX_FREE = (1 << (63 - SLOT_BITS)) - 1
+
+    def __init__(self):
+        self._keys = array('q')
+        self._lock = threading.Lock()
+
+    def _key(self, slot: int, free: int) -> int:
+        return (free << self.SLOT_BITS) | slot
+
+    def _checked_key(self, slot: int, free: int) -> int:
+        # Loads only move within a bin's capacity, so checking new bins is enough
+        if free > self.MAX_FREE:
+            raise ValueError(f"Free space {free} of slot {slot} exceeds the indexable maximum {self.MAX_FREE}")
+        return self._key(slot, free)
+
+    def build(self, free_by_slot: Iterable[int]):
+        """Bulk (re)build from free space values listed in slot order"""
+        keys = array('q', sorted(self._checked_key(slot, free) for slot, free in enumerate(free_by_slot)))
+        with self._lock:
+            self._keys = keys
+
+    def keys(self) -> array:
+        """Copy of the sorted packed keys (e.g. to save them)"""
+        with self._lock:
+            return array('q', self._keys)
+
+    def restore(self, keys: array):
+        """Adopt packed keys saved by keys(); they must already be sorted"""
+        with self._lock:
+            self._keys = keys
+
+    def insert(self, slot: int, free: int):
+        key = self._checked_key(slot, free)
+        with self._lock:
+            bisect.insort(self._keys, key)
+
+    def insert_many(self, free_by_slot: Iterable[Tuple[int, int]]):
+        """
+        Merge (slot, free) pairs in one pass: the new keys are sorted and the
+        runs of old keys between them copied as array slices, so adding k bins
+        to n costs O(n + k log k) instead of k shifts of the whole array.
+        """
+        new_keys = sorted(self._checked_key(slot, free) for slot, free in free_by_slot)
+        with self._lock:
+            old, merged, start = self._keys, array('q'), 0
+            for key in new_keys:
+                i = bisect.bisect_left(old, key, start)
+                merged += old[start:i]
+                merged.append(key)
+                start = i
+            merged += old[start:]
+            self._keys = merged
+
+    def remove(self, slot: int, free: int):
+        with self._lock:
+            self._remove(slot, free)
+
+    def move(self, slot: int, old_free: int, new_free: int):
+        """Re-key a bin after its load changed"""
+        if old_free != new_free:
+            with self._lock:
+                self._remove(slot, old_free)
+                self._insert(slot, new_free)
+
+    def _insert(self, slot: int, free: int):
+        bisect.insort(self._keys, self._key(slot, free))
+
+    def _remove(self, slot: int, free: int):
+        key = self._key(slot, free)
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            raise KeyError(f"Slot {slot} with free space {free} is not indexed")
+        del self._keys[i]
+
+    def best_fit(self, size: int) -> Optional[int]:
+        """Slot of the bin with the least free space that still fits 'size'"""
+        key = self.best_fit_key(size)
+        return key & self.SLOT_MASK if key is not None else None
+
+    def best_fit_key(self, size: int) -> Optional[int]:
+        """Packed (free, slot) key of the best fit for 'size'"""
+        with self._lock:
+            i = bisect.bisect_left(self._keys, size << self.SLOT_BITS)
+            if i < len(self._keys):
+                return self._keys[i]
+            return None
+
+    def key_after(self, key: int) -> Optional[int]:
+        """Smallest packed key greater than 'key'"""
+        with self._lock:
+            i = bisect.bisect_right(self._keys, key)
+            return self._keys[i] if i < len(self._keys) else None
+
+    def ordered(self) -> List[Tuple[int, int]]:
+        """Snapshot of (free, slot) pairs from least to most free space"""
+        with self._lock:
+            return [(key >> self.SLOT_BITS, key & self.SLOT_MASK) for key in self._keys]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+class BestFitCache:
+    """
+    Memo of size -> best-fit bin in front of a FreeSpaceIndex.
+    A few package sizes make up most of the traffic, so repeat sizes are
+    answered with a dict lookup instead of a bisect over every bin.
+
+    Entries are kept exact rather than merely invalidated: moved() is called
+    after every index move and, because a smaller size never has a looser
+    best fit, the cached answers sorted by size are also sorted by key. The
+    entries a move affects are therefore contiguous ranges found by bisect:
+    - sizes the bin used to answer and no longer gets first (it filled up
+      past them, or grew) move on to the next key in the index, which is
+      the tightest bin left for all of them;
+    - sizes the bin fits whose answer is looser than the bin's new key now
+      point at the bin.
+    So a repeat size keeps hitting while bins fill up one after the other.
+    Bounded LRU; hit/miss/eviction/update counts are kept for the metrics.
+    """
+    NO_FIT = 1 << 63  # Key for "no bin fits", sorts after every real key
+
+    def __init__(self, index: FreeSpaceIndex, max_entries: int = 1024):
+        self.index = index
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, int]" = OrderedDict()  # size -> key, in LRU order
+        self._sizes: List[int] = []  # Cached sizes, sorted
+        self._keys: List[int] = []   # Their keys, parallel to _sizes (sorted too)
+        self._epoch = 0  # Bumped by every change, so a lookup racing a move is not stored
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.updates = 0
+
+    def best_fit(self, size: int) -> Optional[int]:
+        """Slot of the best-fit bin for 'size' (same contract as FreeSpaceIndex.best_fit)"""
+        with self._lock:
+            key = self._entries.get(size)
+            if key is not None:
+                self._entries.move_to_end(size)
+                self.hits += 1
+                return key & FreeSpaceIndex.SLOT_MASK if key != self.NO_FIT else None
+            self.misses += 1
+            epoch = self._epoch
+
+        key = self.index.best_fit_key(size)
+        if self.max_entries > 0:
+            with self._lock:
+                if epoch == self._epoch and size not in self._entries:
+                    self._store(size, self.NO_FIT if key is None else key)
+        return key & FreeSpaceIndex.SLOT_MASK if key is not None else None
+
+    def _store(self, size: int, key: int):
+        if len(self._entries) >= self.max_entries:
+            old_size, _ = self._entries.popitem(last=False)
+            i = bisect.bisect_left(self._sizes, old_size)
+            del self._sizes[i], self._keys[i]
+            self.evictions += 1
+        self._entries[size] = key
+        i = bisect.bisect_left(self._sizes, size)
+        self._sizes.insert(i, size)
+        self._keys.insert(i, key)
+
+    def moved(self, slot: int, old_free: int, new_free: int):
+        """Bring the cache up to date after FreeSpaceIndex.move(slot, old_free, new_free)"""
+        shift = FreeSpaceIndex.SLOT_BITS
+        old_key, new_key = (old_free << shift) | slot, (new_free << shift) | slot
+        with self._lock:
+            self._epoch += 1
+            if not self._sizes:
+                return
+            # Sizes the bin used to answer and no longer takes first: nothing
+            # lay between them and the old key, so the next key up is their answer
+            lo = bisect.bisect_left(self._keys, old_key)
+            hi = bisect.bisect_right(self._keys, old_key)
+            if new_key < old_key:
+                lo = bisect.bisect_right(self._sizes, new_free, lo, hi)
+            if lo < hi:
+                next_key = self.index.key_after(old_key)
+                self._repoint(lo, hi, self.NO_FIT if next_key is None else next_key)
+            # Sizes the bin fits more tightly than their cached answer (this
+            # includes the old answers it still fits when it shrank)
+            lo = bisect.bisect_right(self._keys, new_key)
+            hi = bisect.bisect_right(self._sizes, new_free)
+            if lo < hi:
+                self._repoint(lo, hi, new_key)
+
+    def _repoint(self, lo: int, hi: int, key: int):
+        for size in self._sizes[lo:hi]:
+            self._entries[size] = key
+        self._keys[lo:hi] = [key] * (hi - lo)
+        self.updates += hi - lo
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._sizes.clear()
+            self._keys.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "updates": self.updates,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+class DimensionIndex:
+    """
+    Best-fit search for bins with inner dimensions and weight limits.
+    Slots are ordered by their dominant (largest) dimension, then the other
+    two, so every bin too short for an item is a prefix skipped by bisect.
+    The remaining range is covered by a segment tree over buckets of slots;
+    each node keeps the max of the two minor dimensions (fixed) and the
+    max free volume, max free weight and min free volume (updated on every
+    load change). A query walks the tree and prunes nodes that cannot hold
+    the item, or whose tightest bin is no tighter than the best one found.
+    Dimensions are stored largest first; 0 (or None) means unconstrained.
+    """
+    BUCKET = 16
+    UNBOUNDED = 1 << 62
+
+    def __init__(self, dims: List[Tuple[int, int, int]], free_volume: Iterable[int], free_weight: Iterable[int]):
+        self._lock = threading.Lock()
+        n = len(dims)
+        # Unconstrained (0) sides become UNBOUNDED before sorting, so they count as the largest
+        dims = [tuple(sorted((d or self.UNBOUNDED for d in dim or (0, 0, 0)), reverse=True)) for dim in dims]
+        self.order = sorted(range(n), key=dims.__getitem__)  # position -> slot
+        self.position = array('q', [0] * n)                   # slot -> position
+        for pos, slot in enumerate(self.order):
+            self.position[slot] = pos
+        self.major = [dims[slot][0] for slot in self.order]
+        self.mid = [dims[slot][1] for slot in self.order]
+        self.minor = [dims[slot][2] for slot in self.order]
+        free_volume, free_weight = list(free_volume), list(free_weight)
+        self.free_volume = [free_volume[slot] for slot in self.order]
+        self.free_weight = [free_weight[slot] for slot in self.order]
+
+        buckets = max(1, -(-n // self.BUCKET))
+        self.leaves = 1 << (buckets - 1).bit_length()
+        size = 2 * self.leaves
+        self.max_mid = [-1] * size
+        self.max_minor = [-1] * size
+        self.max_volume = [-1] * size
+        self.max_weight = [-1] * size
+        self.min_volume = [self.UNBOUNDED] * size
+        for b in range(buckets):
+            self._refresh_leaf(b)
+        for node in range(self.leaves - 1, 0, -1):
+            self._pull(node)
+            self._pull_static(node)
+
+    def _refresh_leaf(self, bucket: int):
+        node = self.leaves + bucket
+        lo, hi = bucket * self.BUCKET, min((bucket + 1) * self.BUCKET, len(self.order))
+        if lo >= hi:
+            return
+        self.max_mid[node] = max(self.mid[lo:hi])
+        self.max_minor[node] = max(self.minor[lo:hi])
+        volumes = self.free_volume[lo:hi]
+        self.max_volume[node] = max(volumes)
+        self.min_volume[node] = min(volumes)
+        self.max_weight[node] = max(self.free_weight[lo:hi])
+
+    def _pull_static(self, node: int):
+        left, right = 2 * node, 2 * node + 1
+        self.max_mid[node] = max(self.max_mid[left], self.max_mid[right])
+        self.max_minor[node] = max(self.max_minor[left], self.max_minor[right])
+
+    def _pull(self, node: int):
+        left, right = 2 * node, 2 * node + 1
+        self.max_volume[node] = max(self.max_volume[left], self.max_volume[right])
+        self.min_volume[node] = min(self.min_volume[left], self.min_volume[right])
+        self.max_weight[node] = max(self.max_weight[left], self.max_weight[right])
+
+    def update(self, slot: int, free_volume: int, free_weight: int):
+        """Record a slot's new free volume and free weight"""
+        with self._lock:
+            pos = self.position[slot]
+            self.free_volume[pos] = free_volume
+            self.free_weight[pos] = free_weight
+            bucket = pos // self.BUCKET
+            self._refresh_leaf(bucket)
+            node = (self.leaves + bucket) >> 1
+            while node:
+                self._pull(node)
+                node >>= 1
+
+    def best_fit(self, dimensions: Optional[Tuple[int, int, int]], volume: int, weight: int = 0) -> Optional[int]:
+        """Slot with the least free volume that fits the item's dimensions, volume and weight"""
+        need = sorted(dimensions, reverse=True) if dimensions else (0, 0, 0)
+        with self._lock:
+            start = bisect.bisect_left(self.major, need[0])
+            best_volume, best_pos = self.UNBOUNDED, None
+            stack = [(1, 0, self.leaves * self.BUCKET)]
+            while stack:
+                node, lo, hi = stack.pop()
+                if (hi <= start or self.max_mid[node] < need[1] or self.max_minor[node] < need[2]
+                        or self.max_volume[node] < volume or self.max_weight[node] < weight
+                        or self.min_volume[node] >= best_volume):
+                    continue
+                if node >= self.leaves:
+                    for pos in range(max(lo, start), min(hi, len(self.order))):
+                        free = self.free_volume[pos]
+                        if (volume <= free < best_volume and self.mid[pos] >= need[1]
+                                and self.minor[pos] >= need[2] and self.free_weight[pos] >= weight):
+                            best_volume, best_pos = free, pos
+                    continue
+                mid = (lo + hi) // 2
+                left, right = (2 * node, lo, mid), (2 * node + 1, mid, hi)
+                # Visit the child with the tighter bins first so pruning kicks in early
+                if self.min_volume[2 * node] <= self.min_volume[2 * node + 1]:
+                    stack += (right, left)
+                else:
+                    stack += (left, right)
+            return self.order[best_pos] if best_pos is not None else None
+
+    def __len__(self) -> int:
+        return len(self.order)
@@ -30,10 +30,25 @@ async function refreshAll() {
 }
 
 // --- 1. BIN INVENTORY ---
+// Full snapshot once, then only the bins that changed since the last version
+let binState = { version: null, bins: new Map() };
+
 async function fetchStatus() {
     try {
+        if (binState.version !== null) {
+            const res = await fetch(`${API_URL}/status/changes?since=${binState.version}`);
+            const data = await res.json();
+            if (!data.resync) {
+                if (data.bins.length === 0) return; // Nothing changed, keep the current grid
+                data.bins.forEach(bin => binState.bins.set(bin.bin_id, bin));
+                binState.version = data.version;
+                renderBins([...binState.bins.values()]);
+                return;
+            }
+        }
         const res = await fetch(`${API_URL}/status`);
         const data = await res.json();
+        binState = { version: data.version, bins: new Map(data.bins.map(bin => [bin.bin_id, bin])) };
         renderBins(data.bins);
     } catch (e) { console.error(e); }
 }
@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+import random
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from controller import LogiMaster
+from models import Package
+
+class TestConcurrentStorage(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        conn = self.controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(i, 20 + (i % 7) * 10, f"Z{i % 5}") for i in range(1, 61)])
+        conn.commit()
+        self.controller.load_inventory()
+
+    def test_no_capacity_invariant_violated(self):
+        """Hammer single and batch assignment from many threads at once"""
+        sizes = {}
+        stored_ids = []
+        lock = threading.Lock()
+        start = threading.Barrier(8)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            start.wait()
+            for n in range(60):
+                if n % 10 == 0:
+                    batch = [Package(f"T{seed}-{n}-{k}", rng.randint(1, 15), "X") for k in range(5)]
+                    with lock:
+                        sizes.update((p.tracking_id, p.size) for p in batch)
+                    results = self.controller.assign_storage_batch(batch)
+                else:
+                    package = Package(f"T{seed}-{n}", rng.randint(1, 15), "X")
+                    with lock:
+                        sizes[package.tracking_id] = package.size
+                    self.controller.process_arrival(package)
+                    # May store another thread's package; ids are unique so that's fine
+                    results = [self.controller.assign_storage()]
+                with lock:
+                    stored_ids.extend(r["package_id"] for r in results if r["success"])
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(stored_ids), len(set(stored_ids)))
+        total_load = sum(b.current_load for b in self.controller.bin_inventory)
+        self.assertEqual(total_load, sum(sizes[i] for i in stored_ids))
+        for b in self.controller.bin_inventory:
+            self.assertGreaterEqual(b.current_load, 0)
+            self.assertLessEqual(b.current_load, b.capacity)
+        # The index must agree with the bins it describes
+        indexed = sorted((free, self.controller.bin_inventory[slot].bin_id)
+                         for free, slot in self.controller.free_index.ordered())
+        actual = sorted((b.free_capacity, b.bin_id) for b in self.controller.bin_inventory)
+        self.assertEqual(indexed, actual)
+        self.assertTrue(self.controller.conveyor_queue.is_empty())
+
+if __name__ == '__main__':
+    unittest.main()
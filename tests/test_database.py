@@ -0,0 +1,163 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from database import Database, DAY_MS, now_ms
+
+class TestBufferedShipmentLog(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "logs.db")
+        self.db = Database(self.path, log_batch_size=3, log_flush_interval=0)
+
+    def tearDown(self):
+        self.db.close()
+
+    def count_logs(self):
+        # A separate connection only sees committed rows
+        reader = Database(self.path, log_flush_interval=0)
+        count = reader.conn.execute("SELECT COUNT(*) FROM shipment_logs").fetchone()[0]
+        reader.close()
+        return count
+
+    def test_flushes_on_batch_size(self):
+        self.db.log_shipment("A", 1, "STORED")
+        self.db.log_shipment("B", 2, "STORED")
+        self.assertEqual(self.count_logs(), 0)
+        self.db.log_shipment("C", 3, "STORED")
+        self.assertEqual(self.count_logs(), 3)
+
+    def test_flushes_after_interval(self):
+        timed = Database(os.path.join(tempfile.mkdtemp(), "timed.db"), log_batch_size=100, log_flush_interval=0.05)
+        try:
+            timed.log_shipment("A", 1, "STORED")
+            committed = lambda: timed.conn.execute("SELECT COUNT(*) FROM shipment_logs").fetchone()[0]
+            self.assertEqual(committed(), 0)
+            deadline = time.monotonic() + 2
+            while committed() == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(committed(), 1)
+        finally:
+            timed.close()
+
+    def test_flusher_survives_sqlite_errors(self):
+        timed = Database(os.path.join(tempfile.mkdtemp(), "timed.db"), log_batch_size=100, log_flush_interval=0.05)
+        try:
+            with timed._lock:
+                timed.conn.execute("ALTER TABLE shipment_logs RENAME TO shipment_logs_moved")
+            with self.assertLogs("database", "WARNING"):
+                timed.log_shipment("A", 1, "STORED")
+                time.sleep(0.15)  # A few failed ticks
+            with timed._lock:
+                timed.conn.execute("ALTER TABLE shipment_logs_moved RENAME TO shipment_logs")
+            deadline = time.monotonic() + 2
+            while timed._pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(timed.conn.execute("SELECT COUNT(*) FROM shipment_logs").fetchone()[0], 1)
+        finally:
+            timed.close()
+
+    def test_explicit_batch_size_zero_is_kept(self):
+        db = Database(os.path.join(tempfile.mkdtemp(), "zero.db"), log_batch_size=0, log_flush_interval=0)
+        self.assertEqual(db.log_batch_size, 0)
+        db.close()
+
+    def test_close_flushes_pending_rows(self):
+        self.db.log_shipment("A", 1, "STORED")
+        self.db.close()
+        self.assertEqual(self.count_logs(), 1)
+
+    def test_pragmas_are_configurable(self):
+        db = Database(os.path.join(tempfile.mkdtemp(), "full.db"), journal_mode="delete",
+                      synchronous="full", log_flush_interval=0)
+        self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 2)  # FULL
+        db.close()
+        self.assertEqual(self.db.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        with self.assertRaises(ValueError):
+            Database(self.path, synchronous="sometimes")
+
+class TestLogQueries(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(os.path.join(tempfile.mkdtemp(), "logs.db"), log_flush_interval=0)
+        for i in range(10):
+            self.db.log_shipment(f"PKG{i % 3}", i % 2, "STORED" if i < 7 else "LOADED")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_keyset_pagination_walks_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            page = self.db.query_logs(before_id=cursor, limit=4)
+            seen.extend(r[0] for r in page)
+            if len(page) < 4:
+                break
+            cursor = page[-1][0]
+        self.assertEqual(seen, list(range(10, 0, -1)))
+
+    def test_filters_and_history(self):
+        self.assertEqual(len(self.db.query_logs(status="LOADED")), 3)
+        self.assertTrue(all(r[2] == 1 for r in self.db.query_logs(bin_id=1)))
+        self.assertEqual(len(self.db.query_logs(tracking_id="PKG0", status="STORED")), 3)
+        history = self.db.package_history("PKG1")
+        self.assertEqual([r[0] for r in history], [2, 5, 8])
+
+    def test_filtered_queries_use_an_index(self):
+        for column, value in (("tracking_id", "PKG1"), ("bin_id", 1), ("status", "LOADED")):
+            plan = self.db.conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM shipment_logs WHERE {column} = ? AND id < ? "
+                "ORDER BY id DESC LIMIT 50", (value, 100)).fetchall()
+            self.assertIn("USING INDEX", " ".join(row[-1] for row in plan))
+
+class TestLogRetention(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(os.path.join(tempfile.mkdtemp(), "logs.db"), log_flush_interval=0,
+                          log_compaction_interval=0)
+        now = now_ms()
+        # Ten rows spread over the last 100 days, oldest first
+        self.db.conn.executemany(
+            "INSERT INTO shipment_logs (tracking_id, bin_id, timestamp, status) VALUES (?, ?, ?, ?)",
+            [(f"PKG{i % 3}", i, now - (100 - 10 * i) * DAY_MS, "STORED") for i in range(10)])
+        self.db.conn.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_compaction_moves_old_rows_in_chunks(self):
+        cutoff = now_ms() - 35 * DAY_MS
+        self.assertEqual(self.db.archive_logs(cutoff, chunk_size=2), 2)
+        self.assertEqual(self.db.compact_logs(cutoff, chunk_size=2, pause=0), 5)
+        hot = self.db.conn.execute("SELECT COUNT(*) FROM main.shipment_logs").fetchone()[0]
+        self.assertEqual(hot, 3)
+        partitions = self.db.conn.execute("SELECT SUM(row_count) FROM archive.log_partitions").fetchone()[0]
+        self.assertEqual(partitions, 7)
+
+    def test_queries_read_across_partitions(self):
+        self.db.compact_logs(now_ms() - 35 * DAY_MS, pause=0)
+        self.assertEqual([r[0] for r in self.db.query_logs(limit=-1)], list(range(10, 0, -1)))
+        page = self.db.query_logs(before_id=6, limit=3)
+        self.assertEqual([r[0] for r in page], [5, 4, 3])
+        self.assertEqual([r[0] for r in self.db.package_history("PKG1")], [2, 5, 8])
+        recent = self.db.query_logs(since=now_ms() - 55 * DAY_MS, limit=-1)
+        self.assertEqual([r[0] for r in recent], [10, 9, 8, 7, 6])
+
+    def test_legacy_iso_timestamps_are_migrated(self):
+        path = os.path.join(tempfile.mkdtemp(), "legacy.db")
+        legacy = Database(path, log_flush_interval=0, log_compaction_interval=0)
+        legacy.conn.execute("DROP TABLE shipment_logs")
+        legacy.conn.execute("CREATE TABLE shipment_logs (tracking_id TEXT, bin_id INTEGER, timestamp DATETIME, status TEXT)")
+        legacy.conn.execute("INSERT INTO shipment_logs VALUES ('OLD', 1, '2025-11-22T16:05:55.934236', 'STORED')")
+        legacy.conn.commit()
+        legacy.close()
+
+        migrated = Database(path, log_flush_interval=0, log_compaction_interval=0)
+        row = migrated.query_logs()[0]
+        migrated.close()
+        self.assertEqual(row[:2], (1, "OLD"))
+        self.assertIsInstance(row[3], int)
+
+if __name__ == '__main__':
+    unittest.main()
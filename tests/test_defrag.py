@@ -0,0 +1,85 @@
+import unittest
+import os
+import random
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from models import Package
+from algorithms import Move, plan_defragmentation
+from inventory import BinInventory, PackageLocations
+from controller import LogiMaster
+
+class TestDefragmentationPlan(unittest.TestCase):
+    def test_plans_are_feasible_and_open_the_space(self):
+        rng = random.Random(4)
+        for _ in range(20):
+            inventory = BinInventory.from_rows([(i, rng.choice([20, 50, 100]), 'A1', 0) for i in range(1, 41)])
+            locations = PackageLocations()
+            for n in range(150):
+                size = rng.randint(3, 30)
+                storage_bin = inventory.best_fit(size)
+                if storage_bin is not None:
+                    storage_bin.occupy_space(size)
+                    locations.add(f"P{n}", storage_bin.bin_id, size)
+            target = max(b.free_capacity for b in inventory) + rng.randint(1, 20)
+            moves = plan_defragmentation(inventory, locations, target)
+            if not moves:
+                continue
+            # Replay the plan: every move must fit, and the target must fit afterwards
+            for move in moves:
+                self.assertEqual(locations.get(move.tracking_id)[0], move.from_bin)
+                inventory.get(move.to_bin).occupy_space(move.size)
+                inventory.get(move.from_bin).free_space(move.size)
+            self.assertIsNotNone(inventory.best_fit(target))
+
+    def test_no_moves_when_space_exists(self):
+        inventory = BinInventory.from_rows([(1, 10, 'A1', 0)])
+        self.assertEqual(plan_defragmentation(inventory, PackageLocations(), 5), [])
+
+class TestControllerDefragmentation(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        conn = self.controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.execute("DELETE FROM package_locations")
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(1, 10, 'A1'), (2, 10, 'A2'), (3, 20, 'B1')])
+        conn.commit()
+        self.controller.load_inventory()
+        self.controller.locations.restore([])
+        self.controller.assign_storage_batch([Package("S1", 6, "NYC"), Package("S2", 6, "NYC"),
+                                              Package("S3", 12, "NYC")])
+
+    def test_failed_package_fits_after_one_move(self):
+        self.controller.process_arrival(Package("BIG", 9, "NYC"))
+        self.assertFalse(self.controller.assign_storage()["success"])
+        self.assertEqual(self.controller.largest_unplaced, 9)
+
+        result = self.controller.defragment(moves_per_second=0)
+        self.assertEqual(result, {"target_size": 9, "planned": 1, "moved": 1, "fits": True})
+        self.assertEqual(self.controller.largest_unplaced, 0)
+        self.assertEqual(self.controller.bin_inventory.get(3).current_load, 18)
+
+        self.controller.process_arrival(Package("BIG", 9, "NYC"))
+        self.assertTrue(self.controller.assign_storage()["success"])
+
+    def test_stale_moves_are_skipped(self):
+        self.controller.locations.remove("S1")
+        self.assertFalse(self.controller._apply_move(Move("S1", 6, 1, 3)))
+        self.assertEqual(self.controller.bin_inventory.get(3).current_load, 12)
+
+    def test_move_from_underloaded_bin_is_skipped(self):
+        source = self.controller.locations.get("S1")[0]
+        self.controller.bin_inventory.get(source).restore_load(2)
+        self.assertFalse(self.controller._apply_move(Move("S1", 6, source, 3)))
+        # Neither bin nor the location changed
+        self.assertEqual(self.controller.bin_inventory.get(3).current_load, 12)
+        self.assertEqual(self.controller.bin_inventory.get(source).current_load, 2)
+        self.assertEqual(self.controller.locations.get("S1")[0], source)
+
+if __name__ == '__main__':
+    unittest.main()
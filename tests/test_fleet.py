@@ -0,0 +1,120 @@
+import unittest
+import os
+import random
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from models import Package, Truck
+from algorithms import plan_fleet
+from metrics import TRUCK_PLAN_SECONDS
+from controller import LogiMaster
+
+def make_pool(seed, count):
+    rng = random.Random(seed)
+    return [Package(f"P{i}", rng.randint(1, 40), rng.choice(["NYC", "LAX", "CHI"])) for i in range(count)]
+
+class TestFleetPlanner(unittest.TestCase):
+    def check_plan(self, trucks, packages, plan):
+        by_id = {t.truck_id: t for t in trucks}
+        seen = []
+        for truck_id, load in plan.loads.items():
+            truck = by_id[truck_id]
+            self.assertLessEqual(sum(p.size for p in load), truck.capacity)
+            self.assertTrue(all(truck.serves(p.destination) for p in load))
+            seen.extend(p.tracking_id for p in load)
+        seen.extend(p.tracking_id for p in plan.unassigned)
+        # Every package is either on exactly one truck or left over
+        self.assertEqual(sorted(seen), sorted(p.tracking_id for p in packages))
+
+    def test_routes_are_respected(self):
+        packages = make_pool(1, 60)
+        trucks = [Truck("T1", 200, ("NYC",)), Truck("T2", 150, ("LAX",), dock=2),
+                  Truck("T3", 100, ("CHI",), dock=3), Truck("T4", 120)]
+        plan = plan_fleet(trucks, packages, workers=1)
+        self.check_plan(trucks, packages, plan)
+        # Dedicated trucks are filled exactly when their destination has enough packages
+        nyc_total = sum(p.size for p in packages if p.destination == "NYC")
+        self.assertEqual(sum(p.size for p in plan.loads["T1"]), min(200, nyc_total))
+
+    def test_process_pool_matches_serial_plan(self):
+        packages = make_pool(2, 90)
+        trucks = [Truck("T1", 300, ("NYC",)), Truck("T2", 250, ("LAX",)), Truck("T3", 200, ("CHI",))]
+        serial = plan_fleet(trucks, packages, workers=1)
+        solves = sum(TRUCK_PLAN_SECONDS.count(engine=engine) for engine in ("DPSubsetSumSolver", "BranchAndBoundSolver"))
+        parallel = plan_fleet(trucks, packages, workers=3)
+        # Each truck's solve is timed in its pool process and recorded here
+        self.assertEqual(sum(TRUCK_PLAN_SECONDS.count(engine=engine)
+                             for engine in ("DPSubsetSumSolver", "BranchAndBoundSolver")), solves + 3)
+        self.check_plan(trucks, packages, parallel)
+        self.assertEqual({k: [p.tracking_id for p in v] for k, v in serial.loads.items()},
+                         {k: [p.tracking_id for p in v] for k, v in parallel.loads.items()})
+
+    def test_unroutable_packages_are_unassigned(self):
+        packages = [Package("A", 5, "NYC"), Package("B", 5, "SEA")]
+        plan = plan_fleet([Truck("T1", 100, ("NYC",))], packages)
+        self.assertEqual([p.tracking_id for p in plan.unassigned], ["B"])
+
+class TestControllerFleet(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+
+    def test_each_door_gets_its_truck(self):
+        packages = [Package("N1", 30, "NYC"), Package("N2", 20, "NYC"), Package("L1", 40, "LAX")]
+        result = self.controller.load_fleet([Truck("T1", 50, ("NYC",)), Truck("T2", 50, ("LAX",), dock=2)],
+                                            packages, workers=1)
+        self.assertTrue(result["success"])
+        self.assertEqual([p.tracking_id for p in self.controller.dock(1).snapshot()], ["N1", "N2"])
+        self.assertEqual([p.tracking_id for p in self.controller.dock(2).snapshot()], ["L1"])
+        self.assertEqual(result["unassigned"], [])
+
+    def test_failed_push_unloads_the_whole_fleet(self):
+        self.controller.dock(1).load_package(Package("OLD", 5, "NYC"))
+        dock2 = self.controller.dock(2)
+        original = dock2.load_package
+        pushes = []
+
+        def failing_push(package):
+            pushes.append(package.tracking_id)
+            if len(pushes) == 2:
+                raise RuntimeError("door 2 jammed")
+            original(package)
+        dock2.load_package = failing_push
+
+        packages = [Package("FN1", 30, "NYC"), Package("FN2", 20, "NYC"),
+                    Package("FL1", 25, "LAX"), Package("FL2", 25, "LAX")]
+        result = self.controller.load_fleet([Truck("T1", 50, ("NYC",)), Truck("T2", 50, ("LAX",), dock=2)],
+                                            packages, workers=1)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["truck_id"], "T2")
+        self.assertEqual([p.tracking_id for p in self.controller.dock(1).snapshot()], ["OLD"])
+        self.assertEqual(dock2.snapshot(), [])
+        self.assertEqual(self.controller.db.query_logs(tracking_id="FN1"), [])
+
+    def test_rollback_leaves_concurrent_pushes_alone(self):
+        dock1, dock2 = self.controller.dock(1), self.controller.dock(2)
+        other = threading.Thread(target=dock1.load_package, args=(Package("OTHER", 5, "NYC"),))
+        original = dock2.load_package
+
+        def failing_push(package):
+            # Another request pushes onto door 1 while the fleet is still loading
+            other.start()
+            other.join(0.2)
+            raise RuntimeError("door 2 jammed")
+        dock2.load_package = failing_push
+
+        packages = [Package("CN1", 30, "NYC"), Package("CL1", 25, "LAX")]
+        result = self.controller.load_fleet([Truck("T1", 50, ("NYC",)), Truck("T2", 50, ("LAX",), dock=2)],
+                                            packages, workers=1)
+        other.join()
+        dock2.load_package = original
+        self.assertFalse(result["success"])
+        # Only the fleet's own push was undone
+        self.assertEqual([p.tracking_id for p in dock1.snapshot()], ["OTHER"])
+
+if __name__ == '__main__':
+    unittest.main()
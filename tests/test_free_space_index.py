@@ -0,0 +1,103 @@
+import unittest
+import os
+import random
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from models import StorageBin
+from structures import BestFitCache, FreeSpaceIndex
+from algorithms import find_best_fit_bin
+
+class TestFreeSpaceIndex(unittest.TestCase):
+    def setUp(self):
+        self.bins = sorted([StorageBin(1, 5, 'A1'), StorageBin(2, 10, 'A2'), StorageBin(3, 15, 'B1')])
+        self.index = FreeSpaceIndex()
+        self.index.build(b.free_capacity for b in self.bins)
+
+    def occupy(self, slot, amount):
+        # Plain StorageBins do not report load changes: re-key the index by hand
+        old_free = self.bins[slot].free_capacity
+        self.bins[slot].occupy_space(amount)
+        self.index.move(slot, old_free, self.bins[slot].free_capacity)
+
+    def free(self, slot, amount):
+        old_free = self.bins[slot].free_capacity
+        self.bins[slot].free_space(amount)
+        self.index.move(slot, old_free, self.bins[slot].free_capacity)
+
+    def test_best_fit_uses_remaining_space(self):
+        self.assertEqual(find_best_fit_bin(self.bins, 4, self.index).bin_id, 1)
+        self.occupy(0, 3)
+        # Bin 1 has 2 left, so the tightest fit for 4 is now bin 2
+        self.assertEqual(find_best_fit_bin(self.bins, 4, self.index).bin_id, 2)
+        # A partially loaded bin with just enough room beats an empty bigger one
+        self.occupy(2, 7)
+        self.assertEqual(find_best_fit_bin(self.bins, 8, self.index).bin_id, 3)
+
+    def test_free_space_reindexes(self):
+        for slot, b in enumerate(self.bins):
+            self.occupy(slot, b.capacity)
+        self.assertIsNone(find_best_fit_bin(self.bins, 1, self.index))
+        self.free(1, 6)
+        self.assertEqual(find_best_fit_bin(self.bins, 6, self.index).bin_id, 2)
+
+    def test_linear_fallback_matches_index(self):
+        self.occupy(0, 5)
+        self.occupy(1, 2)
+        # Bin 3 (15) is fuller than bin 2 (10): 4 free against 8
+        self.occupy(2, 11)
+        self.assertEqual(find_best_fit_bin(self.bins, 3).bin_id, 3)
+        for size in range(1, 17):
+            indexed = find_best_fit_bin(self.bins, size, self.index)
+            fallback = find_best_fit_bin(self.bins, size)
+            self.assertIs(fallback, indexed)
+
+    def test_free_space_beyond_the_key_range_is_rejected(self):
+        index = FreeSpaceIndex()
+        index.build([FreeSpaceIndex.MAX_FREE])
+        self.assertEqual(index.best_fit(FreeSpaceIndex.MAX_FREE), 0)
+        with self.assertRaises(ValueError):
+            index.build([FreeSpaceIndex.MAX_FREE + 1])
+        with self.assertRaises(ValueError):
+            index.insert_many([(1, 2 ** 40)])
+
+class TestBestFitCache(unittest.TestCase):
+    def test_cache_matches_index_under_random_moves(self):
+        rng = random.Random(3)
+        free = [rng.randint(0, 50) for _ in range(40)]
+        index = FreeSpaceIndex()
+        index.build(free)
+        cache = BestFitCache(index, max_entries=8)
+        for _ in range(3000):
+            if rng.random() < 0.4:
+                slot = rng.randrange(len(free))
+                new_free = rng.randint(0, 50)
+                index.move(slot, free[slot], new_free)
+                cache.moved(slot, free[slot], new_free)
+                free[slot] = new_free
+            else:
+                size = rng.choice([3, 5, 8, 13, 21, 34, rng.randint(1, 60)])
+                self.assertEqual(cache.best_fit(size), index.best_fit(size))
+        stats = cache.stats()
+        self.assertGreater(stats["hits"], 0)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertLessEqual(stats["entries"], 8)
+
+    def test_repeat_size_stays_cached_while_bin_fills(self):
+        index = FreeSpaceIndex()
+        index.build([30, 100])
+        cache = BestFitCache(index)
+        self.assertEqual(cache.best_fit(10), 0)
+        for free in (30, 20):
+            index.move(0, free, free - 10)
+            cache.moved(0, free, free - 10)
+            self.assertEqual(cache.best_fit(10), 0)
+        # Bin 0 is full now, so the entry moves on to the next tightest bin
+        index.move(0, 10, 0)
+        cache.moved(0, 10, 0)
+        self.assertEqual(cache.best_fit(10), 1)
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
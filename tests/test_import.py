@@ -0,0 +1,85 @@
+import unittest
+import io
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from controller import LogiMaster
+from importer import parse_bins
+from models import Package
+
+class TestBinImport(unittest.TestCase):
+    def setUp(self):
+        self.previous = os.environ.get("LOGISTECH_ZONE_POLICY")
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        conn = self.controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(1, 10, 'A1'), (2, 50, 'B1')])
+        conn.commit()
+        self.controller.load_inventory()
+
+    def tearDown(self):
+        if self.previous is None:
+            os.environ.pop("LOGISTECH_ZONE_POLICY", None)
+        else:
+            os.environ["LOGISTECH_ZONE_POLICY"] = self.previous
+        LogiMaster._instance = None
+
+    def test_csv_import_validates_and_merges(self):
+        csv_text = ("bin_id,capacity,location_code,current_load\n"
+                    "3,20,A2,5\n"
+                    "2,30,B9,0\n"      # bin_id taken
+                    ",15,C1,\n"        # bin_id assigned on insert
+                    "4,abc,A3,0\n"
+                    "5,10,A4,11\n"
+                    "6,8,,0\n"
+                    "7,4294967296,A5,0\n")  # beyond the free-space index range
+        inventory = self.controller.bin_inventory
+        result = self.controller.import_bins(io.StringIO(csv_text), chunk_size=2)
+        self.assertEqual((result["imported"], result["skipped"]), (2, 5))
+        self.assertEqual([error["line"] for error in result["errors"]], [3, 5, 6, 7, 8])
+        self.assertEqual(result["errors"][0]["error"], "Bin 2 already exists")
+
+        # Merged into the live inventory, not reloaded
+        self.assertIs(self.controller.bin_inventory, inventory)
+        rows = self.controller.db.conn.execute(
+            "SELECT bin_id, capacity, location_code, current_load FROM bins WHERE bin_id > 2 ORDER BY capacity DESC")
+        (_, capacity, location, load), (assigned_id, *new_bin) = rows.fetchall()
+        self.assertEqual((capacity, location, load), (20, 'A2', 5))
+        self.assertEqual(new_bin, [15, 'C1', 0])
+        self.controller.process_arrival(Package("P1", 15, "NYC"))
+        self.assertEqual(self.controller.assign_storage()["bin_id"], 3)
+        self.controller.process_arrival(Package("P2", 14, "NYC"))
+        self.assertEqual(self.controller.assign_storage()["bin_id"], assigned_id)
+
+    def test_jsonl_records(self):
+        lines = ['{"capacity": 12, "location_code": "D1", "length": 40, "width": 30, "height": 20}',
+                 '', '[1]', '{"capacity": 5, "location_code": "D2", "colour": "red"}', '{"capacity": 5,']
+        parsed = list(parse_bins(io.StringIO("\n".join(lines)), "jsonl"))
+        self.assertEqual([line for line, _, _ in parsed], [1, 3, 4, 5])
+        self.assertEqual(parsed[0][1], (None, 12, 'D1', 0, 40, 30, 20, 0, 0))
+        self.assertEqual(parsed[2][2], "Unknown fields: colour")
+        with self.assertRaises(ValueError):
+            list(parse_bins(io.StringIO("size,where\n1,A1\n")))
+
+    def test_import_into_zone_shards(self):
+        os.environ["LOGISTECH_ZONE_POLICY"] = "least_loaded"
+        LogiMaster._instance = None
+        controller = LogiMaster()
+        result = controller.import_bins(io.StringIO("capacity,location_code\n100,C1\n40,A2\n"))
+        self.assertEqual(result["imported"], 2)
+        shards = controller.bin_inventory.shards
+        self.assertEqual(list(shards), ['A', 'B', 'C'])
+        self.assertEqual((shards['A'].bins, shards['A'].capacity), (2, 50))
+        self.assertEqual(controller.bin_inventory.best_fit_in_zone(35, 'A').location_code, 'A2')
+        # Only the new zone has room for it
+        controller.process_arrival(Package("Z1", 60, "NYC"))
+        self.assertEqual(controller.assign_storage()["bin_location"], 'C1')
+
+if __name__ == '__main__':
+    unittest.main()
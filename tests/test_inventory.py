@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from inventory import BinInventory
+from algorithms import find_best_fit_bin
+
+class TestBinInventory(unittest.TestCase):
+    def setUp(self):
+        rows = [(4, 50, 'B2', 0), (1, 5, 'A1', 0), (5, 100, 'C1', 40), (3, 15, 'B1', 0), (2, 10, 'A2', 0)]
+        self.inventory = BinInventory.from_rows(iter(rows))
+
+    def test_bulk_load_sorts_by_capacity(self):
+        self.assertEqual(list(self.inventory.capacities), [5, 10, 15, 50, 100])
+        self.assertEqual([b.bin_id for b in self.inventory], [1, 2, 3, 4, 5])
+        self.assertEqual(self.inventory.get(5).current_load, 40)
+        self.assertEqual(self.inventory.get(3).location_code, 'B1')
+        self.assertIsNone(self.inventory.get(99))
+        # Location codes are interned, one string per distinct code
+        self.assertEqual(len(self.inventory.locations), 5)
+
+    def test_best_fit_and_occupy_free(self):
+        changes = []
+        self.inventory.subscribe(lambda b, old: changes.append((b.bin_id, old, b.current_load)))
+        self.assertEqual(self.inventory.best_fit(12).bin_id, 3)
+        self.inventory.get(3).occupy_space(12)
+        self.assertEqual(self.inventory.best_fit(12).bin_id, 4)
+        # Only bin 5 (60 of 100 free) has room for 55
+        self.assertEqual(self.inventory.best_fit(55).bin_id, 5)
+        with self.assertRaises(ValueError):
+            self.inventory.get(1).occupy_space(6)
+        self.inventory.get(3).free_space(12)
+        self.assertEqual(changes, [(3, 0, 12), (3, 12, 0)])
+        # The generic best-fit helper works on the columnar store too
+        self.assertEqual(find_best_fit_bin(self.inventory, 12, self.inventory.free_index).bin_id, 3)
+        self.assertEqual(find_best_fit_bin(self.inventory, 12).bin_id, 3)
+
+    def test_columns_serialize_rows(self):
+        rows = list(self.inventory.columns(3))
+        self.assertEqual(rows, [(4, 50, 0, 'B2'), (5, 100, 40, 'C1')])
+
+    def test_change_feed(self):
+        start = self.inventory.version
+        self.assertEqual(self.inventory.changed_since(start), (start, []))
+        self.inventory.get(2).occupy_space(3)
+        self.inventory.get(4).occupy_space(10)
+        self.inventory.get(2).free_space(3)
+        version, rows = self.inventory.changed_since(start)
+        self.assertEqual(version, start + 3)
+        self.assertEqual([self.inventory[r].bin_id for r in rows], [2, 4])
+        self.assertEqual(self.inventory.changed_since(start + 2)[1], [self.inventory.row_of(2)])
+        # A reloaded inventory cannot answer for versions of the old one
+        reloaded = BinInventory.from_rows(iter([(1, 5, 'A1', 0)]), base_version=version + 1)
+        self.assertIsNone(reloaded.changed_since(version))
+
+    def test_zone_filter(self):
+        self.assertEqual([self.inventory[r].bin_id for r in self.inventory.rows_in_zone('B')], [3, 4])
+
+    def test_add_bins_merges_into_indexes(self):
+        start = self.inventory.version
+        self.inventory.best_fit(12)  # Cached before the merge
+        rows = self.inventory.add_bins([(7, 12, 'D1', 0), (6, 30, 'A3', 22)])
+        self.assertEqual(rows, [5, 6])
+        self.assertEqual(self.inventory.best_fit(12).bin_id, 7)
+        self.assertEqual(self.inventory.best_fit(11).bin_id, 7)
+        self.assertEqual(self.inventory.best_fit(8).bin_id, 6)
+        self.assertEqual(self.inventory.get(6).location_code, 'A3')
+        self.assertEqual(list(self.inventory._ids_sorted), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(self.inventory.changed_since(start), (start + 2, [5, 6]))
+        with self.assertRaises(ValueError):
+            self.inventory.add_bins([(3, 10, 'A9', 0)])
+
+    def test_binary_snapshot_round_trip(self):
+        path = os.path.join(tempfile.mkdtemp(), "inventory.snap")
+        self.inventory.get(3).occupy_space(12)
+        self.inventory.save(path, state_version=7)
+        loaded = BinInventory.load(path, state_version=7)
+        self.assertEqual(list(loaded.columns()), list(self.inventory.columns()))
+        self.assertEqual(loaded.get(3).current_load, 12)
+        self.assertEqual(loaded.best_fit(12).bin_id, 4)
+        self.assertEqual(loaded.get(2).location_code, 'A2')
+        # Bins changed in the database since the snapshot was written
+        self.assertIsNone(BinInventory.load(path, state_version=8))
+        self.assertIsNone(BinInventory.load(path + ".missing", state_version=7))
+
+if __name__ == '__main__':
+    unittest.main()
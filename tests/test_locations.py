@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from models import Package
+from controller import LogiMaster
+
+class TestPackageLocations(unittest.TestCase):
+    def setUp(self):
+        self.previous_db = os.environ.get("LOGISTECH_DB")
+        os.environ["LOGISTECH_DB"] = os.path.join(tempfile.mkdtemp(), "locations.db")
+        self.controller = self.restart()
+        conn = self.controller.db.conn
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(1, 10, 'C1'), (2, 20, 'A1'), (3, 30, 'B1')])
+        conn.commit()
+        self.controller.load_inventory()
+        self.controller.assign_storage_batch([Package("P1", 10, "NYC"), Package("P2", 20, "NYC"),
+                                              Package("P3", 25, "LAX")])
+
+    def tearDown(self):
+        if self.previous_db is None:
+            os.environ.pop("LOGISTECH_DB", None)
+        else:
+            os.environ["LOGISTECH_DB"] = self.previous_db
+        LogiMaster._instance = None
+
+    def restart(self):
+        LogiMaster._instance = None
+        return LogiMaster()
+
+    def test_lookup_and_bin_contents(self):
+        self.assertEqual(self.controller.locate("P3")["bin_location"], "B1")
+        self.assertEqual(self.controller.locations.tracking_ids(2), ["P2"])
+        self.assertIsNone(self.controller.locate("NOPE"))
+
+    def test_index_is_rebuilt_after_restart(self):
+        self.controller.db.flush()
+        restarted = self.restart()
+        self.assertEqual(len(restarted.locations), 3)
+        self.assertEqual(restarted.locate("P1")["bin_id"], 1)
+
+    def test_bin_loads_are_rebuilt_after_restart(self):
+        self.controller.db.flush()
+        restarted = self.restart()
+        self.assertEqual([b.current_load for b in restarted.bin_inventory], [10, 20, 25])
+        # The stored packages' space is not handed out again
+        restarted.process_arrival(Package("P4", 10, "NYC"))
+        self.assertFalse(restarted.assign_storage()["success"])
+        restarted.pick(["P1", "P2", "P3"])
+        self.assertEqual(restarted.bin_inventory.utilization(), 0)
+
+    def test_pick_batch_walks_by_location_and_frees_space(self):
+        result = self.controller.pick(["P1", "P3", "P2", "GONE"], door=2)
+        self.assertEqual([p["bin_location"] for p in result["picks"]], ["A1", "B1", "C1"])
+        self.assertEqual(result["missing"], ["GONE"])
+        self.assertEqual(self.controller.bin_inventory.utilization(), 0)
+        self.assertEqual([p.tracking_id for p in self.controller.dock(2).snapshot()], ["P2", "P3", "P1"])
+        self.assertEqual(len(self.controller.locations), 0)
+        # A picked package cannot be picked twice
+        self.assertEqual(self.controller.pick(["P1"])["missing"], ["P1"])
+        self.controller.db.flush()
+        self.assertEqual(list(self.controller.db.iter_locations()), [])
+
+if __name__ == '__main__':
+    unittest.main()
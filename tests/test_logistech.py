@@ -1,8 +1,12 @@
 import unittest
 import os
 import sys
+import tempfile
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 
+# Keep the tests off the checked-in logistech.db
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
 from controller import LogiMaster
 from models import Package
 from database import Database
@@ -32,7 +36,7 @@ class TestLogisTech(unittest.TestCase):
             (4, 50, 'B2'),
             (5, 100, 'C1')
         ]
-        cursor.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (%s, %s, %s)", bins)
+        cursor.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)", bins)
         conn.commit()
         cursor.close()
         
@@ -69,6 +73,45 @@ class TestLogisTech(unittest.TestCase):
         self.assertFalse(result3["success"])
         self.assertEqual(result3["reason"], "No suitable bin found")
 
+    def test_full_bin_falls_through_to_next_fit(self):
+        """A full best-fit bin must not swallow the package"""
+        for i, size in enumerate([5, 5]):
+            self.controller.process_arrival(Package(f"FULL{i}", size, "NYC"))
+            result = self.controller.assign_storage()
+            self.assertTrue(result["success"])
+        # Bin 1 (cap 5) is full, the second package goes to bin 2 (cap 10)
+        self.assertEqual(result["bin_id"], 2)
+
+        # 5 free in bin 2 is now the tightest fit for another size 5
+        self.controller.process_arrival(Package("FULL2", 5, "NYC"))
+        self.assertEqual(self.controller.assign_storage()["bin_id"], 2)
+
+    def test_batch_storage_assignment(self):
+        """Batch assignment gives each package its best fit, in input order"""
+        packages = [
+            Package("B1", 12, "NYC"),
+            Package("B2", 4, "BOS"),
+            Package("B3", 200, "MIA"),
+            Package("B4", 3, "BOS"),
+            Package("B5", 1, "BOS"),
+        ]
+        # Smallest first: B5 (1) and B4 (3) fill Bin 1 (5) up to 4, B2 (4) no
+        # longer fits there and takes Bin 2 (10), B1 (12) takes Bin 3 (15), B3 fails.
+        results = self.controller.assign_storage_batch(packages)
+        self.assertEqual([r["package_id"] for r in results], ["B1", "B2", "B3", "B4", "B5"])
+        self.assertEqual([r.get("bin_id") for r in results], [3, 2, None, 1, 1])
+        self.assertEqual(results[2]["reason"], "No suitable bin found")
+
+        loads = {b.bin_id: b.current_load for b in self.controller.bin_inventory}
+        self.assertEqual(loads[1], 4)
+        self.assertEqual(loads[2], 4)
+        self.assertEqual(loads[3], 12)
+
+        cursor = self.controller.db.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM shipment_logs WHERE status='STORED'")
+        self.assertEqual(cursor.fetchone()[0], 4)
+        cursor.close()
+
     def test_backtracking_loader(self):
         """Verify Backtracking finds a valid combination"""
         packages = [
@@ -77,16 +120,16 @@ class TestLogisTech(unittest.TestCase):
             Package("P3", 20, "C"),
             Package("P4", 50, "D")
         ]
-        # Truck 100. 30+40+20 = 90. 30+40+50 = 120 (Fail).
-        # So it should load P1, P2, P3.
+        # Truck 100. 30+40+20 = 90, but 30+20+50 = 100 fills it exactly.
+        # So it should load P1, P3, P4.
         
         result = self.controller.load_truck(100, packages)
         self.assertTrue(result["success"])
         loaded_ids = [p["id"] for p in result["loaded_packages"]]
         self.assertIn("P1", loaded_ids)
-        self.assertIn("P2", loaded_ids)
         self.assertIn("P3", loaded_ids)
-        self.assertNotIn("P4", loaded_ids)
+        self.assertIn("P4", loaded_ids)
+        self.assertNotIn("P2", loaded_ids)
 
     def test_impossible_shipment(self):
         """Verify Backtracking handles impossible cases"""
@@ -99,6 +142,7 @@ class TestLogisTech(unittest.TestCase):
         pkg = Package("SQLTEST", 10, "DB")
         self.controller.process_arrival(pkg)
         self.controller.assign_storage()
+        self.controller.db.flush() # Logs are buffered until a flush
         
         cursor = self.controller.db.conn.cursor()
         cursor.execute("SELECT * FROM shipment_logs WHERE tracking_id='SQLTEST'")
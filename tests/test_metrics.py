@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from metrics import Counter, Gauge, Histogram, Registry, SamplingProfiler, ASSIGNMENT_FAILURES, PACKAGES_STORED, REGISTRY
+from controller import LogiMaster
+from models import Package
+
+class TestPrometheusFormat(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        failures = Counter("failures_total", "Failures", ["reason"], registry=self.registry)
+        failures.inc(reason="full")
+        failures.inc(2, reason="full")
+        depth = Gauge("depth", "Queue depth", registry=self.registry)
+        depth.set_function(lambda: 7)
+        text = self.registry.render()
+        self.assertIn("# TYPE failures_total counter", text)
+        self.assertIn('failures_total{reason="full"} 3', text)
+        self.assertIn("depth 7", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = Histogram("op_seconds", "Latency", buckets=(0.1, 1.0), registry=self.registry)
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value)
+        text = self.registry.render()
+        self.assertIn('op_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('op_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('op_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("op_seconds_count 3", text)
+        with latency.time():
+            pass
+        self.assertEqual(latency.count(), 4)
+
+    def test_duplicate_names_are_rejected(self):
+        Counter("events_total", "Events", registry=self.registry)
+        with self.assertRaises(ValueError):
+            Counter("events_total", "Events", registry=self.registry)
+
+class TestControllerMetrics(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        conn = self.controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.execute("INSERT INTO bins (bin_id, capacity, location_code) VALUES (1, 10, 'A1')")
+        conn.commit()
+        self.controller.load_inventory()
+
+    def test_assignments_are_counted(self):
+        stored = PACKAGES_STORED.value()
+        failed = ASSIGNMENT_FAILURES.value(reason="no_suitable_bin")
+        for tracking_id, size in (("M1", 6), ("M2", 6)):
+            self.controller.process_arrival(Package(tracking_id, size, "NYC"))
+            self.controller.assign_storage()
+        self.assertEqual(PACKAGES_STORED.value(), stored + 1)
+        self.assertEqual(ASSIGNMENT_FAILURES.value(reason="no_suitable_bin"), failed + 1)
+
+        text = REGISTRY.render()
+        self.assertIn("logistech_bin_utilization_ratio 0.6", text)
+        self.assertIn('logistech_queue_depth{queue="conveyor"} 0', text)
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_sample_records_other_threads(self):
+        release = threading.Event()
+        worker = threading.Thread(target=release.wait)
+        worker.start()
+        try:
+            profiler = SamplingProfiler()
+            profiler.sample(exclude=threading.get_ident())
+            self.assertIn("threading.py:wait", profiler.folded())
+        finally:
+            release.set()
+            worker.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import itertools
+import os
+import random
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from models import Package, StorageBin, fits_within
+from structures import DimensionIndex
+from inventory import BinInventory
+from algorithms import pack_truck_3d
+from controller import LogiMaster
+
+class TestDimensionIndex(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(5)
+        n = 300
+        dims = [tuple(rng.randint(10, 100) for _ in range(3)) if rng.random() < 0.9 else None for _ in range(n)]
+        free_volume = [rng.randint(0, 5000) for _ in range(n)]
+        free_weight = [rng.randint(0, 50) for _ in range(n)]
+        index = DimensionIndex(dims, free_volume, free_weight)
+
+        def brute(item, volume, weight):
+            fitting = [slot for slot in range(n)
+                       if (dims[slot] is None or fits_within(item, dims[slot]))
+                       and free_volume[slot] >= volume and free_weight[slot] >= weight]
+            return min((free_volume[s] for s in fitting), default=None)
+
+        for step in range(500):
+            if step % 3 == 0:
+                slot = rng.randrange(n)
+                free_volume[slot], free_weight[slot] = rng.randint(0, 5000), rng.randint(0, 50)
+                index.update(slot, free_volume[slot], free_weight[slot])
+            item = tuple(rng.randint(5, 90) for _ in range(3))
+            volume, weight = rng.randint(1, 3000), rng.randint(0, 40)
+            slot = index.best_fit(item, volume, weight)
+            expected = brute(item, volume, weight)
+            if expected is None:
+                self.assertIsNone(slot)
+            else:
+                self.assertEqual(free_volume[slot], expected)
+                self.assertTrue(dims[slot] is None or fits_within(item, dims[slot]))
+
+class TestDimensionalInventory(unittest.TestCase):
+    def setUp(self):
+        # (bin_id, capacity, location, load, length, width, height, max_weight, weight)
+        self.inventory = BinInventory.from_rows([
+            (1, 1000, 'A1', 0, 10, 10, 10, 20, 0),    # Small cube
+            (2, 4000, 'A2', 0, 100, 20, 2, 0, 0),     # Long flat shelf
+            (3, 50000, 'B1', 0, 50, 50, 20, 100, 0),  # Large bin
+        ])
+
+    def test_dimensions_decide_before_volume(self):
+        self.assertTrue(self.inventory.dimensional)
+        # Volume 500 would fit bin 1 or 2 by space, but a 50-long box only fits bin 2 or 3
+        rod = Package("R1", 0, "NYC", (2, 5, 50))
+        self.assertEqual(self.inventory.best_fit_package(rod).bin_id, 2)
+        cube = Package("C1", 0, "NYC", (8, 8, 8))
+        self.assertEqual(self.inventory.best_fit_package(cube).bin_id, 1)
+
+    def test_weight_limit(self):
+        heavy = Package("H1", 0, "NYC", (5, 5, 5), weight=30)
+        self.assertEqual(self.inventory.best_fit_package(heavy).bin_id, 3)
+        small_bin = self.inventory.get(1)
+        small_bin.occupy_space(100, 15)
+        self.assertEqual(small_bin.current_weight, 15)
+        with self.assertRaises(ValueError):
+            small_bin.occupy_space(100, 10)
+        # Bin 1 has 5 kg left, so a 6 kg box skips it
+        self.assertEqual(self.inventory.best_fit_package(Package("H2", 0, "NYC", (5, 5, 5), 6)).bin_id, 3)
+
+    def test_unconstrained_side_counts_as_largest(self):
+        # Open-topped bin: no height limit, 5 x 3 footprint
+        inventory = BinInventory.from_rows([(1, 1000, 'A1', 0, 0, 5, 3, 0, 0)])
+        self.assertEqual(inventory.dimension_index.major, [DimensionIndex.UNBOUNDED])
+        self.assertEqual(inventory.best_fit_package(Package("T1", 0, "NYC", (2, 4, 10))).bin_id, 1)
+        self.assertIsNone(inventory.best_fit_package(Package("T2", 0, "NYC", (4, 4, 10))))
+
+    def test_plain_inventory_has_no_3d_columns(self):
+        plain = BinInventory.from_rows([(1, 10, 'A1', 0), (2, 20, 'A2', 0)])
+        self.assertFalse(plain.dimensional)
+        self.assertEqual(len(plain.weights), 0)
+        self.assertEqual(plain.best_fit_package(Package("P1", 15, "NYC")).bin_id, 2)
+
+    def test_storage_bin_can_hold(self):
+        storage_bin = StorageBin(1, 1000, 'A1', (10, 10, 10), max_weight=5)
+        self.assertTrue(storage_bin.can_hold(Package("P1", 0, "NYC", (10, 5, 2), 5)))
+        self.assertFalse(storage_bin.can_hold(Package("P2", 0, "NYC", (11, 1, 1))))
+        self.assertFalse(storage_bin.can_hold(Package("P3", 0, "NYC", (1, 1, 1), 6)))
+
+    def test_storage_bin_and_view_restore_alike(self):
+        storage_bin = StorageBin(1, 1000, 'A1', (10, 10, 10), max_weight=5)
+        view = self.inventory.get(1)
+        for unit in (storage_bin, view):
+            unit.restore_load(300, 4)
+            self.assertEqual((unit.current_load, unit.current_weight), (300, 4))
+            with self.assertRaises(ValueError):
+                unit.restore_load(1001)
+
+class TestControllerStorage3D(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        conn = self.controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.executemany('''INSERT INTO bins (bin_id, capacity, location_code, length, width, height, max_weight)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                         [(1, 1000, 'A1', 10, 10, 10, 0), (2, 8000, 'B1', 40, 20, 10, 50)])
+        conn.commit()
+        self.controller.load_inventory()
+
+    def test_package_goes_to_bin_it_fits(self):
+        self.controller.process_arrival(Package("D1", 0, "NYC", (30, 5, 5), weight=3))
+        result = self.controller.assign_storage()
+        self.assertEqual(result["bin_id"], 2)
+        self.assertEqual(self.controller.bin_inventory.get(2).current_load, 750)
+        self.assertEqual(self.controller.bin_inventory.get(2).current_weight, 3)
+
+class TestTruckPacking3D(unittest.TestCase):
+    def test_boxes_do_not_overlap_and_stay_inside(self):
+        rng = random.Random(2)
+        truck = (400, 240, 250)
+        packages = [Package(f"P{i}", 0, "NYC", (rng.randint(20, 90), rng.randint(20, 60), rng.randint(10, 50)),
+                            rng.randint(1, 20)) for i in range(400)]
+        placements = pack_truck_3d(truck, packages, max_weight=3000)
+        self.assertGreater(len(placements), 0)
+        self.assertLessEqual(sum(p.package.weight for p in placements), 3000)
+        boxes = [(p.x, p.y, p.z, p.x + p.length, p.y + p.width, p.z + p.height) for p in placements]
+        for box in boxes:
+            self.assertTrue(all(lo >= 0 for lo in box[:3]))
+            self.assertTrue(all(hi <= limit for hi, limit in zip(box[3:], truck)))
+        for a, b in itertools.combinations(boxes, 2):
+            overlap = all(a[i] < b[i + 3] and b[i] < a[i + 3] for i in range(3))
+            self.assertFalse(overlap)
+        # Each placement is a rotation of its package
+        for p in placements:
+            self.assertEqual(sorted((p.length, p.width, p.height)), sorted(p.package.dimensions))
+
+    def test_loading_order_is_back_to_front(self):
+        packages = [Package(f"P{i}", 0, "NYC", (100, 100, 100)) for i in range(3)]
+        placements = pack_truck_3d((300, 100, 100), packages + [Package("FLAT", 5, "NYC")])
+        self.assertEqual([p.x for p in placements], [0, 100, 200])
+        # Packages without dimensions cannot be placed
+        self.assertNotIn("FLAT", [p.package.tracking_id for p in placements])
+
+if __name__ == '__main__':
+    unittest.main()
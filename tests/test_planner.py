@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+import tempfile
+from concurrent.futures import Future
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from models import Package
+from algorithms import optimize_truck_loading
+from planner import PlanningJobs, plan_key
+from metrics import TRUCK_PLAN_SECONDS
+from controller import LogiMaster
+
+MANIFEST = [Package("A", 30, "NYC"), Package("B", 45, "NYC"), Package("C", 25, "LAX"), Package("D", 60, "LAX")]
+
+class TestPlanningJobs(unittest.TestCase):
+    def test_reordered_manifest_hits_the_cache(self):
+        jobs = PlanningJobs(workers=0)
+        first = jobs.submit(100, MANIFEST)
+        self.assertEqual(sum(p.size for p in first.load), 100)
+        relabelled = [Package(f"X{i}", p.size, "SEA") for i, p in enumerate(reversed(MANIFEST))]
+        self.assertEqual(plan_key(100, [p.size for p in relabelled]), first.key)
+        second = jobs.submit(100, relabelled)
+        self.assertTrue(second.cached)
+        # The cached plan is mapped onto the new manifest's own packages
+        self.assertEqual(sum(p.size for p in second.load), 100)
+        self.assertTrue(all(p.tracking_id.startswith("X") for p in second.load))
+
+    def test_process_pool_matches_inline_solve(self):
+        jobs = PlanningJobs(workers=1)
+        try:
+            packages = [Package(f"P{i}", size, "NYC") for i, size in enumerate([17, 23, 41, 8, 36, 52, 11])]
+            job = jobs.submit(120, packages)
+            job.future.result(timeout=30)
+            self.assertEqual(job.status, "done")
+            expected = optimize_truck_loading(120, packages)
+            self.assertEqual(sum(p.size for p in job.load), sum(p.size for p in expected))
+        finally:
+            jobs.shutdown()
+
+    def test_pool_is_not_forked_and_reports_timings(self):
+        jobs = PlanningJobs(workers=1)
+        try:
+            before = TRUCK_PLAN_SECONDS.count(engine="DPSubsetSumSolver")
+            jobs.solve(90, [Package(f"P{i}", size, "NYC") for i, size in enumerate([13, 29, 44, 7])])
+            self.assertNotEqual(jobs._pool._mp_context.get_start_method(), "fork")
+            # Timed in the child, recorded in this process
+            self.assertEqual(TRUCK_PLAN_SECONDS.count(engine="DPSubsetSumSolver"), before + 1)
+        finally:
+            jobs.shutdown()
+
+    def test_solve_gives_up_after_the_timeout(self):
+        jobs = PlanningJobs(workers=0, timeout=0.05)
+        jobs._start = lambda capacity, sizes: Future()  # A solve that never finishes
+        with self.assertRaises(TimeoutError):
+            jobs.solve(100, MANIFEST)
+
+class TestCommitPlan(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        self.controller.planner = PlanningJobs(workers=0)
+
+    def test_plan_loads_the_dock_only_on_commit(self):
+        job = self.controller.planner.submit(100, MANIFEST)
+        self.assertEqual(self.controller.dock(3).snapshot(), [])
+        result = self.controller.commit_plan(job.job_id, 3)
+        self.assertTrue(result["success"])
+        self.assertEqual(sum(p.size for p in self.controller.dock(3).snapshot()), 100)
+        self.assertEqual(job.status, "committed")
+        self.assertFalse(self.controller.commit_plan(job.job_id, 3)["success"])
+
+    def test_replan_applies_a_lifo_diff(self):
+        self.controller.dock(4).rollback_load(len(self.controller.dock(4).snapshot()))
+        result = self.controller.replan_truck(4, 100, add=MANIFEST)
+        self.assertEqual(result["load"], 100)
+        result = self.controller.replan_truck(4, remove=["C"], add=[Package("E", 25, "SEA")])
+        self.assertEqual((result["pops"], result["pushes"]), (1, ["E"]))
+        self.assertEqual([p.tracking_id for p in self.controller.dock(4).snapshot()], ["A", "B", "E"])
+
+if __name__ == '__main__':
+    unittest.main()
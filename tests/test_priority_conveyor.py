@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from models import Package
+from structures import PriorityConveyor
+from controller import LogiMaster
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class TestPriorityConveyor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.conveyor = PriorityConveyor(oversize_size=100, urgent_within=600, retry_delay=10,
+                                         max_attempts=2, clock=self.clock)
+
+    def drain(self):
+        order = []
+        while (package := self.conveyor.get_next_package()) is not None:
+            order.append(package.tracking_id)
+        return order
+
+    def test_lanes_and_deadlines(self):
+        now = self.clock.now
+        self.conveyor.add_package(Package("S1", 10, "NYC"))
+        self.conveyor.add_package(Package("BIG", 150, "NYC"))
+        self.conveyor.add_package(Package("LATE", 10, "NYC", deadline=now + 500))
+        self.conveyor.add_package(Package("SOON", 10, "NYC", deadline=now + 60))
+        # Far-off deadline stays standard but goes ahead of packages without one
+        self.conveyor.add_package(Package("S2", 10, "NYC", deadline=now + 86_400))
+        self.conveyor.set_cutoff("LAX", now + 300)
+        self.conveyor.add_package(Package("CUT", 10, "LAX"))
+        self.assertEqual(self.conveyor.depths(), {"urgent": 3, "retry": 0, "oversize": 1, "standard": 2})
+        self.assertEqual(self.drain(), ["SOON", "CUT", "LATE", "BIG", "S2", "S1"])
+
+    def test_retry_backoff_and_dead_letter(self):
+        package = Package("R1", 10, "NYC")
+        self.assertTrue(self.conveyor.retry(package))
+        # Not due yet
+        self.assertIsNone(self.conveyor.get_next_package())
+        self.clock.now += 10
+        self.assertIs(self.conveyor.get_next_package(), package)
+        self.assertFalse(self.conveyor.retry(package))
+        self.assertEqual(self.conveyor.dead_letters, [package])
+        self.assertEqual(self.conveyor.requeue_dead_letters(), 1)
+        self.assertEqual(self.drain(), ["R1"])
+
+class TestConveyorWorkers(unittest.TestCase):
+    def setUp(self):
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        self.controller.conveyor_queue = PriorityConveyor(retry_delay=60)
+        conn = self.controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(i, 100, f"A{i}") for i in range(1, 11)])
+        conn.commit()
+        self.controller.load_inventory()
+
+    def tearDown(self):
+        self.controller.stop_workers()
+
+    def test_workers_drain_and_failures_are_requeued(self):
+        for i in range(40):
+            self.controller.process_arrival(Package(f"W{i}", 20, "NYC"))
+        self.controller.process_arrival(Package("HUGE", 500, "NYC"))
+        self.controller.start_workers(4, poll_interval=0.01)
+        deadline = time.time() + 5
+        while self.controller.conveyor_queue.depths()["standard"] and time.time() < deadline:
+            time.sleep(0.01)
+        self.controller.stop_workers()
+        self.assertEqual(self.controller.bin_inventory.utilization(), 0.8)
+        # The package no bin could take waits in the retry lane instead of being dropped
+        self.assertEqual(self.controller.conveyor_queue.depths()["retry"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
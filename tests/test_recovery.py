@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from controller import LogiMaster
+from models import Package
+
+class TestDurableState(unittest.TestCase):
+    """A new LogiMaster on the same database file plays the restarted process"""
+    def setUp(self):
+        self.previous = {name: os.environ.get(name) for name in
+                         ("LOGISTECH_DB", "LOGISTECH_DURABLE_STATE", "LOGISTECH_SNAPSHOT_INTERVAL")}
+        os.environ["LOGISTECH_DB"] = os.path.join(tempfile.mkdtemp(), "durable.db")
+        os.environ["LOGISTECH_DURABLE_STATE"] = "1"
+        os.environ["LOGISTECH_SNAPSHOT_INTERVAL"] = "0"
+        self.controller = self.restart()
+        conn = self.controller.db.conn
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(1, 10, 'A1'), (2, 50, 'A2')])
+        conn.commit()
+        self.controller.load_inventory()
+
+    def tearDown(self):
+        for name, value in self.previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        LogiMaster._instance = None
+
+    def restart(self):
+        LogiMaster._instance = None
+        return LogiMaster()
+
+    def fill(self, controller):
+        for tracking_id, size in (("P1", 8), ("P2", 30), ("P3", 5)):
+            controller.process_arrival(Package(tracking_id, size, "NYC"))
+        controller.assign_storage()  # P1 -> bin 1
+        controller.assign_storage()  # P2 -> bin 2
+        controller.load_truck(20, [Package("T1", 12, "LAX"), Package("T2", 7, "LAX")])
+        controller.dock(2).load_package(Package("D2", 3, "SEA"))
+        controller.loading_stack.rollback_load(1)
+
+    def check_state(self, controller):
+        self.assertEqual([p.tracking_id for p in controller.conveyor_queue.snapshot()], ["P3"])
+        self.assertEqual([p.tracking_id for p in controller.loading_stack.snapshot()], ["T1"])
+        self.assertEqual([p.tracking_id for p in controller.dock(2).snapshot()], ["D2"])
+        self.assertEqual(controller.bin_inventory.get(1).current_load, 8)
+        self.assertEqual(controller.bin_inventory.get(2).current_load, 30)
+
+    def test_restart_replays_the_journal(self):
+        self.fill(self.controller)
+        self.controller.db.flush()  # What the group commit would have written before the crash
+        self.check_state(self.restart())
+
+    def test_restart_from_snapshot_and_tail(self):
+        self.fill(self.controller)
+        self.controller.checkpoint()
+        db = self.controller.db
+        self.assertEqual(db.journal_since(0), [])
+        self.assertEqual(db.conn.execute("SELECT current_load FROM bins ORDER BY bin_id").fetchall(), [(8,), (30,)])
+        # Changes after the snapshot come from the journal tail
+        self.controller.process_arrival(Package("P4", 2, "NYC"))
+        self.controller.assign_storage()  # P3 -> bin 2
+        db.flush()
+        restarted = self.restart()
+        self.assertEqual([p.tracking_id for p in restarted.conveyor_queue.snapshot()], ["P4"])
+        self.assertEqual(restarted.bin_inventory.get(2).current_load, 35)
+        self.assertEqual([p.tracking_id for p in restarted.loading_stack.snapshot()], ["T1"])
+
+    def test_recovery_is_fast(self):
+        for i in range(20_000):
+            self.controller.process_arrival(Package(f"Q{i}", 1, "NYC"))
+        self.controller.checkpoint()
+        for i in range(2_000):
+            self.controller.conveyor_queue.get_next_package()
+        self.controller.db.flush()
+        start = time.perf_counter()
+        restarted = self.restart()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(restarted.conveyor_queue.queue), 18_000)
+
+if __name__ == '__main__':
+    unittest.main()
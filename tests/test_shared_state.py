@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from controller import LogiMaster
+from database import Database
+from models import Package
+
+class TestSharedState(unittest.TestCase):
+    """A second Database connection plays the role of another worker process"""
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "shared.db")
+        self.previous_db = os.environ.get("LOGISTECH_DB")
+        os.environ["LOGISTECH_DB"] = self.path
+        os.environ["LOGISTECH_SHARED_STATE"] = "1"
+        LogiMaster._instance = None
+        self.controller = LogiMaster()
+        conn = self.controller.db.conn
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                         [(1, 5, 'A1'), (2, 10, 'A2'), (3, 15, 'B1')])
+        conn.commit()
+        self.controller.load_inventory()
+        self.other = Database(self.path, log_flush_interval=0)
+
+    def tearDown(self):
+        self.other.close()
+        del os.environ["LOGISTECH_SHARED_STATE"]
+        if self.previous_db is None:
+            del os.environ["LOGISTECH_DB"]
+        else:
+            os.environ["LOGISTECH_DB"] = self.previous_db
+        LogiMaster._instance = None
+
+    def test_reservation_from_other_worker_is_seen(self):
+        # The other worker fills bin 2, so a size 6 package must go to bin 3
+        self.assertTrue(self.other.reserve_bin_space(2, 10))
+        self.controller.process_arrival(Package("S1", 6, "NYC"))
+        result = self.controller.assign_storage()
+        self.assertEqual(result["bin_id"], 3)
+        self.assertEqual(self.controller.bin_inventory.get(2).current_load, 10)
+
+        # Our reservation is visible to the other worker, and over-filling is refused
+        loads = {r[0]: r[3] for r in self.other.load_bins()}
+        self.assertEqual(loads[3], 6)
+        self.assertFalse(self.other.reserve_bin_space(3, 10))
+
+    def test_conveyor_and_dock_are_shared(self):
+        self.other.queue_push("conveyor_queue", [("S2", 4, "BOS")])
+        self.assertFalse(self.controller.conveyor_queue.is_empty())
+        result = self.controller.assign_storage()
+        self.assertEqual(result["package_id"], "S2")
+        self.assertEqual(self.other.queue_rows("conveyor_queue"), [])
+
+        self.controller.load_truck(10, [Package("T1", 6, "LA"), Package("T2", 4, "LA")])
+        self.assertEqual([r[0] for r in self.other.queue_rows("loading_dock")], ["T1", "T2"])
+        self.other.queue_pop("loading_dock", newest=True)
+        self.assertEqual(self.controller.loading_stack.view_top().tracking_id, "T1")
+
+    def test_stored_package_can_be_picked_by_other_worker(self):
+        self.controller.process_arrival(Package("S3", 4, "SEA"))
+        self.assertTrue(self.controller.assign_storage()["success"])
+        self.assertEqual(self.other.locate("S3")[1], 1)
+        self.assertEqual([row[0] for row in self.other.take_locations(["S3"])], ["S3"])
+
+    def test_new_bins_are_merged_without_reload(self):
+        inventory = self.controller.bin_inventory
+        self.other.conn.execute("INSERT INTO bins (bin_id, capacity, location_code) VALUES (4, 500, 'C1')")
+        self.other.conn.commit()
+        self.controller.process_arrival(Package("BIG", 400, "MIA"))
+        self.assertEqual(self.controller.assign_storage()["bin_id"], 4)
+        self.assertIs(self.controller.bin_inventory, inventory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from controller import LogiMaster
+from database import Database
+from models import Package
+from simulator import (ARRIVAL, PICK, Simulation, in_memory_controller, poisson_arrivals, recorded_bins,
+                       replay_events)
+
+BINS = [(1, 10, "A1", 0), (2, 20, "A2", 0), (3, 50, "B1", 0)]
+
+class TestSimulation(unittest.TestCase):
+    def tearDown(self):
+        LogiMaster._instance = None
+
+    def test_conveyor_drops_and_truck_picks(self):
+        events = [
+            (0.0, ARRIVAL, (Package("S1", 8, "NYC"), 100.0)),
+            (0.0, ARRIVAL, (Package("S2", 45, "NYC"), None)),
+            (1.0, ARRIVAL, (Package("S3", 60, "NYC"), 100.0)),   # No bin is large enough
+            (2.0, ARRIVAL, (Package("S4", 15, "NYC"), 50.0)),
+        ]
+        db_before = os.environ["LOGISTECH_DB"]
+        with in_memory_controller(BINS) as controller:
+            self.assertEqual(controller.db.db_name, ":memory:")
+            simulation = Simulation(controller, service_time=10, truck_interval=60, sample_interval=30)
+            report = simulation.run(events)
+            self.assertEqual(controller.bin_inventory.get(3).current_load, 45)
+            self.assertIsNone(controller.locate("S1"))
+            # The sample emptied the in-memory log
+            self.assertEqual(controller.db.conn.execute("SELECT COUNT(*) FROM shipment_logs").fetchone(), (0,))
+        self.assertEqual(os.environ["LOGISTECH_DB"], db_before)
+
+        self.assertEqual((report.arrivals, report.stored, report.dropped, report.picked), (4, 3, 1, 2))
+        self.assertEqual(report.drop_rate, 0.25)
+        self.assertEqual(report.max_queue_depth, 4)
+        # S1 is due last (t=110); what is still due when the run ends leaves on a final truck
+        self.assertEqual(report.simulated_seconds, 110)
+        self.assertEqual(report.utilization[0], (0.0, 0.0, 2))
+        self.assertEqual(report.utilization[-1], (110, 45 / 80, 0))
+
+    def test_poisson_run_stops_at_until(self):
+        arrivals = poisson_arrivals(2.0, 5_000, lambda rng: rng.randint(1, 20), dwell=300, seed=7)
+        with in_memory_controller([(i, 100, f"A{i}", 0) for i in range(1, 101)]) as controller:
+            report = Simulation(controller, truck_interval=60, sample_interval=600).run(arrivals, until=1_800)
+        self.assertLessEqual(report.simulated_seconds, 1_800)
+        self.assertAlmostEqual(report.arrivals / 1_800, 2.0, delta=0.2)
+        self.assertEqual(report.stored + report.dropped, report.arrivals)
+        # Every 600 s up to 1,800 s, plus the final state
+        self.assertEqual(len(report.utilization), 5)
+
+    def test_replay_recorded_logs(self):
+        path = os.path.join(tempfile.mkdtemp(), "recorded.db")
+        db = Database(path, log_flush_interval=0, log_compaction_interval=0)
+        db.conn.executemany("INSERT INTO bins (bin_id, capacity, location_code, current_load) VALUES (?, ?, ?, ?)",
+                            [(1, 10, "A1", 7), (2, 30, "A2", 0)])
+        db.conn.executemany("INSERT INTO shipment_logs (tracking_id, bin_id, timestamp, status) VALUES (?, ?, ?, ?)",
+                            [("R1", 1, 1_000_000, "STORED"), ("R2", 2, 1_004_000, "STORED"),
+                             ("T1", -1, 1_005_000, "LOADED"), ("R1", 1, 1_009_000, "PICKED")])
+        db.conn.commit()
+        db.record_location("R2", 2, 25)
+        db.close()
+
+        events = list(replay_events(path, lambda rng: 7))
+        self.assertEqual([(at, kind) for at, kind, _ in events], [(0.0, ARRIVAL), (4.0, ARRIVAL), (9.0, PICK)])
+        self.assertEqual([events[0][2][0].size, events[1][2][0].size], [7, 25])
+        self.assertEqual(recorded_bins(path), [(1, 10, "A1", 0), (2, 30, "A2", 0)])
+
+        with in_memory_controller(recorded_bins(path)) as controller:
+            report = Simulation(controller, truck_interval=0).run(events)
+            self.assertEqual(controller.locate("R2")["bin_id"], 2)
+        self.assertEqual((report.stored, report.picked), (2, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from controller import LogiMaster
+from database import Database
+
+class TestBackgroundWarmUp(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.previous = {name: os.environ.get(name) for name in
+                         ("LOGISTECH_DB", "LOGISTECH_WARMUP", "LOGISTECH_INVENTORY_SNAPSHOT")}
+        os.environ["LOGISTECH_DB"] = os.path.join(workdir, "startup.db")
+        os.environ["LOGISTECH_WARMUP"] = "background"
+        os.environ["LOGISTECH_INVENTORY_SNAPSHOT"] = os.path.join(workdir, "inventory.snap")
+        db = Database(os.environ["LOGISTECH_DB"], log_flush_interval=0)
+        db.conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)",
+                            [(i, 10 * i, f"A{i}") for i in range(1, 1001)])
+        db.conn.commit()
+        db.close()
+
+    def tearDown(self):
+        for name, value in self.previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        LogiMaster._instance = None
+
+    def start(self):
+        LogiMaster._instance = None
+        controller = LogiMaster()
+        self.assertTrue(controller.ready.wait(5))
+        return controller
+
+    def test_snapshot_is_written_then_used(self):
+        controller = self.start()
+        self.assertEqual(len(controller.bin_inventory), 1000)
+        self.assertTrue(os.path.exists(os.environ["LOGISTECH_INVENTORY_SNAPSHOT"]))
+        restarted = self.start()
+        self.assertEqual(list(restarted.bin_inventory.columns()), list(controller.bin_inventory.columns()))
+        # Adding a bin moves the change counter, so the stale snapshot is skipped
+        restarted.db.conn.execute("INSERT INTO bins (bin_id, capacity, location_code) VALUES (1001, 5, 'B1')")
+        restarted.db.conn.commit()
+        self.assertEqual(len(self.start().bin_inventory), 1001)
+
+if __name__ == '__main__':
+    unittest.main()
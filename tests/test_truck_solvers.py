@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+import random
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from models import Package
+from algorithms import IncrementalTruckPlan, optimize_truck_loading, register_solver, TruckLoadSolver
+
+def make_packages(sizes):
+    return [Package(f"P{i}", size, "X") for i, size in enumerate(sizes)]
+
+class TestTruckSolvers(unittest.TestCase):
+    def test_engines_find_optimal_load(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            packages = make_packages([rng.randint(1, 40) for _ in range(12)])
+            capacity = rng.randint(20, 150)
+            # Brute force the best reachable load
+            best = max(sum(p.size for j, p in enumerate(packages) if mask >> j & 1)
+                       for mask in range(1 << len(packages))
+                       if sum(p.size for j, p in enumerate(packages) if mask >> j & 1) <= capacity)
+            for engine in ("dp", "bnb"):
+                load = optimize_truck_loading(capacity, packages, engine=engine)
+                self.assertEqual(sum(p.size for p in load), best, engine)
+
+    def test_large_manifest_is_fast(self):
+        rng = random.Random(11)
+        packages = make_packages([rng.randint(1, 500) for _ in range(600)])
+        for capacity, engine in ((20_000, "dp"), (10 ** 9, "bnb"), (54_321_987, "auto")):
+            start = time.perf_counter()
+            load = optimize_truck_loading(capacity, packages, engine=engine)
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertLessEqual(sum(p.size for p in load), capacity)
+
+    def test_time_limited_search_returns_best_so_far(self):
+        # Large sizes with no quick exact fill, so the search cannot stop early
+        rng = random.Random(5)
+        packages = make_packages([rng.randint(10 ** 8, 10 ** 9) for _ in range(60)])
+        start = time.perf_counter()
+        load = optimize_truck_loading(sum(p.size for p in packages) // 2 + 1, packages, time_limit=0.2)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertGreater(sum(p.size for p in load), 0)
+
+    def test_manifests_without_an_exact_fill_stay_fast(self):
+        rng = random.Random(7)
+        even = make_packages([2 * rng.randint(1, 50_000) for _ in range(600)])
+        # Large sizes with no quick exact fill: "auto" Branch and Bound runs out its default budget
+        hard = make_packages([rng.randint(10 ** 8, 10 ** 9) for _ in range(60)])
+        for capacity, packages in ((1_000_001, even), (10 ** 9 + 1, even),
+                                   (sum(p.size for p in hard) // 2 + 1, hard)):
+            start = time.perf_counter()
+            load = optimize_truck_loading(capacity, packages)
+            self.assertLess(time.perf_counter() - start, 2.0)
+            self.assertLessEqual(sum(p.size for p in load), capacity)
+        # Counted in units of the common divisor, DP stays exact: an odd capacity is missed by one
+        load = optimize_truck_loading(31, make_packages([4, 6, 10, 14]), engine="dp")
+        self.assertEqual(sum(p.size for p in load), 30)
+
+    def test_custom_engine(self):
+        class FirstOnly(TruckLoadSolver):
+            def solve(self, truck_capacity, packages):
+                return packages[:1]
+        register_solver("first", FirstOnly)
+        load = optimize_truck_loading(100, make_packages([10, 20]), engine="first")
+        self.assertEqual([p.tracking_id for p in load], ["P0"])
+
+class TestIncrementalTruckPlan(unittest.TestCase):
+    def test_edits_keep_the_load_optimal(self):
+        rng = random.Random(5)
+        for _ in range(30):
+            capacity = rng.randint(20, 150)
+            plan = IncrementalTruckPlan(capacity)
+            for package in make_packages([rng.randint(1, 40) for _ in range(8)]):
+                plan.add(package)
+            for step in range(6):
+                diff = plan.replan()
+                best = optimize_truck_loading(capacity, plan.order) or []
+                self.assertEqual(diff.load, sum(p.size for p in best))
+                kept = plan.stack[:len(plan.stack) - diff.pops]
+                self.assertEqual(sum(p.size for p in kept + diff.pushes), diff.load)
+                plan.applied(diff)
+                if rng.random() < 0.5:
+                    plan.remove(rng.choice(plan.order).tracking_id)
+                else:
+                    plan.add(Package(f"N{step}", rng.randint(1, 40), "X"))
+
+    def test_diff_pops_only_what_it_must(self):
+        packages = make_packages([40, 30, 20, 10])
+        plan = IncrementalTruckPlan(100, packages)
+        self.assertEqual(plan.replan().pops, 0)
+        # Dropping the top package swaps in a new one of the same size: one pop, one push
+        plan.add(Package("NEW", 10, "X"))
+        plan.remove("P3")
+        diff = plan.replan()
+        self.assertEqual((diff.pops, [p.tracking_id for p in diff.pushes], diff.load), (1, ["NEW"], 100))
+        plan.applied(diff)
+        # A package under the top one has to come out with everything above it
+        plan.remove("P1")
+        diff = plan.replan()
+        self.assertEqual(diff.pops, 3)
+        self.assertEqual(diff.load, 70)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+os.environ.setdefault("LOGISTECH_DB", os.path.join(tempfile.mkdtemp(), "logistech_test.db"))
+
+from models import Package
+from inventory import BinInventory
+from controller import LogiMaster
+
+class TestInventoryShards(unittest.TestCase):
+    def test_shards_follow_load_changes(self):
+        inventory = BinInventory.from_rows([(1, 10, 'A1', 0), (2, 20, 'A2', 5), (3, 30, 'B1', 0), (4, 15, 'BX1', 0)])
+        inventory.shard_by_zone()
+        self.assertEqual(list(inventory.shards), ["A", "B", "BX"])
+        self.assertEqual(inventory.shards["A"].load, 5)
+        inventory.best_fit_in_zone(12, "A").occupy_space(12)
+        self.assertEqual(inventory.get(2).current_load, 17)
+        self.assertEqual(inventory.shards["A"].load, 17)
+        # Zone A has no bin left with room for 11; B does
+        self.assertIsNone(inventory.best_fit_in_zone(11, "A"))
+        self.assertEqual(inventory.best_fit_in_zone(11, "B").bin_id, 3)
+
+class TestZonePolicies(unittest.TestCase):
+    def setUp(self):
+        self.previous = {name: os.environ.get(name) for name in ("LOGISTECH_ZONE_POLICY", "LOGISTECH_ZONE_ORDER")}
+
+    def tearDown(self):
+        for name, value in self.previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        LogiMaster._instance = None
+
+    def start(self, policy, bins):
+        os.environ["LOGISTECH_ZONE_POLICY"] = policy
+        os.environ["LOGISTECH_ZONE_ORDER"] = "A,B,C"
+        LogiMaster._instance = None
+        controller = LogiMaster()
+        conn = controller.db.conn
+        conn.execute("DELETE FROM bins")
+        conn.executemany("INSERT INTO bins (bin_id, capacity, location_code) VALUES (?, ?, ?)", bins)
+        conn.commit()
+        controller.load_inventory()
+        return controller
+
+    def store(self, controller, package):
+        controller.process_arrival(package)
+        return controller.assign_storage()
+
+    def test_nearest_zone_first(self):
+        controller = self.start("nearest", [(1, 50, 'A1'), (2, 10, 'B1'), (3, 50, 'C1')])
+        self.assertEqual(self.store(controller, Package("P1", 8, "NYC", zone="B"))["bin_id"], 2)
+        # B is full for this one; A and C are equally near, A comes first in the zone order
+        self.assertEqual(self.store(controller, Package("P2", 8, "NYC", zone="B"))["bin_id"], 1)
+        self.assertEqual(self.store(controller, Package("P3", 8, "NYC", zone="C"))["bin_id"], 3)
+
+    def test_least_loaded_zone(self):
+        controller = self.start("least_loaded", [(1, 100, 'A1'), (2, 100, 'B1')])
+        zones = [self.store(controller, Package(f"P{i}", 10, "NYC"))["bin_location"] for i in range(4)]
+        self.assertEqual(zones, ["A1", "B1", "A1", "B1"])
+
+    def test_concurrent_claims_never_overfill(self):
+        controller = self.start("least_loaded", [(i, 50, f"{'ABC'[i % 3]}{i}") for i in range(1, 31)])
+
+        def ingest(n):
+            for i in range(120):
+                controller.process_arrival(Package(f"T{n}-{i}", 5, "NYC"))
+                controller.assign_storage()
+        threads = [threading.Thread(target=ingest, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        inventory = controller.bin_inventory
+        self.assertEqual(inventory.utilization(), 1.0)
+        self.assertTrue(all(b.current_load <= b.capacity for b in inventory))
+        self.assertEqual(sum(s.load for s in inventory.shards.values()), 1500)
+
+if __name__ == '__main__':
+    unittest.main()